@@ -0,0 +1,450 @@
+"""
+批量文件操作 - 按设备并行删除/移动重复文件或替换为链接，追加式日志支持中断续做与撤销
+"""
+
+import errno
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+from .scheduler import HashScheduler
+from .utils import FileUtils
+from .walker import FileRecord
+
+KEEP_POLICIES = ('first', 'oldest', 'newest')
+ACTIONS = ('delete', 'move') + FileUtils.LINK_MODES
+
+
+class ActionOp(NamedTuple):
+    """一次计划中的文件操作
+    
+    dst 在计划阶段就已确定（删除和替换为链接时为备份路径，可为 None；移动时为目标路径），
+    并写入日志，续做时使用同一个目标，不会因重名处理而产生第二份副本。
+    mtime_ns / inode 及 target_ 前缀的字段是扫描时记录的元数据，删除、移动或替换为链接前
+    据此确认两个文件在扫描后都没有变化；没有扫描记录时为 None。
+    """
+    index: int
+    action: str  # delete | move | hardlink | reflink | symlink
+    src: str
+    dst: Optional[str]
+    size: int
+    dev: Optional[int]
+    target: Optional[str] = None  # 同组中保留的文件（替换为链接时即链接指向的文件）
+    mtime_ns: Optional[int] = None
+    inode: Optional[int] = None
+    target_mtime_ns: Optional[int] = None
+    target_inode: Optional[int] = None
+    
+    def scan_records(self) -> Tuple[Optional[FileRecord], Optional[FileRecord]]:
+        """(保留文件, 本文件) 扫描时的记录，缺少任何一方时对应项为 None"""
+        keep_record = dup_record = None
+        if self.target_mtime_ns is not None:
+            keep_record = FileRecord(self.target, self.size, self.target_mtime_ns, self.target_inode, None)
+        if self.mtime_ns is not None:
+            dup_record = FileRecord(self.src, self.size, self.mtime_ns, self.inode, self.dev)
+        return keep_record, dup_record
+
+
+@dataclass
+class ActionSummary:
+    """一次批量操作的结果"""
+    total: int = 0
+    succeeded: int = 0
+    bytes_done: int = 0
+    elapsed: float = 0.0
+    failures: List[Tuple[str, str]] = field(default_factory=list)  # (路径, 错误信息)
+    results: Dict[str, bool] = field(default_factory=dict)  # 路径 -> 是否成功
+    
+    @property
+    def files_per_second(self) -> float:
+        return self.succeeded / self.elapsed if self.elapsed > 0 else 0.0
+        
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_done / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def choose_keep(files: List[str], keep: str = 'first',
+                file_records: Optional[Mapping[str, FileRecord]] = None) -> str:
+    """按保留策略选出组内保留的文件
+    
+    oldest/newest 使用扫描时记录的修改时间，只有缺少记录的文件才重新 stat。
+    修改时间相同时保留组内靠前的文件。
+    """
+    if keep not in KEEP_POLICIES:
+        raise ValueError(f"不支持的保留策略: {keep}")
+    if keep == 'first':
+        return files[0]
+        
+    def mtime(path: str) -> int:
+        record = file_records.get(path) if file_records is not None else None
+        if record is not None and record.mtime_ns is not None:
+            return record.mtime_ns
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            # 无法访问的文件不作为保留对象
+            return float('inf') if keep == 'oldest' else float('-inf')
+            
+    if keep == 'oldest':
+        return min(files, key=mtime)
+    return max(files, key=mtime)
+
+
+def plan_actions(action: str, paths: Iterable[str], dst_dir: Optional[str] = None,
+                 file_records: Optional[Mapping[str, FileRecord]] = None,
+                 start: int = 0, targets: Optional[Mapping[str, str]] = None) -> List[ActionOp]:
+    """为一批文件生成操作计划
+    
+    Args:
+        action: delete、hardlink、reflink、symlink（dst_dir 为备份目录，可为 None）
+                或 move（dst_dir 为目标目录）
+        paths: 文件路径
+        dst_dir: 备份或目标目录
+        file_records: 扫描时的文件元数据，提供大小、设备号以及替换为链接前用于校验的
+                      mtime 与 inode；缺少记录时 stat 文件（不作校验依据）
+        start: 第一个操作的编号
+        targets: 文件路径 -> 同组中保留的文件路径（替换为链接时必须提供），执行前确认保留文件仍在
+        
+    Returns:
+        操作列表；目标文件名在计划内去重，并避开目标目录中已有的文件
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"不支持的操作: {action}")
+    if action == 'move' and not dst_dir:
+        raise ValueError("移动操作需要目标目录")
+    if action in FileUtils.LINK_MODES and targets is None:
+        raise ValueError("替换为链接需要指定保留文件")
+        
+    prefix = datetime.now().strftime("%Y%m%d_%H%M%S_") if action != 'move' else ''
+    reserved: Set[str] = set()
+    ops = []
+    for index, path in enumerate(paths, start):
+        record = file_records.get(path) if file_records is not None else None
+        mtime_ns = inode = None
+        if record is not None and record.dev is not None:
+            size, dev, mtime_ns, inode = record.size, record.dev, record.mtime_ns, record.inode
+        else:
+            try:
+                stat = os.lstat(path)
+                size, dev = stat.st_size, stat.st_dev
+            except OSError:
+                size, dev = 0, None
+                
+        dst = None
+        if dst_dir:
+            dst = _reserve_destination(dst_dir, prefix + os.path.basename(path), reserved)
+        target = target_mtime_ns = target_inode = None
+        if targets is not None:
+            target = targets[path]
+            target_record = file_records.get(target) if file_records is not None else None
+            if target_record is not None:
+                target_mtime_ns, target_inode = target_record.mtime_ns, target_record.inode
+        ops.append(ActionOp(index, action, path, dst, size, dev, target, mtime_ns, inode,
+                            target_mtime_ns, target_inode))
+    return ops
+
+
+def plan_cleanup(duplicate_groups: Mapping[str, List[str]], action: str = 'delete', keep: str = 'first',
+                 file_records: Optional[Mapping[str, FileRecord]] = None,
+                 backup_dir: Optional[str] = None) -> List[ActionOp]:
+    """为重复组生成清理计划，每组按保留策略留下一个文件，其余删除或替换为指向它的链接
+    
+    硬链接与 reflink 不能跨文件系统，这两种方式下组内按设备分别选出保留文件，
+    每个设备上留一份数据。
+    """
+    if action not in ('delete',) + FileUtils.LINK_MODES:
+        raise ValueError(f"不支持的清理方式: {action}")
+        
+    targets: Dict[str, str] = {}
+    for files in duplicate_groups.values():
+        if len(files) <= 1:
+            continue
+        subgroups = [files]
+        if action in ('hardlink', 'reflink'):
+            by_device: Dict[Optional[int], List[str]] = {}
+            for path in files:
+                record = file_records.get(path) if file_records is not None else None
+                by_device.setdefault(record.dev if record is not None else None, []).append(path)
+            subgroups = list(by_device.values())
+            
+        for subgroup in subgroups:
+            keep_file = choose_keep(subgroup, keep, file_records)
+            targets.update((path, keep_file) for path in subgroup if path != keep_file)
+    return plan_actions(action, list(targets), backup_dir, file_records, targets=targets)
+
+
+def _reserve_destination(dst_dir: str, file_name: str, reserved: Set[str]) -> str:
+    """在目标目录中为文件选一个未被占用的名称（与 FileUtils.move_file 相同的序号规则）"""
+    dst_path = os.path.join(dst_dir, file_name)
+    counter = 1
+    while dst_path in reserved or os.path.lexists(dst_path):
+        name, ext = os.path.splitext(file_name)
+        dst_path = os.path.join(dst_dir, f"{name}_{counter}{ext}")
+        counter += 1
+    reserved.add(dst_path)
+    return dst_path
+
+
+@dataclass
+class JournalState:
+    """从日志读回的操作计划与执行状态"""
+    action: Optional[str] = None
+    ops: List[ActionOp] = field(default_factory=list)
+    done: Dict[int, bool] = field(default_factory=dict)  # 操作编号 -> 最后一次执行是否成功
+    undone: Set[int] = field(default_factory=set)  # 已撤销的操作编号
+    
+    def pending(self) -> List[ActionOp]:
+        """尚未成功完成的操作"""
+        return [op for op in self.ops if not self.done.get(op.index)]
+        
+    def undoable(self) -> List[ActionOp]:
+        """已成功完成、尚未撤销的操作"""
+        return [op for op in self.ops if self.done.get(op.index) and op.index not in self.undone]
+
+
+class ActionJournal:
+    """追加式操作日志（JSON Lines）
+    
+    执行前先写入完整计划（plan 头与每个操作一行 op）并 fsync，执行过程中每完成一批
+    追加对应的 done 记录并 fsync；撤销时追加 undone 记录。进程在任何时刻中断，
+    日志中都保留完整计划与已确认完成的操作，可据此续做或撤销。中断时写了一半的
+    最后一行在读取时忽略。
+    """
+    
+    PLAN_CHUNK = 10000  # 写入计划时每次写入（并 fsync）的操作数
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        
+    def begin(self, action: str, ops: List[ActionOp]):
+        """创建新日志并写入操作计划，日志文件已存在时报错（应使用续做）"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'x', encoding='utf-8')
+        self._write([{'type': 'plan', 'action': action, 'created': datetime.now().isoformat(), 'count': len(ops)}])
+        for start in range(0, len(ops), self.PLAN_CHUNK):
+            self._write([{'type': 'op', **op._asdict()} for op in ops[start:start + self.PLAN_CHUNK]])
+            
+    def reopen(self):
+        """打开已有日志以追加记录（续做或撤销）"""
+        self._file = open(self.path, 'a', encoding='utf-8')
+        
+    def record(self, entry_type: str, outcomes: List[Tuple[int, Optional[str]]]):
+        """追加一批操作结果
+        
+        Args:
+            entry_type: done 或 undone
+            outcomes: (操作编号, 错误信息) 列表，错误信息为 None 表示成功
+        """
+        self._write([{'type': entry_type, 'i': index, 'ok': error is None, **({'error': error} if error else {})}
+                     for index, error in outcomes])
+                     
+    def _write(self, entries: List[dict]):
+        data = ''.join(json.dumps(entry) + '\n' for entry in entries)
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            
+    @staticmethod
+    def load(path: str) -> JournalState:
+        """读取日志，返回计划与各操作的最新状态"""
+        state = JournalState()
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().split('\n')
+        for number, line in enumerate(lines):
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                if number == len(lines) - 1:
+                    break  # 中断时未写完的最后一行
+                raise ValueError(f"操作日志第 {number + 1} 行已损坏: {path}")
+                
+            entry_type = entry.get('type')
+            if entry_type == 'plan':
+                state.action = entry['action']
+            elif entry_type == 'op':
+                state.ops.append(ActionOp(entry['index'], entry['action'], entry['src'], entry['dst'],
+                                          entry['size'], entry['dev'], entry.get('target'),
+                                          entry.get('mtime_ns'), entry.get('inode'),
+                                          entry.get('target_mtime_ns'), entry.get('target_inode')))
+            elif entry_type == 'done':
+                state.done[entry['i']] = entry['ok']
+                if entry['ok']:
+                    state.undone.discard(entry['i'])
+            elif entry_type == 'undone' and entry['ok']:
+                state.undone.add(entry['i'])
+                
+        if state.action is None:
+            raise ValueError(f"不是操作日志: {path}")
+        return state
+
+
+class ActionExecutor:
+    """批量执行文件操作
+    
+    操作按所在设备（扫描时记录的 st_dev）分队列，复用 HashScheduler 的设备队列与
+    工作线程：每个设备 threads 个工作线程，每次领取 batch_size 个操作，不同磁盘上的
+    操作互不等待。每批完成后向日志追加结果，进度以操作数为单位上报。
+    """
+    
+    def __init__(self, threads: int = 4, batch_size: int = 64, journal: Optional[ActionJournal] = None,
+                 progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                 stop_event: Optional[threading.Event] = None):
+        """初始化执行器
+        
+        Args:
+            threads: 每个设备的工作线程数
+            batch_size: 每次领取的操作数，也是每次写日志的批量
+            journal: 可选的操作日志（已 begin 或 reopen）
+            progress_callback: 进度回调，参数为 (已完成操作数, 总操作数, 阶段说明)
+            stop_event: 停止事件，设置后工作线程在当前批次结束后退出
+        """
+        self.threads = max(1, threads)
+        self.batch_size = max(1, batch_size)
+        self.journal = journal
+        self.progress_callback = progress_callback
+        self.stop_event = stop_event or threading.Event()
+        
+    def execute(self, ops: List[ActionOp], resume: bool = False) -> ActionSummary:
+        """执行操作计划
+        
+        Args:
+            ops: 操作列表
+            resume: 是否为续做；续做时源文件已不存在且目标已就位（或无需备份）的操作视为
+                    中断前已完成、只是未来得及记录
+        """
+        return self._run(ops, lambda op: self._apply(op, resume), 'done', '执行文件操作')
+        
+    def undo(self, ops: List[ActionOp]) -> ActionSummary:
+        """撤销已完成的操作：把备份或移动后的文件放回原位置
+        
+        替换为链接的操作用备份覆盖链接；没有备份时复制保留文件，恢复为独立的文件。
+        """
+        return self._run(ops, self._revert, 'undone', '撤销文件操作')
+        
+    def _run(self, ops: List[ActionOp], apply: Callable[[ActionOp], None], entry_type: str,
+             message: str) -> ActionSummary:
+        summary = ActionSummary(total=len(ops))
+        lock = threading.Lock()
+        
+        def run_batch(batch: List[ActionOp]) -> list:
+            outcomes = []
+            for op in batch:
+                try:
+                    apply(op)
+                    outcomes.append((op, None))
+                except (OSError, ValueError) as e:
+                    outcomes.append((op, str(e)))
+            if self.journal is not None:
+                self.journal.record(entry_type, [(op.index, error) for op, error in outcomes])
+            with lock:
+                for op, error in outcomes:
+                    summary.results[op.src] = error is None
+                    if error is None:
+                        summary.succeeded += 1
+                        summary.bytes_done += op.size
+                    else:
+                        summary.failures.append((op.src, error))
+            return []
+            
+        scheduler = HashScheduler(self.threads, self.stop_event, self.progress_callback)
+        started = time.perf_counter()
+        try:
+            scheduler.run([(op, 1) for op in ops], run_batch, message, batch_size=self.batch_size,
+                          device_of=lambda op: op.dev)
+        except KeyboardInterrupt:
+            # 工作线程做完当前批次（并写入日志）后退出
+            self.stop_event.set()
+            raise
+        summary.elapsed = time.perf_counter() - started
+        return summary
+        
+    @staticmethod
+    def _apply(op: ActionOp, resume: bool = False):
+        """执行单个操作"""
+        if resume and not os.path.lexists(op.src) and (op.dst is None or os.path.lexists(op.dst)):
+            return
+            
+        if op.action in ('delete', 'move'):
+            ActionExecutor._check_unchanged(op)
+            
+        if op.action == 'delete':
+            if op.dst is not None:
+                # 同一文件系统上备份只是改名，跨文件系统时才复制
+                os.makedirs(os.path.dirname(op.dst), exist_ok=True)
+                shutil.move(op.src, op.dst)
+            else:
+                os.remove(op.src)
+        elif op.action in FileUtils.LINK_MODES:
+            # 续做时备份已存在说明中断前已备份，重复执行替换即可
+            backup_path = op.dst
+            if resume and backup_path is not None and os.path.lexists(backup_path):
+                backup_path = None
+            keep_record, dup_record = op.scan_records()
+            FileUtils.replace_with_link(op.target, op.src, op.action, backup_path, keep_record, dup_record)
+        elif op.action == 'move':
+            os.makedirs(os.path.dirname(op.dst), exist_ok=True)
+            if os.path.lexists(op.dst):
+                raise FileExistsError(f"目标文件已存在: {op.dst}")
+            shutil.move(op.src, op.dst)
+        else:
+            raise ValueError(f"不支持的操作: {op.action}")
+            
+    @staticmethod
+    def _check_unchanged(op: ActionOp):
+        """删除或移动前确认保留文件仍然存在，且两个文件都与扫描时的记录一致，否则抛出 OSError"""
+        keep_record, dup_record = op.scan_records()
+        if dup_record is not None:
+            FileUtils._check_unchanged(op.src, os.stat(op.src), dup_record)
+        if op.target is not None:
+            try:
+                keep_stat = os.stat(op.target)
+            except FileNotFoundError:
+                raise FileNotFoundError(errno.ENOENT, "保留文件已不存在", op.target)
+            if keep_record is not None:
+                FileUtils._check_unchanged(op.target, keep_stat, keep_record)
+                
+    @staticmethod
+    def _revert(op: ActionOp):
+        """撤销单个操作"""
+        if op.action in FileUtils.LINK_MODES:
+            if op.dst is not None:
+                try:
+                    os.replace(op.dst, op.src)
+                    return
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+            # 备份在其他文件系统上或没有备份：复制到临时文件后原子替换链接
+            temp_path = f"{op.src}.{os.getpid()}.{threading.get_ident()}.dhtmp"
+            try:
+                shutil.copy2(op.dst or op.target, temp_path)
+                os.replace(temp_path, op.src)
+            finally:
+                if os.path.lexists(temp_path):
+                    os.remove(temp_path)
+            if op.dst is not None:
+                os.remove(op.dst)
+            return
+            
+        if op.dst is None:
+            raise ValueError(f"删除时没有备份，无法恢复: {op.src}")
+        if os.path.lexists(op.src):
+            raise FileExistsError(f"原位置已有文件: {op.src}")
+        os.makedirs(os.path.dirname(op.src) or '.', exist_ok=True)
+        shutil.move(op.dst, op.src)
@@ -0,0 +1,218 @@
+"""
+异步哈希引擎 - 用 asyncio 驱动大量并发读取，按在途字节数限流
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+from .hasher import FileHasher, _fadvise
+from .walker import FileRecord
+
+
+def _read_window(hash_obj, fd: int, offset: int, length: int, prefetch: int) -> int:
+    """读取 [offset, offset + length) 送入哈希对象，并预读下一个窗口
+    
+    在线程池中执行。os.pread 与大缓冲区的 hash.update 都会释放 GIL。
+    
+    Returns:
+        实际读取的字节数（文件被截断时小于 length）
+    """
+    if prefetch > 0 and hasattr(os, 'posix_fadvise') and hasattr(os, 'POSIX_FADV_WILLNEED'):
+        try:
+            # 提前让内核异步读取下一个窗口，不占用线程即可让更多请求在途
+            os.posix_fadvise(fd, offset + length, prefetch, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+            
+    done = 0
+    if not hasattr(os, 'pread'):
+        # Windows 没有 pread；同一文件的窗口按顺序读取，可以直接定位
+        os.lseek(fd, offset, os.SEEK_SET)
+    while done < length:
+        if hasattr(os, 'pread'):
+            data = os.pread(fd, length - done, offset + done)
+        else:
+            data = os.read(fd, length - done)
+        if not data:
+            break
+        hash_obj.update(data)
+        done += len(data)
+    return done
+
+
+def _matches_record(fd: int, record: FileRecord) -> bool:
+    """已打开文件的大小和修改时间是否仍与扫描时的记录一致"""
+    stat = os.fstat(fd)
+    return stat.st_size == record.size and (record.mtime_ns is None or stat.st_mtime_ns == record.mtime_ns)
+
+
+class _ByteBudget:
+    """在途字节数预算，超出时等待其他读取完成"""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self._condition = asyncio.Condition()
+        
+    async def acquire(self, n: int):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.used + n <= self.limit)
+            self.used += n
+            self.peak = max(self.peak, self.used)
+            
+    async def release(self, n: int):
+        async with self._condition:
+            self.used -= n
+            self._condition.notify_all()
+
+
+class AsyncHashEngine:
+    """基于 asyncio 的完整哈希引擎
+    
+    面向 NFS/SMB/FUSE 等高延迟存储：同时打开 max_open_files 个文件，每个文件按窗口
+    顺序读取，读取在一个小线程池中执行，同时对下一个窗口发出 POSIX_FADV_WILLNEED 预读，
+    因此在途 I/O 请求数远大于线程数。所有窗口（含预读）占用的字节数不超过
+    max_inflight_bytes。
+    
+    标准库没有真正的异步文件 I/O，因此读取仍由线程完成；引擎只决定同时在途多少请求。
+    """
+    
+    WINDOW_SIZE = 1024 * 1024  # 单次读取窗口大小
+    
+    def __init__(self, io_threads: int, max_inflight_bytes: int, max_open_files: int,
+                 stop_event: threading.Event,
+                 progress_callback: Optional[Callable[[int, int, str], None]] = None):
+        """初始化引擎
+        
+        Args:
+            io_threads: 执行读取与哈希计算的线程数
+            max_inflight_bytes: 在途字节数上限（正在读取及已发出预读的窗口）
+            max_open_files: 同时处理的文件数
+            stop_event: 停止事件
+            progress_callback: 进度回调，参数为 (已处理字节数, 总字节数, 阶段说明)
+        """
+        self.io_threads = max(1, io_threads)
+        self.max_inflight_bytes = max(1, max_inflight_bytes)
+        self.max_open_files = max(1, max_open_files)
+        self.window_size = min(self.WINDOW_SIZE, self.max_inflight_bytes)
+        self.peak_inflight_bytes = 0
+        self._stop_event = stop_event
+        self._progress_callback = progress_callback
+        
+    def run(self, jobs: List[Tuple[Any, FileRecord]], hasher: FileHasher, message: str) -> List[Tuple[Any, bytes]]:
+        """计算一批文件的完整哈希
+        
+        在调用线程中新建事件循环执行，调用线程不能已有正在运行的事件循环。
+        
+        Args:
+            jobs: (调用方的键, 文件记录) 列表
+            hasher: 哈希计算器，用于查询/写入缓存与索引
+            message: 进度说明
+            
+        Returns:
+            成功计算的 (键, 二进制摘要) 列表
+        """
+        if not jobs:
+            return []
+        return asyncio.run(self._run(jobs, hasher, message))
+        
+    async def _run(self, jobs: List[Tuple[Any, FileRecord]], hasher: FileHasher,
+                   message: str) -> List[Tuple[Any, bytes]]:
+        loop = asyncio.get_running_loop()
+        budget = _ByteBudget(self.max_inflight_bytes)
+        total_bytes = sum(record.size for _, record in jobs)
+        progress = [0]
+        results = []
+        pending = iter(jobs)
+        
+        def advance(n: int):
+            progress[0] += n
+            if self._progress_callback:
+                self._progress_callback(progress[0], total_bytes, message)
+                
+        with ThreadPoolExecutor(max_workers=self.io_threads) as executor:
+            async def worker(items: Iterable[Tuple[Any, FileRecord]]):
+                # 所有 worker 共享同一个迭代器，单线程事件循环中无需加锁
+                for key, record in items:
+                    if self._stop_event.is_set():
+                        return
+                    digest = await self._hash_file(loop, executor, budget, hasher, record, advance)
+                    if digest is not None:
+                        results.append((key, digest))
+                        
+            await asyncio.gather(*(worker(pending) for _ in range(min(self.max_open_files, len(jobs)))))
+            
+        self.peak_inflight_bytes = max(self.peak_inflight_bytes, budget.peak)
+        return results
+        
+    async def _hash_file(self, loop, executor, budget: _ByteBudget, hasher: FileHasher,
+                         record: FileRecord, advance: Callable[[int], None]) -> Optional[bytes]:
+        """按窗口读取单个文件并计算摘要"""
+        cached = hasher.get_cached_hash(record.path, record)
+        if cached:
+            advance(record.size)
+            return bytes.fromhex(cached)
+            
+        try:
+            fd = await loop.run_in_executor(executor, os.open, record.path, os.O_RDONLY)
+        except OSError as e:
+            print(f"无法读取文件 {record.path}: {e}")
+            hasher.record_error(e)
+            advance(record.size)
+            return None
+            
+        hash_obj = hasher.SUPPORTED_ALGORITHMS[hasher.algorithm]()
+        offset = 0
+        unchanged = False
+        try:
+            if not await loop.run_in_executor(executor, _matches_record, fd, record):
+                print(f"文件在扫描后已被修改，跳过: {record.path}")
+                advance(record.size)
+                return None
+                
+            while offset < record.size:
+                if self._stop_event.is_set():
+                    return None
+                    
+                length = min(self.window_size, record.size - offset)
+                prefetch = min(self.window_size, record.size - offset - length)
+                # 预读窗口同样计入在途字节数，预算不足时不预读
+                reserved = length + prefetch if length + prefetch <= self.max_inflight_bytes else length
+                prefetch = reserved - length
+                
+                await budget.acquire(reserved)
+                try:
+                    n = await loop.run_in_executor(executor, _read_window, hash_obj, fd,
+                                                   offset, length, prefetch)
+                finally:
+                    await budget.release(reserved)
+                    
+                if n == 0:
+                    break
+                offset += n
+                advance(n)
+                
+            # 读取期间文件可能被追加或改写，读完后再核对一次
+            unchanged = await loop.run_in_executor(executor, _matches_record, fd, record)
+            if hasher.drop_cache:
+                _fadvise(fd, 'POSIX_FADV_DONTNEED')
+                
+        except OSError as e:
+            print(f"无法读取文件 {record.path}: {e}")
+            hasher.record_error(e)
+            return None
+        finally:
+            os.close(fd)
+            hasher.record_read(offset)
+            
+        if offset != record.size or not unchanged:
+            # 扫描期间文件被截断或修改，摘要只覆盖部分内容，不能写入缓存
+            print(f"文件在扫描后已被修改，跳过: {record.path}")
+            return None
+            
+        digest = hash_obj.digest()
+        hasher.store_hash(record.path, digest.hex(), record)
+        return digest
@@ -0,0 +1,71 @@
+"""
+文件目录表 - 以整数编号紧凑保存扫描到的文件元数据
+"""
+
+import os
+from array import array
+from typing import Dict, List
+from .walker import FileRecord
+
+
+class FileCatalog:
+    """扫描流程使用的紧凑文件目录表
+    
+    每个文件对应一个从 0 开始的整数编号。目录路径只保存一份（父目录表），
+    文件名按 UTF-8 编码连续存放在一个 bytearray 中，大小、修改时间、inode、
+    设备号保存在 array 中，避免为每个文件创建 FileRecord 和完整路径字符串。
+    需要时再用 path() / record() 按编号还原。
+    """
+    
+    def __init__(self):
+        self._dirs: List[str] = []
+        self._dir_index: Dict[str, int] = {}
+        self._names = bytearray()
+        self._name_offsets = array('Q', [0])
+        self.dir_ids = array('I')
+        self.sizes = array('Q')
+        self.mtimes = array('q')
+        self.inodes = array('Q')
+        self.devs = array('Q')
+        
+    def add(self, record: FileRecord) -> int:
+        """加入一个文件，返回其编号"""
+        dir_path, name = os.path.split(record.path)
+        dir_id = self._dir_index.get(dir_path)
+        if dir_id is None:
+            dir_id = len(self._dirs)
+            self._dirs.append(dir_path)
+            self._dir_index[dir_path] = dir_id
+            
+        # surrogateescape 保证无法解码的文件名也能原样还原
+        self._names += name.encode('utf-8', 'surrogateescape')
+        self._name_offsets.append(len(self._names))
+        self.dir_ids.append(dir_id)
+        self.sizes.append(record.size)
+        self.mtimes.append(record.mtime_ns)
+        self.inodes.append(record.inode)
+        self.devs.append(record.dev)
+        return len(self.sizes) - 1
+        
+    def name(self, file_id: int) -> str:
+        """获取文件名"""
+        start, end = self._name_offsets[file_id], self._name_offsets[file_id + 1]
+        return self._names[start:end].decode('utf-8', 'surrogateescape')
+        
+    def path(self, file_id: int) -> str:
+        """获取完整路径"""
+        return os.path.join(self._dirs[self.dir_ids[file_id]], self.name(file_id))
+        
+    def record(self, file_id: int) -> FileRecord:
+        """还原为 FileRecord"""
+        return FileRecord(self.path(file_id), self.sizes[file_id], self.mtimes[file_id],
+                          self.inodes[file_id], self.devs[file_id])
+                          
+    def memory_usage(self) -> int:
+        """估算目录表占用的字节数（数组、文件名缓冲区与目录字符串）"""
+        arrays = (self._name_offsets, self.dir_ids, self.sizes, self.mtimes, self.inodes, self.devs)
+        total = sum(a.itemsize * len(a) for a in arrays) + len(self._names)
+        return total + sum(len(d) for d in self._dirs)
+        
+    def __len__(self) -> int:
+        return len(self.sizes)
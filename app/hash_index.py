@@ -0,0 +1,125 @@
+"""
+持久化哈希索引 - 跨扫描、跨进程复用已计算的哈希值
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+
+class HashIndex:
+    """基于 SQLite 的持久化哈希索引
+    
+    以 (设备号, inode, 大小, 修改时间纳秒, 算法) 为键保存文件摘要。
+    文件内容不变时这些元数据也不变，重新扫描只需 stat 即可命中。
+    """
+    
+    COMMIT_INTERVAL = 1000  # 累积多少次写入后提交一次
+    PRUNE_BATCH = 1000  # 清理时每批读取并检查的条目数
+    
+    def __init__(self, db_path: str):
+        """打开（或创建）哈希索引
+        
+        Args:
+            db_path: 索引数据库文件路径
+        """
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                algorithm TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                path TEXT NOT NULL,
+                PRIMARY KEY (dev, ino, size, mtime_ns, algorithm)
+            )
+        """)
+        self._conn.commit()
+        
+    def get(self, dev: int, ino: int, size: int, mtime_ns: int, algorithm: str) -> Optional[str]:
+        """查询索引中的摘要，未命中返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algorithm=?",
+                (dev, ino, size, mtime_ns, algorithm)
+            ).fetchone()
+        return row[0] if row else None
+        
+    def put(self, dev: int, ino: int, size: int, mtime_ns: int, algorithm: str, digest: str, path: str):
+        """写入一条摘要记录"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (dev, ino, size, mtime_ns, algorithm, digest, path)
+            )
+            self._pending += 1
+            if self._pending >= self.COMMIT_INTERVAL:
+                self._conn.commit()
+                self._pending = 0
+                
+    def prune(self) -> int:
+        """清理过期条目（文件已删除或元数据已变化）
+        
+        按 rowid 分批读取，每批检查后立即删除其中的过期条目，内存中只保留一批。
+        
+        Returns:
+            删除的条目数
+        """
+        removed = 0
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, path, dev, ino, size, mtime_ns FROM hashes WHERE rowid > ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (last_rowid, self.PRUNE_BATCH)
+                ).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            
+            stale = []
+            for rowid, path, dev, ino, size, mtime_ns in rows:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    stale.append((rowid,))
+                    continue
+                    
+                if (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) != (dev, ino, size, mtime_ns):
+                    stale.append((rowid,))
+                    
+            with self._lock:
+                self._conn.executemany("DELETE FROM hashes WHERE rowid=?", stale)
+                self._conn.commit()
+                self._pending = 0
+            removed += len(stale)
+            
+        return removed
+        
+    def flush(self):
+        """提交尚未写入磁盘的记录"""
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+            
+    def close(self):
+        """提交并关闭索引"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+            
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
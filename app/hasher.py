@@ -2,9 +2,186 @@
 文件哈希计算器
 """
 
+import functools
 import hashlib
+import mmap
 import os
-from typing import Optional
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+from .hash_index import HashIndex
+from .instrumentation import ScanMetrics
+from .walker import FileRecord
+
+
+IO_STRATEGIES = ('auto', 'buffered', 'readinto', 'mmap')
+MMAP_THRESHOLD = 64 * 1024 * 1024  # auto 模式下大于该大小的文件使用 mmap
+# 自适应块大小: (文件大小上限, 块大小)，超出最后一档时使用 MAX_CHUNK_SIZE
+ADAPTIVE_CHUNK_SIZES = ((1024 * 1024, 64 * 1024), (64 * 1024 * 1024, 256 * 1024))
+MAX_CHUNK_SIZE = 1024 * 1024
+DEFAULT_CACHE_LIMIT = 64 * 1024 * 1024  # 内存哈希缓存默认上限（字节）
+
+_thread_buffers = threading.local()  # 每个线程复用的读取缓冲区
+
+
+def adaptive_chunk_size(file_size: int, base_chunk_size: int) -> int:
+    """根据文件大小选择读取块大小，不小于配置的基础块大小"""
+    for size_limit, chunk_size in ADAPTIVE_CHUNK_SIZES:
+        if file_size <= size_limit:
+            return max(base_chunk_size, chunk_size)
+    return max(base_chunk_size, MAX_CHUNK_SIZE)
+
+
+def _get_buffer(size: int) -> memoryview:
+    """获取当前线程的可复用缓冲区（至少 size 字节）"""
+    buffer = getattr(_thread_buffers, 'buffer', None)
+    if buffer is None or len(buffer) < size:
+        buffer = bytearray(size)
+        _thread_buffers.buffer = buffer
+    return memoryview(buffer)[:size]
+
+
+def _fadvise(fd: int, advice_name: str):
+    """调用 posix_fadvise，不支持的平台上静默跳过"""
+    advice = getattr(os, advice_name, None)
+    if advice is not None and hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, advice)
+        except OSError:
+            pass
+
+
+def update_from_file(hash_obj, file_path: str, io_strategy: str = 'auto', chunk_size: int = 8192,
+                     file_size: Optional[int] = None, drop_cache: bool = False):
+    """把整个文件内容送入哈希对象
+    
+    各策略得到的摘要完全相同，只是读取方式不同：
+    buffered 为原有的 f.read 循环；readinto 读入线程内复用的缓冲区，避免每块分配 bytes；
+    mmap 直接把映射交给 hashlib（大缓冲区哈希时会释放 GIL）；auto 按文件大小选择。
+    
+    Args:
+        hash_obj: hashlib 哈希对象
+        file_path: 文件路径
+        io_strategy: 读取策略 (auto, buffered, readinto, mmap)
+        chunk_size: 基础读取块大小
+        file_size: 已知的文件大小，None 时通过 fstat 获取
+        drop_cache: 读取完成后通知内核丢弃该文件的页缓存
+        
+    Returns:
+        读取的字节数
+    """
+    with open(file_path, 'rb', buffering=0) as f:
+        fd = f.fileno()
+        if file_size is None:
+            file_size = os.fstat(fd).st_size
+            
+        if io_strategy == 'auto':
+            io_strategy = 'mmap' if file_size >= MMAP_THRESHOLD else 'readinto'
+            
+        _fadvise(fd, 'POSIX_FADV_SEQUENTIAL')
+        
+        if io_strategy == 'mmap' and file_size > 0:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                hash_obj.update(mm)
+        elif io_strategy == 'buffered':
+            while chunk := f.read(chunk_size):
+                hash_obj.update(chunk)
+        else:
+            buffer = _get_buffer(adaptive_chunk_size(file_size, chunk_size))
+            while n := f.readinto(buffer):
+                hash_obj.update(buffer[:n])
+                
+        if drop_cache:
+            _fadvise(fd, 'POSIX_FADV_DONTNEED')
+            
+    return file_size
+
+
+class HashCache:
+    """按字节数限制容量的 LRU 哈希缓存
+    
+    键为 (设备号, inode, 大小, 修改时间纳秒) 打包成的定长 bytes，值为二进制摘要，
+    不再保存路径字符串。超出容量时淘汰最久未使用的条目。线程安全。
+    """
+    
+    ENTRY_OVERHEAD = 100  # 每个条目在 OrderedDict 中的估算额外开销（哈希表槽位与链表节点）
+    _KEY = struct.Struct('<QQQq')
+    
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_LIMIT):
+        """初始化缓存
+        
+        Args:
+            max_bytes: 缓存占用的估算字节数上限，0 表示不缓存
+        """
+        self.max_bytes = max(0, max_bytes)
+        self._entries: 'OrderedDict[bytes, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    @classmethod
+    def make_key(cls, dev: int, ino: int, size: int, mtime_ns: int) -> bytes:
+        """把文件元数据打包成缓存键"""
+        return cls._KEY.pack(dev, ino, size, mtime_ns)
+        
+    def _entry_bytes(self, key: bytes, digest: bytes) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(digest) + self.ENTRY_OVERHEAD
+        
+    def get(self, key: bytes) -> Optional[bytes]:
+        """查询摘要，命中时标记为最近使用"""
+        with self._lock:
+            digest = self._entries.get(key)
+            if digest is None:
+                self.misses += 1
+                return None
+                
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return digest
+            
+    def put(self, key: bytes, digest: bytes):
+        """写入摘要，必要时淘汰最久未使用的条目"""
+        entry_bytes = self._entry_bytes(key, digest)
+        if entry_bytes > self.max_bytes:
+            return
+            
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= self._entry_bytes(key, old)
+                
+            self._entries[key] = digest
+            self.current_bytes += entry_bytes
+            
+            while self.current_bytes > self.max_bytes:
+                old_key, old_digest = self._entries.popitem(last=False)
+                self.current_bytes -= self._entry_bytes(old_key, old_digest)
+                self.evictions += 1
+                
+    def clear(self):
+        """清空缓存（统计计数保留）"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            
+    def stats(self) -> dict:
+        """获取缓存统计"""
+        with self._lock:
+            return {
+                'cache_size': len(self._entries),
+                'cache_bytes': self.current_bytes,
+                'cache_limit': self.max_bytes,
+                'cache_hits': self.hits,
+                'cache_misses': self.misses,
+                'cache_evictions': self.evictions,
+            }
+            
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class FileHasher:
@@ -13,59 +190,175 @@ class FileHasher:
     SUPPORTED_ALGORITHMS = {
         'md5': hashlib.md5,
         'sha1': hashlib.sha1,
-        'sha256': hashlib.sha256
+        'sha256': hashlib.sha256,
+        'blake2b': hashlib.blake2b,
+        # 短摘要 BLAKE2b，无原生快速哈希库时用于候选阶段
+        'blake2b-128': functools.partial(hashlib.blake2b, digest_size=16),
+        'blake2b-64': functools.partial(hashlib.blake2b, digest_size=8),
     }
     
-    def __init__(self, algorithm: str = 'md5', chunk_size: int = 8192):
+    @classmethod
+    def register_algorithm(cls, name: str, factory: Callable[[], Any]):
+        """注册哈希算法
+        
+        Args:
+            name: 算法名称
+            factory: 无参可调用对象，返回支持 update/digest/hexdigest 的哈希对象。
+                进程池模式下工作进程需要能导入同样的注册代码。
+        """
+        cls.SUPPORTED_ALGORITHMS[name] = factory
+        
+    @classmethod
+    def available_algorithms(cls) -> List[str]:
+        """获取当前可用的哈希算法名称"""
+        return list(cls.SUPPORTED_ALGORITHMS.keys())
+    
+    def __init__(self, algorithm: str = 'md5', chunk_size: int = 8192, index: Optional[HashIndex] = None,
+                 io_strategy: str = 'auto', drop_cache: bool = False,
+                 cache_limit: int = DEFAULT_CACHE_LIMIT):
         """初始化哈希计算器
         
         Args:
-            algorithm: 哈希算法 (md5, sha1, sha256)
-            chunk_size: 文件读取块大小
+            algorithm: 哈希算法，见 available_algorithms()
+            chunk_size: 文件读取块大小（auto/readinto 策略下为自适应块大小的下限）
+            index: 可选的持久化哈希索引，命中时无需读取文件内容
+            io_strategy: 读取策略 (auto, buffered, readinto, mmap)
+            drop_cache: 完整哈希后丢弃文件页缓存，避免大规模扫描挤掉其他缓存
+            cache_limit: 内存哈希缓存的字节数上限，超出时按 LRU 淘汰
         """
         if algorithm not in self.SUPPORTED_ALGORITHMS:
             raise ValueError(f"不支持的哈希算法: {algorithm}")
+        if io_strategy not in IO_STRATEGIES:
+            raise ValueError(f"不支持的读取策略: {io_strategy}")
             
         self.algorithm = algorithm
         self.chunk_size = chunk_size
-        self._hash_cache = {}  # 哈希值缓存
+        self.io_strategy = io_strategy
+        self.drop_cache = drop_cache
+        self._hash_cache = HashCache(cache_limit)  # 哈希值缓存
+        self.index = index
+        self.metrics: Optional[ScanMetrics] = None  # 扫描期间由 FileScanner 设置，记录读取量与命中率
+        
+    def record_read(self, nbytes: int, files: int = 1):
+        """记录读取的字节数和打开的文件数（未设置 metrics 时忽略）"""
+        if self.metrics is not None:
+            self.metrics.count('bytes_read', nbytes)
+            self.metrics.count('files_opened', files)
+            
+    def record_error(self, error: BaseException):
+        """按类型记录读取错误（未设置 metrics 时忽略）"""
+        if self.metrics is not None:
+            self.metrics.record_error(error)
+        
+    @staticmethod
+    def _file_key(file_path: str, record: Optional[FileRecord] = None) -> Optional[Tuple[int, int, int, int]]:
+        """获取文件的 (设备号, inode, 大小, 修改时间纳秒)，优先使用遍历时采集的记录
+        
+        Windows 上 os.scandir 的 DirEntry.stat() 不提供 inode（为 0），此时改用
+        os.stat 取得真实的文件编号。仍拿不到 inode 时返回 None，不使用缓存：
+        否则大小和修改时间相同的不同文件会共用同一个键。
+        """
+        if record is not None and record.inode:
+            return record.dev, record.inode, record.size, record.mtime_ns
+            
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            # 文件无法访问，由随后的读取报告错误
+            return None
+        if not file_stat.st_ino:
+            return None
+        if record is not None and record.mtime_ns is not None:
+            # 大小和修改时间仍以扫描时的记录为准，与读取时核对的内容一致
+            return file_stat.st_dev, file_stat.st_ino, record.size, record.mtime_ns
+        return file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns
         
-    def calculate_hash(self, file_path: str) -> Optional[str]:
+    def get_cached_hash(self, file_path: str, record: Optional[FileRecord] = None) -> Optional[str]:
+        """从内存缓存或持久化索引中查询哈希值，不读取文件内容
+        
+        Args:
+            file_path: 文件路径
+            record: 可选的文件记录，提供时不再 stat 文件
+            
+        Returns:
+            已知的哈希值，未命中返回 None
+        """
+        file_key = self._file_key(file_path, record)
+        if file_key is None:
+            return None
+        dev, ino, size, mtime_ns = file_key
+        cache_key = HashCache.make_key(dev, ino, size, mtime_ns)
+        
+        metrics = self.metrics
+        digest = self._hash_cache.get(cache_key)
+        if digest is not None:
+            if metrics is not None:
+                metrics.count('cache_hits')
+            return digest.hex()
+            
+        if self.index is not None:
+            file_hash = self.index.get(dev, ino, size, mtime_ns, self.algorithm)
+            if file_hash:
+                self._hash_cache.put(cache_key, bytes.fromhex(file_hash))
+                if metrics is not None:
+                    metrics.count('index_hits')
+                return file_hash
+                
+        if metrics is not None:
+            metrics.count('cache_misses')
+        return None
+        
+    def store_hash(self, file_path: str, file_hash: str, record: Optional[FileRecord] = None):
+        """把计算得到的哈希值写入内存缓存和持久化索引
+        
+        Args:
+            file_path: 文件路径
+            file_hash: 哈希值
+            record: 可选的文件记录，提供时不再 stat 文件
+        """
+        file_key = self._file_key(file_path, record)
+        if file_key is None:
+            return
+        dev, ino, size, mtime_ns = file_key
+        self._hash_cache.put(HashCache.make_key(dev, ino, size, mtime_ns), bytes.fromhex(file_hash))
+        if self.index is not None:
+            self.index.put(dev, ino, size, mtime_ns, self.algorithm, file_hash, file_path)
+            
+    def calculate_hash(self, file_path: str, record: Optional[FileRecord] = None) -> Optional[str]:
         """计算文件的哈希值
         
         Args:
             file_path: 文件路径
+            record: 可选的文件记录，提供时不再 stat 文件
             
         Returns:
             文件的哈希值，如果计算失败返回 None
         """
         try:
             # 检查缓存
-            file_stat = os.stat(file_path)
-            cache_key = f"{file_path}:{file_stat.st_mtime}:{file_stat.st_size}"
-            
-            if cache_key in self._hash_cache:
-                return self._hash_cache[cache_key]
+            file_hash = self.get_cached_hash(file_path, record)
+            if file_hash:
+                return file_hash
                 
             # 计算哈希值
             hash_obj = self.SUPPORTED_ALGORITHMS[self.algorithm]()
-            
-            with open(file_path, 'rb') as f:
-                while chunk := f.read(self.chunk_size):
-                    hash_obj.update(chunk)
-                    
+            nbytes = update_from_file(hash_obj, file_path, self.io_strategy, self.chunk_size,
+                                      record.size if record is not None else None, self.drop_cache)
+            self.record_read(nbytes)
             file_hash = hash_obj.hexdigest()
             
             # 缓存结果
-            self._hash_cache[cache_key] = file_hash
+            self.store_hash(file_path, file_hash, record)
             
             return file_hash
             
         except (OSError, IOError) as e:
             print(f"无法读取文件 {file_path}: {e}")
+            self.record_error(e)
             return None
         except Exception as e:
             print(f"计算哈希值时出错 {file_path}: {e}")
+            self.record_error(e)
             return None
             
     def calculate_partial_hash(self, file_path: str, max_bytes: int = 1024 * 1024) -> Optional[str]:
@@ -93,13 +386,70 @@ class FileHasher:
                     hash_obj.update(chunk)
                     bytes_read += len(chunk)
                     
+            self.record_read(bytes_read)
             return hash_obj.hexdigest()
             
         except (OSError, IOError) as e:
             print(f"无法读取文件 {file_path}: {e}")
+            self.record_error(e)
             return None
         except Exception as e:
             print(f"计算部分哈希值时出错 {file_path}: {e}")
+            self.record_error(e)
+            return None
+            
+    def calculate_sample_hash(self, file_path: str, file_size: int, sample_size: int = 64 * 1024,
+                              record: Optional[FileRecord] = None) -> Optional[str]:
+        """计算文件的抽样哈希值（头部、中部、尾部各取一段）
+        
+        用于在完整哈希之前快速淘汰内容不同的同大小文件。文件不大于三段
+        抽样总长时，直接读取整个文件。
+        
+        Args:
+            file_path: 文件路径
+            file_size: 文件大小（由调用方提供，避免重复 stat）
+            sample_size: 每段读取的字节数
+            record: 可选的文件记录，提供时不再 stat 文件
+            
+        Returns:
+            文件的抽样哈希值
+        """
+        if file_size <= sample_size * 3:
+            return self.calculate_partial_hash(file_path, file_size)
+            
+        try:
+            # 抽样哈希同样记入索引，以算法名加抽样长度区分
+            index_algorithm = f"{self.algorithm}/sample{sample_size}"
+            file_key = None
+            if self.index is not None:
+                file_key = self._file_key(file_path, record)
+            if file_key is not None:
+                sample_hash = self.index.get(*file_key, index_algorithm)
+                if sample_hash:
+                    return sample_hash
+                    
+            hash_obj = self.SUPPORTED_ALGORITHMS[self.algorithm]()
+            offsets = (0, (file_size - sample_size) // 2, file_size - sample_size)
+            
+            with open(file_path, 'rb') as f:
+                for offset in offsets:
+                    f.seek(offset)
+                    hash_obj.update(f.read(sample_size))
+                    
+            self.record_read(sample_size * len(offsets))
+            sample_hash = hash_obj.hexdigest()
+            if file_key is not None:
+                self.index.put(*file_key, index_algorithm, sample_hash, file_path)
+                
+            return sample_hash
+            
+        except (OSError, IOError) as e:
+            print(f"无法读取文件 {file_path}: {e}")
+            self.record_error(e)
+            return None
+        except Exception as e:
+            print(f"计算抽样哈希值时出错 {file_path}: {e}")
+            self.record_error(e)
             return None
             
     def clear_cache(self):
@@ -115,6 +465,61 @@ class FileHasher:
         return {
             'algorithm': self.algorithm,
             'chunk_size': self.chunk_size,
-            'cache_size': self.get_cache_size(),
-            'supported_algorithms': list(self.SUPPORTED_ALGORITHMS.keys())
-        }
\ No newline at end of file
+            'io_strategy': self.io_strategy,
+            'drop_cache': self.drop_cache,
+            **self._hash_cache.stats(),
+            'index_path': self.index.db_path if self.index is not None else None,
+            'supported_algorithms': self.available_algorithms()
+        }
+
+
+# 可选的原生快速哈希库（pip install xxhash / blake3），未安装时只提供 hashlib 算法
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+if xxhash is not None:
+    FileHasher.register_algorithm('xxh64', xxhash.xxh64)
+    if hasattr(xxhash, 'xxh3_64'):
+        FileHasher.register_algorithm('xxh3_64', xxhash.xxh3_64)
+        FileHasher.register_algorithm('xxh3_128', xxhash.xxh3_128)
+
+if blake3 is not None:
+    FileHasher.register_algorithm('blake3', blake3.blake3)
+
+
+def hash_files(algorithm: str, chunk_size: int, file_paths: List[str],
+               io_strategy: str = 'auto', drop_cache: bool = False) -> List[Optional[bytes]]:
+    """批量计算文件摘要（供进程池调用）
+    
+    在工作进程中运行，不使用缓存和索引；以二进制摘要返回，减少进程间传输量。
+    
+    Args:
+        algorithm: 哈希算法
+        chunk_size: 文件读取块大小
+        file_paths: 文件路径列表
+        io_strategy: 读取策略
+        drop_cache: 读取后丢弃页缓存
+        
+    Returns:
+        与 file_paths 一一对应的二进制摘要，读取失败的位置为 None
+    """
+    hash_func = FileHasher.SUPPORTED_ALGORITHMS[algorithm]
+    digests = []
+    
+    for file_path in file_paths:
+        try:
+            hash_obj = hash_func()
+            update_from_file(hash_obj, file_path, io_strategy, chunk_size, drop_cache=drop_cache)
+            digests.append(hash_obj.digest())
+        except (OSError, IOError) as e:
+            print(f"无法读取文件 {file_path}: {e}")
+            digests.append(None)
+            
+    return digests
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+扫描度量 - 记录各阶段耗时、读取量、缓存命中、错误分类和工作线程忙闲
+"""
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+PROFILE_MODES = ('cpu', 'memory', 'all')
+
+
+class ScanMetrics:
+    """一次扫描的度量数据
+    
+    遍历器、哈希计算器和调度器在扫描过程中并发写入，所有修改都持有锁。
+    扫描进行中也可以随时调用 to_dict() 读取当前值（Web 状态接口即如此）。
+    
+    计数器（counters）：
+        bytes_read / files_opened: 实际读取的字节数与打开的文件数（含抽样与逐块比较）
+        cache_hits / index_hits / cache_misses: 内存缓存、持久化索引命中与均未命中的次数
+        dirs_read / dirs_reused / files_stat: 读取的目录数、从快照复用的目录数、stat 的文件数
+        
+    profile 为 cpu / memory / all 时分别启用 cProfile / tracemalloc / 两者：cProfile 覆盖
+    调用扫描的线程和哈希调度器的工作线程（Python 3.12 起同一时间只允许一个 cProfile，
+    此时只剖析调用线程）；tracemalloc 记录峰值与分配最多的代码行。
+    """
+    
+    PROFILE_TOP = 25  # cProfile 报告的函数数
+    MEMORY_TOP = 10  # tracemalloc 报告的代码行数
+    
+    def __init__(self, profile: Optional[str] = None):
+        """初始化度量
+        
+        Args:
+            profile: 剖析模式，None / cpu / memory / all
+        """
+        if profile is not None and profile not in PROFILE_MODES:
+            raise ValueError(f"不支持的剖析模式: {profile}")
+            
+        self.profile = profile
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {
+            'bytes_read': 0, 'files_opened': 0,
+            'cache_hits': 0, 'index_hits': 0, 'cache_misses': 0,
+            'dirs_read': 0, 'dirs_reused': 0, 'files_stat': 0,
+        }
+        self.errors_by_type: Dict[str, int] = {}
+        self.workers: Dict[str, Dict[str, float]] = {}
+        self.cpu_profile: Optional[str] = None
+        self.memory_profile: Optional[Dict] = None
+        
+        self._lock = threading.Lock()
+        self._profilers: List[cProfile.Profile] = []
+        self._main_profiler: Optional[cProfile.Profile] = None
+        self._started_tracemalloc = False
+        
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """累计代码块耗时到指定阶段（同一阶段可多次进入，如流式扫描的每一批）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+                
+    def count(self, name: str, n: int = 1):
+        """增加计数器"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            
+    def record_error(self, error: BaseException):
+        """按异常类型统计错误"""
+        name = type(error).__name__
+        with self._lock:
+            self.errors_by_type[name] = self.errors_by_type.get(name, 0) + 1
+            
+    def record_worker(self, name: str, busy: float, idle: float, tasks: int):
+        """累计工作线程的忙碌时间、空闲时间和处理的任务数"""
+        with self._lock:
+            stats = self.workers.setdefault(name, {'busy': 0.0, 'idle': 0.0, 'tasks': 0})
+            stats['busy'] += busy
+            stats['idle'] += idle
+            stats['tasks'] += tasks
+            
+    @contextmanager
+    def profile_thread(self) -> Iterator[None]:
+        """在当前线程启用 cProfile（未开启 CPU 剖析时不做任何事）"""
+        if self.profile not in ('cpu', 'all'):
+            yield
+            return
+            
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 已有其他剖析器在运行（Python 3.12+ 同一时间只允许一个）
+            yield
+            return
+            
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._profilers.append(profiler)
+                
+    def start_profiling(self):
+        """扫描开始时调用：在调用线程启用 cProfile，并按需启动 tracemalloc"""
+        if self.profile in ('memory', 'all') and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+            
+        if self.profile in ('cpu', 'all'):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self._main_profiler = profiler
+            except ValueError:
+                pass
+                
+    def stop_profiling(self):
+        """扫描结束时调用：汇总 cProfile 报告与 tracemalloc 快照"""
+        if self._main_profiler is not None:
+            self._main_profiler.disable()
+            self._profilers.append(self._main_profiler)
+            self._main_profiler = None
+            
+        if self._profilers:
+            output = io.StringIO()
+            stats = pstats.Stats(*self._profilers, stream=output)
+            stats.sort_stats('cumulative').print_stats(self.PROFILE_TOP)
+            self.cpu_profile = output.getvalue()
+            self._profilers = []
+            
+        if self._started_tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+            self.memory_profile = {
+                'current': current,
+                'peak': peak,
+                'top': [str(stat) for stat in snapshot.statistics('lineno')[:self.MEMORY_TOP]],
+            }
+            
+    def to_dict(self) -> Dict:
+        """转换为可序列化为 JSON 的字典"""
+        with self._lock:
+            return {
+                'phases': dict(self.phases),
+                'counters': dict(self.counters),
+                'errors_by_type': dict(self.errors_by_type),
+                'workers': {name: dict(stats) for name, stats in self.workers.items()},
+                'cpu_profile': self.cpu_profile,
+                'memory_profile': self.memory_profile,
+            }
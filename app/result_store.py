@@ -0,0 +1,286 @@
+"""
+扫描结果存储 - 重复组落盘，按需分页查询
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+from .walker import FileRecord
+
+
+class ResultStore:
+    """基于 SQLite 的重复组结果存储
+    
+    扫描过程中逐组写入，内存中不保留完整结果；查询时按条件过滤并分页返回。
+    写入时可附带组内文件扫描时的元数据（修改时间、inode、设备号），
+    生成报告时由 iter_records 读回，不必再 stat 文件。
+    未指定路径时使用临时文件，关闭后自动删除。
+    """
+    
+    COMMIT_INTERVAL = 500  # 累积多少组后提交一次
+    LOOKUP_CHUNK = 500  # 按路径查询时每条 SQL 的参数个数（低于 SQLite 的参数上限）
+    SORT_KEYS = {
+        'wasted': 'size * (file_count - 1) DESC',
+        'size': 'size DESC',
+        'files': 'file_count DESC',
+    }
+    
+    def __init__(self, db_path: Optional[str] = None, cache_bytes: Optional[int] = None):
+        """打开（或创建）结果存储
+        
+        Args:
+            db_path: 数据库文件路径，None 表示使用临时文件
+            cache_bytes: SQLite 页缓存上限（字节），None 表示使用 SQLite 默认值
+        """
+        self._temporary = db_path is None
+        if db_path is None:
+            fd, db_path = tempfile.mkstemp(prefix='duplicate_results_', suffix='.db')
+            os.close(fd)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        if cache_bytes is not None:
+            # 负数表示以 KiB 为单位
+            self._conn.execute(f"PRAGMA cache_size=-{max(1, cache_bytes // 1024)}")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS groups (
+                id INTEGER PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                file_count INTEGER NOT NULL,
+                paths TEXT NOT NULL,
+                meta TEXT
+            );
+            CREATE TABLE IF NOT EXISTS group_files (
+                group_id INTEGER NOT NULL,
+                path TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_groups_size ON groups (size);
+            CREATE INDEX IF NOT EXISTS idx_group_files_path ON group_files (path);
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(groups)")}
+        if 'meta' not in columns:
+            # 旧版本创建的结果库没有元数据列
+            self._conn.execute("ALTER TABLE groups ADD COLUMN meta TEXT")
+        self._conn.commit()
+        
+    def add(self, digest: str, size: int, paths: List[str], records: Optional[List[FileRecord]] = None):
+        """写入一个重复组
+        
+        Args:
+            digest: 摘要
+            size: 单个文件大小
+            paths: 路径列表
+            records: 可选，与 paths 一一对应的扫描时文件元数据
+        """
+        meta = None
+        if records is not None:
+            meta = json.dumps([[record.mtime_ns, record.inode, record.dev] for record in records])
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO groups (digest, size, file_count, paths, meta) VALUES (?, ?, ?, ?, ?)",
+                (digest, size, len(paths), json.dumps(paths, ensure_ascii=False), meta)
+            )
+            self._conn.executemany(
+                "INSERT INTO group_files VALUES (?, ?)",
+                ((cursor.lastrowid, path) for path in paths)
+            )
+            self._pending += 1
+            if self._pending >= self.COMMIT_INTERVAL:
+                self._conn.commit()
+                self._pending = 0
+                
+    def query(self, offset: int = 0, limit: int = 50, min_size: Optional[int] = None,
+              max_size: Optional[int] = None, path_prefix: Optional[str] = None,
+              min_files: Optional[int] = None, sort: str = 'wasted') -> List[Dict]:
+        """按条件分页查询重复组
+        
+        Args:
+            offset: 跳过的组数
+            limit: 返回的最大组数
+            min_size: 单个文件最小大小
+            max_size: 单个文件最大大小
+            path_prefix: 组内至少有一个文件路径以此开头
+            min_files: 组内最少文件数
+            sort: 排序方式，wasted（可释放空间）/ size / files
+            
+        Returns:
+            [{'hash': 摘要, 'size': 单个文件大小, 'files': 路径列表}, ...]
+        """
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"不支持的排序方式: {sort}")
+            
+        where, params = self._build_filter(min_size, max_size, path_prefix, min_files)
+        sql = (f"SELECT digest, size, paths FROM groups {where} "
+               f"ORDER BY {self.SORT_KEYS[sort]}, id LIMIT ? OFFSET ?")
+        with self._lock:
+            rows = self._conn.execute(sql, params + [max(0, limit), max(0, offset)]).fetchall()
+            
+        return [{'hash': digest, 'size': size, 'files': json.loads(paths)} for digest, size, paths in rows]
+        
+    def count(self, min_size: Optional[int] = None, max_size: Optional[int] = None,
+              path_prefix: Optional[str] = None, min_files: Optional[int] = None) -> int:
+        """统计满足条件的重复组数"""
+        where, params = self._build_filter(min_size, max_size, path_prefix, min_files)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM groups {where}", params).fetchone()[0]
+            
+    def summary(self) -> Dict[str, int]:
+        """汇总全部重复组：组数、文件数、可释放空间"""
+        with self._lock:
+            groups, files, wasted = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(file_count), 0), COALESCE(SUM(size * (file_count - 1)), 0) "
+                "FROM groups"
+            ).fetchone()
+        return {'groups': groups, 'files': files, 'wasted_space': wasted}
+        
+    def iter_groups(self, batch_size: int = 1000) -> Iterator[Tuple[str, List[str]]]:
+        """按写入顺序逐组产出 (摘要, 路径列表)，每次只从数据库读取一批"""
+        for digest, paths in self._iter_rows("digest, paths", batch_size):
+            yield digest, json.loads(paths)
+            
+    def iter_records(self, batch_size: int = 1000,
+                     sort: Optional[str] = None) -> Iterator[Tuple[str, int, List[FileRecord]]]:
+        """逐组产出 (摘要, 单个文件大小, FileRecord 列表)，供报告生成使用
+        
+        写入时未附带元数据的组，修改时间、inode 和设备号为 None。
+        
+        Args:
+            batch_size: 每次从数据库读取的组数
+            sort: None 表示按写入顺序，否则同 query 的排序方式（wasted / size / files）
+        """
+        if sort is not None and sort not in self.SORT_KEYS:
+            raise ValueError(f"不支持的排序方式: {sort}")
+            
+        for digest, size, paths, meta in self._iter_rows("digest, size, paths, meta", batch_size, sort):
+            paths = json.loads(paths)
+            meta = json.loads(meta) if meta else [(None, None, None)] * len(paths)
+            yield digest, size, [FileRecord(path, size, mtime_ns, inode, dev)
+                                 for path, (mtime_ns, inode, dev) in zip(paths, meta)]
+                                 
+    def lookup_records(self, paths: List[str]) -> Dict[str, FileRecord]:
+        """查询指定文件扫描时的元数据，供删除/移动操作按设备分组，不在结果中的路径不返回
+        
+        Args:
+            paths: 文件路径列表
+        """
+        records = {}
+        for start in range(0, len(paths), self.LOOKUP_CHUNK):
+            chunk = paths[start:start + self.LOOKUP_CHUNK]
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT group_files.path, groups.size, groups.paths, groups.meta FROM group_files "
+                    "JOIN groups ON groups.id = group_files.group_id "
+                    f"WHERE group_files.path IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+            for path, size, group_paths, meta in rows:
+                mtime_ns = inode = dev = None
+                if meta:
+                    mtime_ns, inode, dev = json.loads(meta)[json.loads(group_paths).index(path)]
+                records[path] = FileRecord(path, size, mtime_ns, inode, dev)
+        return records
+        
+    def group_ids(self, paths: List[str]) -> Dict[str, int]:
+        """查询文件所在重复组的编号，不在结果中的路径不返回
+        
+        Args:
+            paths: 文件路径列表
+        """
+        ids = {}
+        for start in range(0, len(paths), self.LOOKUP_CHUNK):
+            chunk = paths[start:start + self.LOOKUP_CHUNK]
+            with self._lock:
+                ids.update(self._conn.execute(
+                    f"SELECT path, group_id FROM group_files WHERE path IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall())
+        return ids
+        
+    def _iter_rows(self, columns: str, batch_size: int, sort: Optional[str] = None) -> Iterator[tuple]:
+        """分批读取 groups 表的指定列
+        
+        按写入顺序时以 id 续读，每批一次短查询；排序时用单独的游标执行一次排序查询
+        再分批取出，避免 OFFSET 分页反复排序。
+        """
+        if sort is None:
+            last_id = 0
+            while True:
+                with self._lock:
+                    rows = self._conn.execute(
+                        f"SELECT id, {columns} FROM groups WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, batch_size)
+                    ).fetchall()
+                if not rows:
+                    return
+                last_id = rows[-1][0]
+                for row in rows:
+                    yield row[1:]
+            return
+            
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT {columns} FROM groups ORDER BY {self.SORT_KEYS[sort]}, id")
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+            
+    def flush(self):
+        """提交尚未写入磁盘的组"""
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+            
+    def close(self):
+        """关闭存储，临时文件随之删除"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+            
+        if self._temporary:
+            for suffix in ('', '-wal', '-shm'):
+                try:
+                    os.remove(self.db_path + suffix)
+                except OSError:
+                    pass
+                    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM groups").fetchone()[0]
+            
+    @staticmethod
+    def _build_filter(min_size: Optional[int], max_size: Optional[int], path_prefix: Optional[str],
+                      min_files: Optional[int]) -> Tuple[str, List]:
+        """构造 WHERE 子句"""
+        clauses = []
+        params = []
+        
+        if min_size is not None:
+            clauses.append("size >= ?")
+            params.append(min_size)
+        if max_size is not None:
+            clauses.append("size <= ?")
+            params.append(max_size)
+        if min_files is not None:
+            clauses.append("file_count >= ?")
+            params.append(min_files)
+        if path_prefix:
+            # 用区间比较代替 LIKE，可以利用路径索引且不需要转义通配符
+            clauses.append("id IN (SELECT group_id FROM group_files WHERE path >= ? AND path < ?)")
+            params.extend([path_prefix, path_prefix + '\U0010ffff'])
+            
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
@@ -2,14 +2,24 @@
 文件扫描器 - 核心扫描引擎
 """
 
+import json
 import os
 import time
 import threading
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, List, Set, Optional, Callable
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Set, Optional, Callable, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from .hasher import FileHasher
+from .async_engine import AsyncHashEngine
+from .catalog import FileCatalog
+from .hasher import DEFAULT_CACHE_LIMIT, FileHasher, adaptive_chunk_size, hash_files
+from .hash_index import HashIndex
+from .instrumentation import PROFILE_MODES, ScanMetrics
+from .scheduler import HashScheduler, physical_offset
+from .result_store import ResultStore
+from .snapshot import TreeSnapshot
+from .walker import DirectoryWalker, FileRecord
 from .utils import FileUtils
 
 
@@ -21,24 +31,60 @@ class ScanResult:
     duplicate_groups: Dict[str, List[str]] = None
     scan_time: float = 0.0
     errors: List[str] = None
+    stage_stats: Dict[str, int] = None  # 各淘汰阶段后幸存的文件数
+    group_sizes: Dict[str, int] = None  # 每个重复组的单个文件大小
+    hardlink_groups: Dict[str, List[str]] = None  # "设备号:inode" -> 指向同一 inode 的所有路径
+    hardlink_sizes: Dict[str, int] = None  # "设备号:inode" -> 扫描时的文件大小
+    delta: Optional[Dict] = None  # 增量扫描时相对上次快照的变化，完整扫描时为 None
+    metrics: Optional[ScanMetrics] = None  # 各阶段耗时、读取量、缓存命中、错误分类与工作线程忙闲
+    file_records: Dict[str, FileRecord] = None  # 重复组内各文件扫描时的元数据，生成报告时不必再 stat
     
     def __post_init__(self):
         if self.duplicate_groups is None:
             self.duplicate_groups = {}
         if self.errors is None:
             self.errors = []
+        if self.stage_stats is None:
+            self.stage_stats = {'size': 0, 'sample': 0, 'full': 0}
+        if self.group_sizes is None:
+            self.group_sizes = {}
+        if self.hardlink_groups is None:
+            self.hardlink_groups = {}
+        if self.hardlink_sizes is None:
+            self.hardlink_sizes = {}
+        if self.file_records is None:
+            self.file_records = {}
 
 
 @dataclass
 class ScanConfig:
     """扫描配置"""
-    algorithm: str = "md5"  # md5, sha1, sha256
+    algorithm: str = "md5"  # 候选阶段哈希算法，见 FileHasher.available_algorithms()
+    verify_algorithm: Optional[str] = None  # 报告前用该算法复核重复组（如 sha256），None 表示不复核
     min_size: int = 1024  # 最小文件大小（字节）
     max_size: Optional[int] = None  # 最大文件大小（字节）
     extensions: Optional[Set[str]] = None  # 允许的文件扩展名
     exclude_dirs: Set[str] = None  # 排除的目录
-    threads: int = 4  # 扫描线程数
+    threads: int = 4  # 扫描线程数（自适应模式下为初始并发数）
+    adaptive_threads: bool = False  # 按设备根据实测吞吐量自动调整并发数
+    max_threads: int = 32  # 自适应模式下每个设备的并发上限
+    io_order: str = "auto"  # 设备队列内的读取顺序: auto（机械硬盘按物理位置）, size, inode, physical
+    walk_threads: int = 4  # 目录遍历线程数，1 表示单线程遍历
     chunk_size: int = 8192  # 文件读取块大小
+    io_strategy: str = "auto"  # 读取策略: auto, buffered, readinto, mmap
+    drop_cache: bool = False  # 完整哈希后丢弃文件页缓存
+    executor: str = "thread"  # 完整哈希执行方式: thread（线程池）, process（进程池）, async（异步引擎）
+    process_batch_size: int = 64  # 进程池模式下每批提交的文件数
+    async_open_files: int = 64  # async 模式下同时处理的文件数
+    max_inflight_bytes: int = 64 * 1024 * 1024  # async 模式下在途读取字节数上限
+    sample_size: int = 64 * 1024  # 抽样哈希每段读取字节数（头/中/尾）
+    compare_max_files: int = 3  # 不超过该文件数的候选组改为逐块比较，0 表示禁用
+    compare_min_size: int = 1024 * 1024  # 逐块比较的最小文件大小（小文件哈希更划算且可缓存）
+    index_path: Optional[str] = None  # 持久化哈希索引路径，None 表示不使用
+    snapshot_path: Optional[str] = None  # 增量扫描快照路径，None 表示每次完整扫描
+    stream_batch_files: int = 10000  # 流式扫描时每批处理的候选文件数
+    memory_limit: Optional[int] = None  # 内存预算（字节），分配给哈希缓存、结果存储缓存和流式批次
+    profile: Optional[str] = None  # 扫描期间剖析: cpu（cProfile）, memory（tracemalloc）, all，None 表示不剖析
     
     def __post_init__(self):
         if self.exclude_dirs is None:
@@ -48,17 +94,47 @@ class ScanConfig:
 class FileScanner:
     """文件扫描器"""
     
+    # 配置 memory_limit 时各部分所占的比例
+    CACHE_MEMORY_SHARE = 0.25  # 内存哈希缓存（有复核算法时两个哈希器平分）
+    STORE_MEMORY_SHARE = 0.125  # 结果存储的 SQLite 页缓存
+    BATCH_MEMORY_SHARE = 0.5  # 流式扫描单批候选文件的工作集
+    BATCH_FILE_BYTES = 512  # 单个候选文件在哈希阶段的估算内存开销
+    
     def __init__(self, config: ScanConfig = None):
         self.config = config or ScanConfig()
-        self.hasher = FileHasher(self.config.algorithm, self.config.chunk_size)
+        self.index = HashIndex(self.config.index_path) if self.config.index_path else None
+        
+        verify = bool(self.config.verify_algorithm and self.config.verify_algorithm != self.config.algorithm)
+        cache_limit = DEFAULT_CACHE_LIMIT
+        if self.config.memory_limit is not None:
+            cache_limit = int(self.config.memory_limit * self.CACHE_MEMORY_SHARE) // (2 if verify else 1)
+            
+        self.hasher = FileHasher(self.config.algorithm, self.config.chunk_size, self.index,
+                                 self.config.io_strategy, self.config.drop_cache, cache_limit)
+        self.verify_hasher = None
+        if verify:
+            self.verify_hasher = FileHasher(self.config.verify_algorithm, self.config.chunk_size, self.index,
+                                            self.config.io_strategy, self.config.drop_cache, cache_limit)
         self._stop_event = threading.Event()
         self._progress_callback: Optional[Callable] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._catalog: Optional[FileCatalog] = None
+        
+        self._disk_offsets: Dict[int, tuple] = {}
+        self._metrics: Optional[ScanMetrics] = None
+        
+        if self.config.executor not in ('thread', 'process', 'async'):
+            raise ValueError(f"不支持的执行方式: {self.config.executor}")
+        if self.config.io_order not in ('auto', 'size', 'inode', 'physical'):
+            raise ValueError(f"不支持的读取顺序: {self.config.io_order}")
+        if self.config.profile is not None and self.config.profile not in PROFILE_MODES:
+            raise ValueError(f"不支持的剖析模式: {self.config.profile}")
         
     def set_progress_callback(self, callback: Callable[[int, int, str], None]):
         """设置进度回调函数
         
         Args:
-            callback: 回调函数，参数为 (当前进度, 总数, 当前文件)
+            callback: 回调函数，参数为 (已处理字节数, 总字节数, 当前阶段说明)
         """
         self._progress_callback = callback
         
@@ -77,174 +153,751 @@ class FileScanner:
         """
         start_time = time.time()
         result = ScanResult()
+        self._begin_metrics(result)
         
         try:
-            # 收集所有文件
-            files = self._collect_files(directory)
-            if not files:
-                return result
-                
-            result.total_files = len(files)
-            result.total_size = sum(os.path.getsize(f) for f in files)
+            # 增量模式：加载上次快照（配置不同则视为首次扫描），并记录本次遍历结果
+            previous = current = None
+            if self.config.snapshot_path:
+                with self._phase('snapshot'):
+                    fingerprint = self._snapshot_fingerprint(directory)
+                    previous = TreeSnapshot.load(self.config.snapshot_path, fingerprint)
+                    current = TreeSnapshot(fingerprint)
+                    
+            size_groups = self._prepare_size_groups(directory, result, previous, current)
+            if result.total_files or current is not None:
+                if previous is None:
+                    # 计算哈希值并找出重复文件
+                    result.duplicate_groups = self._find_duplicates(size_groups, result)
+                else:
+                    # 只重新比较受变化文件影响的大小类别，其余沿用上次的重复组
+                    self._find_duplicates_incremental(size_groups, previous, current, result)
+                    
+            if current is not None and not self._stop_event.is_set():
+                with self._phase('snapshot'):
+                    current.duplicate_groups = result.duplicate_groups
+                    current.group_sizes = result.group_sizes
+                    current.save(self.config.snapshot_path)
+                    
+        except Exception as e:
+            result.errors.append(f"扫描错误: {str(e)}")
+            result.metrics.record_error(e)
             
-            # 按文件大小分组
-            size_groups = self._group_by_size(files)
+        self._end_scan(result, start_time)
+        return result
+        
+    def iter_duplicates(self, directory: str, result: Optional[ScanResult] = None) -> Iterator[Tuple[str, List[str]]]:
+        """流式扫描目录，逐组产出已确认的重复文件
+        
+        大小类别按文件大小从大到小分批（每批约 stream_batch_files 个候选文件）
+        经过抽样、完整哈希等阶段，每批完成即产出该批的重复组，
+        调用方可以边扫描边写入 ResultStore，完整结果不必同时驻留内存。
+        
+        增量扫描需要上次的全部重复组，配置了 snapshot_path 时退化为
+        scan_directory 完成后再逐组产出。
+        
+        Args:
+            directory: 要扫描的目录路径
+            result: 可选，用于接收统计信息；duplicate_groups 不会被填充，
+                    file_records 只保留当前批次产出的重复组的文件元数据
             
-            # 计算哈希值并找出重复文件
-            result.duplicate_groups = self._find_duplicates(size_groups)
+        Yields:
+            (哈希值, 重复文件路径列表)
+        """
+        result = result if result is not None else ScanResult()
+        
+        if self.config.snapshot_path:
+            scanned = self.scan_directory(directory)
+            result.__dict__.update(scanned.__dict__)
+            duplicate_groups, result.duplicate_groups = result.duplicate_groups, {}
+            yield from duplicate_groups.items()
+            return
             
+        start_time = time.time()
+        progress_callback = self._progress_callback
+        self._begin_metrics(result)
+        
+        try:
+            size_groups = self._prepare_size_groups(directory, result)
+            batches = self._batch_size_groups(size_groups)
+            del size_groups
+            
+            for i, batch in enumerate(batches, 1):
+                if self._stop_event.is_set():
+                    break
+                    
+                if progress_callback is not None:
+                    self._progress_callback = (
+                        lambda current, total, message, i=i:
+                        progress_callback(current, total, f"[{i}/{len(batches)}] {message}")
+                    )
+                    
+                result.file_records.clear()
+                duplicate_groups = self._find_duplicates(batch, result)
+                batches[i - 1] = None  # 处理完的批次及时释放
+                yield from duplicate_groups.items()
+                
         except Exception as e:
             result.errors.append(f"扫描错误: {str(e)}")
+            result.metrics.record_error(e)
+        finally:
+            self._progress_callback = progress_callback
+            self._end_scan(result, start_time)
+            
+    def _begin_metrics(self, result: ScanResult):
+        """为本次扫描创建度量，挂到结果和哈希计算器上，并按配置开始剖析"""
+        self._metrics = result.metrics = ScanMetrics(self.config.profile)
+        self.hasher.metrics = self._metrics
+        if self.verify_hasher is not None:
+            self.verify_hasher.metrics = self._metrics
+        self._metrics.start_profiling()
+        
+    def _end_scan(self, result: ScanResult, start_time: float):
+        """扫描结束：写入索引、释放目录表、停止剖析并记录总耗时"""
+        if self.index is not None:
+            self.index.flush()
             
+        # 在释放目录表之前停止剖析，内存快照能反映扫描期间的主要分配
+        self._metrics.stop_profiling()
+        self._catalog = None
+        self._disk_offsets.clear()
+        self.hasher.metrics = None
+        if self.verify_hasher is not None:
+            self.verify_hasher.metrics = None
+        self._metrics = None
         result.scan_time = time.time() - start_time
-        return result
         
-    def _collect_files(self, directory: str) -> List[str]:
-        """收集目录中的所有文件"""
-        files = []
+    def _phase(self, name: str):
+        """累计代码块耗时到扫描度量的指定阶段（不在扫描中时不计时）"""
+        return self._metrics.phase(name) if self._metrics is not None else nullcontext()
+        
+    def prune_index(self) -> int:
+        """清理持久化索引中的过期条目
+        
+        Returns:
+            删除的条目数，未启用索引时返回 0
+        """
+        if self.index is None:
+            return 0
+        return self.index.prune()
+        
+    def create_result_store(self, db_path: Optional[str] = None) -> ResultStore:
+        """创建结果存储，配置了 memory_limit 时按预算限制其页缓存"""
+        cache_bytes = None
+        if self.config.memory_limit is not None:
+            cache_bytes = int(self.config.memory_limit * self.STORE_MEMORY_SHARE)
+        return ResultStore(db_path, cache_bytes)
+        
+    def close(self):
+        """释放扫描器持有的资源（持久化索引、内存哈希缓存）"""
+        self.hasher.clear_cache()
+        if self.verify_hasher is not None:
+            self.verify_hasher.clear_cache()
+            
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+            self.hasher.index = None
+            if self.verify_hasher is not None:
+                self.verify_hasher.index = None
+            
+    def _prepare_size_groups(self, directory: str, result: ScanResult,
+                             previous: Optional[TreeSnapshot] = None,
+                             current: Optional[TreeSnapshot] = None) -> Dict[int, List[int]]:
+        """遍历目录、按大小分组并去除硬链接，同时填写文件总数、总大小和硬链接组
+        
+        文件保存在 self._catalog 中，返回的大小分组只包含文件编号。
+        """
+        with self._phase('walk'):
+            self._catalog = self._collect_files(directory, previous, current)
+        if self.config.memory_limit is not None and self._catalog.memory_usage() > self.config.memory_limit:
+            # 目录表必须完整保存才能分组，无法淘汰，只能提示
+            print(f"警告: 文件目录表占用 {FileUtils.format_size(self._catalog.memory_usage())}，"
+                  f"超出内存预算 {FileUtils.format_size(self.config.memory_limit)}")
+        result.total_files = len(self._catalog)
+        result.total_size = sum(self._catalog.sizes)
+        
+        with self._phase('group'):
+            # 按文件大小分组
+            size_groups = self._group_by_size(self._catalog)
+            
+            # 同一 inode 只保留一个文件参与比较，其余作为硬链接单独报告
+            size_groups, result.hardlink_groups, result.hardlink_sizes = self._dedupe_hardlinks(size_groups)
+        return size_groups
+        
+    def _batch_size_groups(self, size_groups: Dict[int, List[int]]) -> List[Dict[int, List[int]]]:
+        """把大小类别按文件大小从大到小切成若干批，同一大小类别不会被拆开
+        
+        配置了 memory_limit 时，每批文件数同时受内存预算限制。
+        """
+        batch_limit = self.config.stream_batch_files
+        if self.config.memory_limit is not None:
+            budget_files = int(self.config.memory_limit * self.BATCH_MEMORY_SHARE) // self.BATCH_FILE_BYTES
+            batch_limit = max(1, min(batch_limit, budget_files))
+            
+        batches = []
+        batch = {}
+        batch_files = 0
+        
+        for size in sorted(size_groups, reverse=True):
+            batch[size] = size_groups[size]
+            batch_files += len(size_groups[size])
+            if batch_files >= batch_limit:
+                batches.append(batch)
+                batch = {}
+                batch_files = 0
+                
+        if batch:
+            batches.append(batch)
+        return batches
+        
+    def _collect_files(self, directory: str, previous: Optional[TreeSnapshot] = None,
+                       current: Optional[TreeSnapshot] = None) -> FileCatalog:
+        """收集目录中的所有文件到紧凑目录表
+        
+        每个文件只在遍历时 stat 一次，后续流程只使用目录表中的元数据。
+        提供快照时，目录 mtime 未变化的目录不再读取目录，只重新 stat 快照中的文件，
+        原地改写（大小、mtime 或 inode 变化）的文件按已修改处理。
+        """
         directory_path = Path(directory)
         
         if not directory_path.exists():
             raise FileNotFoundError(f"目录不存在: {directory}")
             
-        for root, dirs, filenames in os.walk(directory):
-            # 排除指定目录
-            dirs[:] = [d for d in dirs if d not in self.config.exclude_dirs]
-            
-            for filename in filenames:
-                if self._stop_event.is_set():
-                    break
-                    
-                file_path = os.path.join(root, filename)
+        walker = DirectoryWalker(self.config.exclude_dirs, self._stop_event, self.config.walk_threads,
+                                 previous=previous, current=current, metrics=self._metrics)
+        catalog = FileCatalog()
+        for record in walker.walk(directory):
+            if self._should_include_file(record):
+                catalog.add(record)
+        return catalog
+        
+    def _snapshot_fingerprint(self, directory: str) -> str:
+        """计算快照配置指纹，影响遍历范围或分组结果的配置变化后快照失效"""
+        return json.dumps({
+            'directory': os.path.abspath(directory),
+            'algorithm': self.config.algorithm,
+            'verify_algorithm': self.config.verify_algorithm,
+            'min_size': self.config.min_size,
+            'max_size': self.config.max_size,
+            'extensions': sorted(self.config.extensions or []),
+            'exclude_dirs': sorted(self.config.exclude_dirs),
+        }, sort_keys=True)
+        
+    def _find_duplicates_incremental(self, size_groups: Dict[int, List[int]],
+                                     previous: TreeSnapshot, current: TreeSnapshot, result: ScanResult):
+        """增量查找重复文件并计算相对上次快照的变化
+        
+        新增、删除或修改的文件所在的大小类别重新比较，其余大小类别直接沿用
+        上次的重复组。结果写入 result.duplicate_groups / group_sizes / file_records / delta。
+        """
+        old_files = previous.all_files()
+        new_files = current.all_files()
+        
+        added = [path for path in new_files if path not in old_files]
+        removed = [path for path in old_files if path not in new_files]
+        modified = [path for path, record in new_files.items()
+                    if path in old_files and self._record_changed(old_files[path], record)]
+        
+        touched_sizes = {new_files[path].size for path in added + modified}
+        touched_sizes.update(old_files[path].size for path in removed + modified)
+        
+        # 只比较受影响的大小类别
+        touched_groups = {size: files for size, files in size_groups.items() if size in touched_sizes}
+        duplicate_groups = self._find_duplicates(touched_groups, result)
+        
+        for hash_val, files in previous.duplicate_groups.items():
+            size = previous.group_sizes.get(hash_val)
+            if size is not None and size not in touched_sizes:
+                duplicate_groups[hash_val] = files
+                result.group_sizes[hash_val] = size
+                result.file_records.update((path, new_files[path]) for path in files if path in new_files)
                 
-                # 检查文件是否符合条件
-                if self._should_include_file(file_path):
-                    files.append(file_path)
-                    
-        return files
+        result.duplicate_groups = duplicate_groups
+        result.delta = {
+            'added_files': len(added),
+            'removed_files': len(removed),
+            'modified_files': len(modified),
+            'reused_dirs': sum(1 for path, (mtime_ns, _) in current.dirs.items()
+                               if previous.dirs.get(path, (None,))[0] == mtime_ns),
+            'new_groups': {hash_val: files for hash_val, files in duplicate_groups.items()
+                           if set(previous.duplicate_groups.get(hash_val, ())) != set(files)},
+            'resolved_groups': {hash_val: files for hash_val, files in previous.duplicate_groups.items()
+                                if hash_val not in duplicate_groups},
+        }
+        # 已消除的组不在本次的 group_sizes 中，单独保留上次记录的大小
+        result.delta['resolved_sizes'] = {hash_val: previous.group_sizes.get(hash_val, 0)
+                                          for hash_val in result.delta['resolved_groups']}
         
-    def _should_include_file(self, file_path: str) -> bool:
-        """检查文件是否应该包含在扫描中"""
-        try:
-            # 检查文件是否存在且可读
-            if not os.path.isfile(file_path) or not os.access(file_path, os.R_OK):
+    def _should_include_file(self, record: FileRecord) -> bool:
+        """检查文件是否应该包含在扫描中
+        
+        不再预先调用 os.access 检查可读性：不可读的文件会在打开时失败并被跳过。
+        """
+        # 检查文件大小
+        if record.size < self.config.min_size:
+            return False
+            
+        if self.config.max_size and record.size > self.config.max_size:
+            return False
+            
+        # 检查文件扩展名
+        if self.config.extensions:
+            file_ext = os.path.splitext(record.path)[1].lower()
+            if file_ext not in self.config.extensions:
                 return False
                 
-            # 检查文件大小
-            file_size = os.path.getsize(file_path)
-            if file_size < self.config.min_size:
-                return False
+        return True
+        
+    @staticmethod
+    def _record_changed(old: FileRecord, new: FileRecord) -> bool:
+        """比较两次扫描的文件记录；inode 为 0（未知）时只比较大小和修改时间
+        
+        Windows 上新读取的目录记录没有 inode，复用目录时重新 stat 得到的记录却有，
+        二者不能直接比较。
+        """
+        if (old.size, old.mtime_ns) != (new.size, new.mtime_ns):
+            return True
+        return bool(old.inode and new.inode) and (old.inode, old.dev) != (new.inode, new.dev)
+        
+    def _dedupe_hardlinks(self, size_groups: Dict[int, List[int]]
+                          ) -> Tuple[Dict[int, List[int]], Dict[str, List[str]], Dict[str, int]]:
+        """在每个大小类别内按 (设备号, inode) 去重
+        
+        指向同一 inode 的多个路径（硬链接，或指向同一文件的符号链接）内容必然相同，
+        只需读取一次；删除其中一个也不会释放空间，因此不计入重复组。
+        硬链接大小必然相同，所以只需在有多个文件的大小类别内查找。
+        inode 为 0 表示未知（Windows 上 DirEntry.stat() 不提供 inode），这些文件不参与去重。
+        
+        Returns:
+            (每个 inode 保留第一个文件后的大小分组, 硬链接组, 硬链接组的文件大小)
+        """
+        catalog = self._catalog
+        deduped = {}
+        hardlink_groups = {}
+        hardlink_sizes = {}
+        
+        for size, file_ids in size_groups.items():
+            seen = {}
+            for file_id in file_ids:
+                inode = catalog.inodes[file_id]
+                # inode 未知的文件各自成组，按文件编号区分
+                key = (catalog.devs[file_id], inode) if inode else (None, file_id)
+                seen.setdefault(key, []).append(file_id)
                 
-            if self.config.max_size and file_size > self.config.max_size:
-                return False
+            if len(seen) == len(file_ids):
+                deduped[size] = file_ids
+                continue
                 
-            # 检查文件扩展名
-            if self.config.extensions:
-                file_ext = Path(file_path).suffix.lower()
-                if file_ext not in self.config.extensions:
-                    return False
-                    
-            return True
-            
-        except (OSError, IOError):
-            return False
+            for (dev, ino), ids in seen.items():
+                if len(ids) > 1:
+                    hardlink_groups[f"{dev}:{ino}"] = [catalog.path(file_id) for file_id in ids]
+                    hardlink_sizes[f"{dev}:{ino}"] = size
+            if len(seen) > 1:
+                deduped[size] = [ids[0] for ids in seen.values()]
+                
+        return deduped, hardlink_groups, hardlink_sizes
+        
+    def _group_by_size(self, catalog: FileCatalog) -> Dict[int, List[int]]:
+        """按文件大小分组，只返回有多个文件的组
+        
+        先统计每个大小的文件数，只为出现多次的大小建立编号列表，
+        大小唯一的文件（通常占多数）不会产生任何列表。
+        """
+        counts = {}
+        for size in catalog.sizes:
+            counts[size] = counts.get(size, 0) + 1
             
-    def _group_by_size(self, files: List[str]) -> Dict[int, List[str]]:
-        """按文件大小分组"""
         size_groups = {}
-        
-        for file_path in files:
+        for file_id, size in enumerate(catalog.sizes):
             if self._stop_event.is_set():
                 break
                 
-            try:
-                file_size = os.path.getsize(file_path)
-                if file_size not in size_groups:
-                    size_groups[file_size] = []
-                size_groups[file_size].append(file_path)
-            except (OSError, IOError):
+            if counts[size] > 1:
+                size_groups.setdefault(size, []).append(file_id)
+                
+        return size_groups
+        
+    def _find_duplicates(self, size_groups: Dict[int, List[int]],
+                         result: Optional[ScanResult] = None) -> Dict[str, List[str]]:
+        """在相同大小的文件中找出重复文件
+        
+        抽样和完整哈希两个阶段都按文件粒度交给 HashScheduler 调度，
+        大文件优先，所有线程一直保持忙碌直到阶段结束。各阶段只传递文件编号和
+        二进制摘要，最终确认的重复组才还原成路径与十六进制摘要。
+        
+        Args:
+            size_groups: 按大小分组的候选文件编号
+            result: 可选，用于记录各阶段幸存文件数和每组文件大小
+        """
+        io_order = self.config.io_order
+        scheduler = HashScheduler(self.config.threads, self._stop_event, self._progress_callback,
+                                  self.config.adaptive_threads, self.config.max_threads,
+                                  {'auto': 'auto', 'size': 'size'}.get(io_order, 'disk'), self._metrics)
+        
+        if self.config.executor == 'process':
+            self._process_pool = ProcessPoolExecutor(max_workers=self.config.threads)
+            
+        try:
+            # 阶段一：抽样哈希淘汰
+            with self._phase('sample'):
+                candidates = self._sample_stage(scheduler, size_groups)
+                
+            # 阶段二：对幸存文件计算完整哈希
+            with self._phase('full_hash'):
+                id_groups = self._full_hash_stage(scheduler, candidates, self.hasher, "计算文件哈希值...",
+                                                  allow_compare=True)
+                
+            # 阶段三（可选）：用更强的算法复核，分开极小概率的碰撞
+            verified_groups = None
+            if self.verify_hasher is not None:
+                with self._phase('verify'):
+                    verified_groups = self._full_hash_stage(scheduler, list(id_groups.values()),
+                                                            self.verify_hasher, "复核重复文件...")
+        finally:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(cancel_futures=True)
+                self._process_pool = None
+                
+        with self._phase('assemble'):
+            return self._assemble_groups(size_groups, candidates, id_groups, verified_groups, result)
+            
+    def _assemble_groups(self, size_groups: Dict[int, List[int]], candidates: List[List[int]],
+                         id_groups: Dict[bytes, List[int]], verified_groups: Optional[Dict[bytes, List[int]]],
+                         result: Optional[ScanResult]) -> Dict[str, List[str]]:
+        """把最终重复组还原为路径与十六进制摘要，记录组内文件元数据，并累加各阶段统计"""
+        catalog = self._catalog
+        final_groups = verified_groups if verified_groups is not None else id_groups
+        # 组内与组间都按路径排列：并行遍历时文件编号的分配顺序不固定，
+        # 按路径排序才能保证重复扫描得到相同的结果，--keep first 保留同一个文件
+        group_records = {}
+        for digest, file_ids in final_groups.items():
+            group_records[digest.hex()] = sorted((catalog.record(file_id) for file_id in file_ids),
+                                                 key=lambda record: record.path)
+        group_records = dict(sorted(group_records.items(), key=lambda item: item[1][0].path))
+        duplicate_groups = {hash_val: [record.path for record in records]
+                            for hash_val, records in group_records.items()}
+        
+        if result is not None:
+            for records in group_records.values():
+                result.file_records.update((record.path, record) for record in records)
+                
+            # 累加而非覆盖：流式扫描会对每一批调用一次
+            stage_stats = result.stage_stats
+            stage_stats['size'] += sum(len(files) for files in size_groups.values())
+            stage_stats['sample'] += sum(len(files) for files in candidates)
+            stage_stats['full'] += sum(len(files) for files in id_groups.values())
+            if verified_groups is not None:
+                stage_stats['verify'] = stage_stats.get('verify', 0) + sum(
+                    len(files) for files in verified_groups.values())
+            result.group_sizes.update((digest.hex(), catalog.sizes[file_ids[0]])
+                                      for digest, file_ids in final_groups.items())
+            
+        return duplicate_groups
+        
+    def _sample_stage(self, scheduler: HashScheduler, size_groups: Dict[int, List[int]]) -> List[List[int]]:
+        """按头/中/尾抽样哈希拆分同大小文件组，只返回仍有多个文件的候选组"""
+        catalog = self._catalog
+        sample_bytes = self.config.sample_size * 3
+        candidates = []
+        tasks = []
+        
+        for size, file_ids in size_groups.items():
+            if len(file_ids) < 2:
                 continue
                 
-        # 只返回有多个文件的组
-        return {size: files for size, files in size_groups.items() if len(files) > 1}
+            # 小文件的抽样即为全文，直接进入完整哈希阶段
+            if size <= sample_bytes:
+                candidates.append(file_ids)
+            else:
+                tasks.extend((file_id, sample_bytes) for file_id in file_ids)
+                
+        def sample_batch(file_ids: List[int]) -> List[Tuple[int, bytes]]:
+            sampled = []
+            for file_id in file_ids:
+                record = catalog.record(file_id)
+                sample_hash = self.hasher.calculate_sample_hash(record.path, record.size,
+                                                                self.config.sample_size, record)
+                if sample_hash:
+                    sampled.append((file_id, bytes.fromhex(sample_hash)))
+            return sampled
+            
+        sample_groups = {}
+        for file_id, sample_digest in scheduler.run(tasks, sample_batch, "抽样比对文件内容...",
+                                                    device_of=self._device_of, order_key=self._disk_order_key):
+            sample_groups.setdefault((catalog.sizes[file_id], sample_digest), []).append(file_id)
+            
+        candidates.extend(group for group in sample_groups.values() if len(group) > 1)
+        return candidates
+        
+    def _full_hash_stage(self, scheduler: HashScheduler, candidates: List[List[int]],
+                         hasher: FileHasher, message: str, allow_compare: bool = False) -> Dict[bytes, List[int]]:
+        """对候选文件计算完整哈希
         
-    def _find_duplicates(self, size_groups: Dict[int, List[str]]) -> Dict[str, List[str]]:
-        """在相同大小的文件中找出重复文件"""
-        duplicate_groups = {}
-        total_files = sum(len(files) for files in size_groups.values())
-        processed_files = 0
+        allow_compare 为真时，文件少且足够大的候选组整组逐块比较（见 _should_compare），
+        其余文件按单个文件调度哈希；两类任务在同一调度器中混合执行。
         
-        with ThreadPoolExecutor(max_workers=self.config.threads) as executor:
-            # 为每个大小组提交哈希计算任务
-            future_to_files = {}
+        Args:
+            scheduler: 任务调度器
+            candidates: 候选文件编号组
+            hasher: 使用的哈希计算器
+            message: 进度说明
+            allow_compare: 是否允许逐块比较
             
-            for size, files in size_groups.items():
-                if self._stop_event.is_set():
-                    break
-                    
-                if len(files) > 1:  # 只处理有多个文件的组
-                    future = executor.submit(self._process_size_group, files)
-                    future_to_files[future] = files
-                    
-            # 收集结果
-            for future in as_completed(future_to_files):
-                if self._stop_event.is_set():
-                    break
+        Returns:
+            二进制摘要 -> 重复文件编号（只包含有多个文件的组）
+        """
+        sizes = self._catalog.sizes
+        tasks = []
+        for group in candidates:
+            if allow_compare and self._should_compare(group, hasher):
+                # 整组作为一个任务，预估读取量为全部成员大小之和
+                tasks.append((group, sizes[group[0]] * len(group)))
+            else:
+                tasks.extend((file_id, sizes[file_id]) for file_id in group)
+                
+        def run_batch(items: List) -> List[Tuple[int, bytes]]:
+            file_ids = [item for item in items if isinstance(item, int)]
+            hashed = []
+            for item in items:
+                if not isinstance(item, int):
+                    hashed.extend(self._compare_group(item, hasher))
                     
+            if self._process_pool is not None:
+                hashed.extend(self._hash_in_processes(file_ids, hasher))
+            else:
+                hashed.extend(self._hash_in_thread(file_ids, hasher))
+            return hashed
+            
+        if self.config.executor == 'async':
+            # 逐块比较仍由调度器线程完成，其余文件交给异步引擎
+            group_tasks = [task for task in tasks if not isinstance(task[0], int)]
+            hashed = scheduler.run(group_tasks, run_batch, message, device_of=self._device_of,
+                                   order_key=self._disk_order_key) if group_tasks else []
+            hashed.extend(self._hash_async([item for item, _ in tasks if isinstance(item, int)], hasher, message))
+        else:
+            batch_size = self.config.process_batch_size if self._process_pool is not None else 1
+            hashed = scheduler.run(tasks, run_batch, message, batch_size, self._device_of, self._disk_order_key)
+        
+        hash_groups = {}
+        for file_id, digest in hashed:
+            hash_groups.setdefault(digest, []).append(file_id)
+            
+        # 只返回有重复的组
+        return {digest: file_ids for digest, file_ids in hash_groups.items() if len(file_ids) > 1}
+        
+    def _device_of(self, item) -> int:
+        """获取调度任务（文件编号或逐块比较的编号组）所在的设备号"""
+        return self._catalog.devs[item if isinstance(item, int) else item[0]]
+        
+    def _disk_order_key(self, item) -> tuple:
+        """调度任务在磁盘上的位置排序键
+        
+        io_order 为 inode 时按 inode 号排序（同一目录下先后创建的文件 inode 相邻，
+        在多数文件系统上数据也相邻）；否则优先用 FIEMAP 物理偏移，获取不到时退回
+        inode 号，排在有物理偏移的文件之后。物理偏移按文件缓存，各阶段只查询一次。
+        """
+        file_id = item if isinstance(item, int) else item[0]
+        inode = self._catalog.inodes[file_id]
+        if self.config.io_order == 'inode':
+            return (1, inode)
+            
+        key = self._disk_offsets.get(file_id)
+        if key is None:
+            offset = physical_offset(self._catalog.path(file_id))
+            key = (0, offset) if offset is not None else (1, inode)
+            self._disk_offsets[file_id] = key
+        return key
+        
+    def _should_compare(self, group: List[int], hasher: FileHasher) -> bool:
+        """判断候选组是否改用逐块比较
+        
+        文件数少时同步读取可以在第一个不同的块处提前结束，且结果精确无碰撞；
+        小文件或已有缓存摘要的组仍然走哈希路径。
+        """
+        if len(group) > self.config.compare_max_files or self._catalog.sizes[group[0]] < self.config.compare_min_size:
+            return False
+            
+        records = [self._catalog.record(file_id) for file_id in group]
+        return not all(hasher.get_cached_hash(record.path, record) for record in records)
+        
+    def _compare_group(self, group: List[int], hasher: FileHasher) -> List[Tuple[int, bytes]]:
+        """同时打开组内所有文件逐块比较，内容一出现分歧就拆分
+        
+        每个分区维护一个哈希对象；分区拆分时复制哈希对象，因此读到文件末尾时
+        得到的就是各文件的完整摘要，可直接作为重复组的键并写入缓存。
+        
+        Returns:
+            内容完全相同（分区内至少两个文件）的 (文件编号, 二进制摘要)
+        """
+        records = {file_id: self._catalog.record(file_id) for file_id in group}
+        block_size = adaptive_chunk_size(self._catalog.sizes[group[0]], hasher.chunk_size)
+        handles = {}
+        hashed = []
+        
+        try:
+            for file_id, record in records.items():
                 try:
-                    group_duplicates = future.result()
-                    duplicate_groups.update(group_duplicates)
-                    
-                    processed_files += len(future_to_files[future])
+                    handles[file_id] = open(record.path, 'rb')
+                    hasher.record_read(0)
+                except OSError as e:
+                    print(f"无法读取文件 {record.path}: {e}")
+                    hasher.record_error(e)
                     
-                    # 更新进度
-                    if self._progress_callback:
-                        self._progress_callback(processed_files, total_files, "计算文件哈希值...")
-                        
-                except Exception as e:
-                    print(f"处理文件组时出错: {e}")
-                    
-        return duplicate_groups
+            partitions = [(hasher.SUPPORTED_ALGORITHMS[hasher.algorithm](), list(handles))]
+            
+            while partitions and not self._stop_event.is_set():
+                next_partitions = []
+                
+                for hash_obj, members in partitions:
+                    # 按本块内容把分区成员分成若干子组（文件数很少，直接逐个比较字节）
+                    blocks = []
+                    for file_id in members:
+                        data = handles[file_id].read(block_size)
+                        hasher.record_read(len(data), files=0)
+                        for block, block_members in blocks:
+                            if block == data:
+                                block_members.append(file_id)
+                                break
+                        else:
+                            blocks.append((data, [file_id]))
+                            
+                    for data, block_members in blocks:
+                        if len(block_members) < 2:
+                            continue
+                            
+                        sub_hash = hash_obj.copy() if len(blocks) > 1 else hash_obj
+                        if data:
+                            sub_hash.update(data)
+                            next_partitions.append((sub_hash, block_members))
+                        else:
+                            # 同时读到文件末尾，内容完全相同
+                            digest = sub_hash.digest()
+                            for file_id in block_members:
+                                record = records[file_id]
+                                hasher.store_hash(record.path, digest.hex(), record)
+                                hashed.append((file_id, digest))
+                                
+                partitions = next_partitions
+                
+        except OSError as e:
+            print(f"比较文件内容时出错: {e}")
+            hasher.record_error(e)
+            return []
+        finally:
+            for handle in handles.values():
+                handle.close()
+                
+        return hashed
         
-    def _process_size_group(self, files: List[str]) -> Dict[str, List[str]]:
-        """处理相同大小的文件组"""
-        hash_groups = {}
+    def _hash_in_thread(self, file_ids: List[int], hasher: FileHasher) -> List[Tuple[int, bytes]]:
+        """在当前线程中逐个计算完整哈希"""
+        hashed = []
         
-        for file_path in files:
+        for file_id in file_ids:
             if self._stop_event.is_set():
                 break
                 
+            record = self._catalog.record(file_id)
             try:
-                file_hash = self.hasher.calculate_hash(file_path)
+                file_hash = hasher.calculate_hash(record.path, record)
                 if file_hash:
-                    if file_hash not in hash_groups:
-                        hash_groups[file_hash] = []
-                    hash_groups[file_hash].append(file_path)
+                    hashed.append((file_id, bytes.fromhex(file_hash)))
                     
             except Exception as e:
-                print(f"计算文件哈希值失败 {file_path}: {e}")
+                print(f"计算文件哈希值失败 {record.path}: {e}")
+                hasher.record_error(e)
                 
-        # 只返回有重复的组
-        return {hash_val: files for hash_val, files in hash_groups.items() if len(files) > 1}
+        return hashed
         
-    def get_scan_statistics(self, result: ScanResult) -> Dict:
-        """获取扫描统计信息"""
-        duplicate_files = []
-        duplicate_size = 0
+    def _hash_async(self, file_ids: List[int], hasher: FileHasher, message: str) -> List[Tuple[int, bytes]]:
+        """用异步引擎计算完整哈希，大文件优先"""
+        if not file_ids or self._stop_event.is_set():
+            return []
+            
+        engine = AsyncHashEngine(self.config.threads, self.config.max_inflight_bytes,
+                                 self.config.async_open_files, self._stop_event, self._progress_callback)
+        sizes = self._catalog.sizes
+        ordered = sorted(file_ids, key=lambda file_id: sizes[file_id], reverse=True)
+        return engine.run([(file_id, self._catalog.record(file_id)) for file_id in ordered], hasher, message)
+        
+    def _hash_in_processes(self, file_ids: List[int], hasher: FileHasher) -> List[Tuple[int, bytes]]:
+        """把一批文件中未命中缓存的部分交给进程池计算完整哈希
         
-        for files in result.duplicate_groups.values():
-            duplicate_files.extend(files)
-            # 计算重复文件占用的空间（除了保留一个文件）
-            if files:
-                file_size = os.path.getsize(files[0])
-                duplicate_size += file_size * (len(files) - 1)
+        缓存和持久化索引只在主进程中访问，工作进程只负责读取文件并返回二进制摘要。
+        """
+        hashed = []
+        uncached = []
+        
+        for file_id in file_ids:
+            record = self._catalog.record(file_id)
+            file_hash = hasher.get_cached_hash(record.path, record)
+            if file_hash:
+                hashed.append((file_id, bytes.fromhex(file_hash)))
+            else:
+                uncached.append((file_id, record))
+                
+        if not uncached or self._stop_event.is_set():
+            return hashed
+            
+        future = self._process_pool.submit(hash_files, hasher.algorithm, hasher.chunk_size,
+                                           [record.path for _, record in uncached],
+                                           hasher.io_strategy, hasher.drop_cache)
+        try:
+            digests = future.result()
+        except Exception as e:
+            print(f"进程池计算哈希值失败: {e}")
+            hasher.record_error(e)
+            return hashed
+            
+        for (file_id, record), digest in zip(uncached, digests):
+            if digest is not None:
+                hasher.record_read(record.size)
+                hasher.store_hash(record.path, digest.hex(), record)
+                hashed.append((file_id, digest))
                 
+        return hashed
+        
+    def get_scan_statistics(self, result: ScanResult, store: Optional[ResultStore] = None) -> Dict:
+        """获取扫描统计信息
+        
+        Args:
+            result: 扫描结果
+            store: 可选，流式扫描写入的结果存储；提供时重复组汇总从存储中读取
+        """
+        if store is not None:
+            summary = store.summary()
+            group_count, file_count, duplicate_size = summary['groups'], summary['files'], summary['wasted_space']
+        else:
+            group_count = len(result.duplicate_groups)
+            file_count = 0
+            duplicate_size = 0
+            
+            for hash_val, files in result.duplicate_groups.items():
+                file_count += len(files)
+                # 计算重复文件占用的空间（除了保留一个文件）
+                if files:
+                    file_size = result.group_sizes.get(hash_val)
+                    if file_size is None:
+                        file_size = os.path.getsize(files[0])
+                    duplicate_size += file_size * (len(files) - 1)
+                    
         return {
             "总文件数": result.total_files,
             "总大小": FileUtils.format_size(result.total_size),
-            "重复文件组数": len(result.duplicate_groups),
-            "重复文件数": len(duplicate_files),
+            "重复文件组数": group_count,
+            "重复文件数": file_count,
             "可释放空间": FileUtils.format_size(duplicate_size),
+            "硬链接组数": len(result.hardlink_groups),
+            "阶段幸存文件数": self._format_stage_stats(result.stage_stats),
             "扫描耗时": f"{result.scan_time:.2f}秒",
             "错误数": len(result.errors)
-        }
\ No newline at end of file
+        }
+        
+    @staticmethod
+    def _format_stage_stats(stage_stats: Dict[str, int]) -> str:
+        """格式化各阶段幸存文件数"""
+        text = "大小 {size} → 抽样 {sample} → 完整 {full}".format(**stage_stats)
+        if 'verify' in stage_stats:
+            text += f" → 复核 {stage_stats['verify']}"
+        return text
\ No newline at end of file
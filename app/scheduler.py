@@ -0,0 +1,375 @@
+"""
+哈希任务调度器 - 按文件粒度均衡分配工作
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from .instrumentation import ScanMetrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FS_IOC_FIEMAP = 0xC020660B  # _IOWR('f', 11, struct fiemap)
+_FIEMAP_HEADER = struct.Struct('=QQIIII')  # fm_start, fm_length, fm_flags, fm_mapped_extents, fm_extent_count, 保留
+_FIEMAP_EXTENT = struct.Struct('=QQQQQIIII')  # fe_logical, fe_physical, fe_length, 保留 x2, fe_flags, 保留 x3
+
+
+def is_rotational(dev: int) -> Optional[bool]:
+    """判断设备号对应的块设备是否为机械硬盘
+    
+    读取 Linux 的 /sys/dev/block/<major>:<minor>/queue/rotational；分区没有 queue 目录，
+    取其父设备。非 Linux、网络文件系统等无法判断时返回 None。
+    """
+    try:
+        base = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+    except (AttributeError, ValueError, OverflowError):
+        return None
+        
+    for path in (os.path.join(base, 'queue', 'rotational'), os.path.join(base, '..', 'queue', 'rotational')):
+        try:
+            with open(path) as f:
+                return f.read().strip() == '1'
+        except OSError:
+            continue
+    return None
+
+
+def physical_offset(path: str) -> Optional[int]:
+    """用 FIEMAP 获取文件第一个数据区段在设备上的物理偏移
+    
+    只在 Linux 且文件系统支持 FIEMAP 时可用（ext4、xfs、btrfs 等）；空文件、
+    内联在 inode 中的小文件以及不支持的平台返回 None。
+    """
+    if fcntl is None:
+        return None
+        
+    request = bytearray(_FIEMAP_HEADER.size + _FIEMAP_EXTENT.size)
+    _FIEMAP_HEADER.pack_into(request, 0, 0, 0xFFFFFFFFFFFFFFFF, 0, 0, 1, 0)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        fcntl.ioctl(fd, FS_IOC_FIEMAP, request)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+        
+    if _FIEMAP_HEADER.unpack_from(request)[3] == 0:
+        return None
+    return _FIEMAP_EXTENT.unpack_from(request, _FIEMAP_HEADER.size)[1]
+
+
+class ConcurrencyController:
+    """单个设备的自适应并发控制器
+    
+    工作线程每处理完一批任务上报读取字节数和耗时；每隔 interval 秒按窗口内的吞吐量
+    做一次爬山调整：吞吐量明显上升则沿当前方向继续（增加或减少并发），明显下降则
+    反向，变化不大则保持。编号不小于目标并发数的工作线程暂停领取任务。
+    """
+    
+    IMPROVE_RATIO = 1.1  # 吞吐量提升超过 10% 视为有效
+    DECLINE_RATIO = 0.9  # 吞吐量下降超过 10% 视为变差
+    
+    def __init__(self, device: Hashable, initial: int, max_workers: int, min_workers: int = 1,
+                 interval: float = 0.5, rotational: Optional[bool] = None):
+        """初始化控制器
+        
+        Args:
+            device: 设备标识（st_dev），只用于日志
+            initial: 初始并发数
+            max_workers: 并发上限
+            min_workers: 并发下限
+            interval: 调整间隔（秒）
+            rotational: 设备是否为机械硬盘，None 表示未知
+        """
+        self.device = device
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.target = min(max(initial, self.min_workers), self.max_workers)
+        self.interval = interval
+        self.rotational = rotational
+        self.decisions: List[Dict[str, Any]] = []  # 每次调整的记录
+        
+        self._condition = threading.Condition()
+        self._direction = 1
+        self._last_throughput: Optional[float] = None
+        self._window_start = time.perf_counter()
+        self._window_bytes = 0
+        self._window_busy = 0.0
+        self._window_batches = 0
+        
+    def wait_turn(self, worker_index: int, should_exit: Callable[[], bool]) -> bool:
+        """等待工作线程获准领取任务
+        
+        Returns:
+            获准时返回 True；should_exit() 为真（任务已取完或已停止）时返回 False
+        """
+        with self._condition:
+            while worker_index >= self.target:
+                if should_exit():
+                    return False
+                self._condition.wait(0.05)
+        return not should_exit()
+        
+    def record(self, nbytes: int, elapsed: float):
+        """上报一批任务的读取字节数和耗时，到达调整间隔时调整并发数"""
+        with self._condition:
+            self._window_bytes += nbytes
+            self._window_busy += elapsed
+            self._window_batches += 1
+            
+            now = time.perf_counter()
+            window = now - self._window_start
+            if window < self.interval:
+                return
+                
+            throughput = self._window_bytes / window
+            latency = self._window_busy / self._window_batches
+            self._adjust(throughput, latency)
+            
+            self._window_start = now
+            self._window_bytes = 0
+            self._window_busy = 0.0
+            self._window_batches = 0
+            
+    def _adjust(self, throughput: float, latency: float):
+        """根据窗口吞吐量调整目标并发数（调用方持有锁）"""
+        previous = self.target
+        last = self._last_throughput
+        
+        move = True
+        if last is None:
+            reason = '首个窗口，尝试增加并发'
+        elif throughput < last * self.DECLINE_RATIO:
+            self._direction = -self._direction
+            reason = '吞吐量下降，反向调整'
+        elif throughput > last * self.IMPROVE_RATIO:
+            reason = '吞吐量上升，继续调整'
+        else:
+            move = False
+            reason = '吞吐量持平，保持'
+            
+        if move:
+            step = max(1, self.target // 2) if self._direction > 0 else max(1, self.target // 4)
+            self.target = min(max(self.target + self._direction * step, self.min_workers), self.max_workers)
+            
+        self._last_throughput = throughput
+        self.decisions.append({
+            'device': self.device,
+            'workers': self.target,
+            'previous_workers': previous,
+            'throughput': throughput,
+            'latency': latency,
+            'reason': reason,
+        })
+        logger.info("设备 %s: 吞吐量 %.1f MB/s，平均批次耗时 %.1f ms，并发 %d -> %d（%s）",
+                    self.device, throughput / 1024 / 1024, latency * 1000, previous, self.target, reason)
+                    
+        if self.target != previous:
+            self._condition.notify_all()
+
+
+class HashScheduler:
+    """按文件粒度调度哈希任务
+    
+    提供 device_of 时任务按设备（st_dev）分成独立队列，每个队列有自己的工作线程，
+    同时扫描多块磁盘时互不等待。队列内默认按预估读取字节数从大到小排序（最长任务
+    优先），工作线程从共享游标依次领取，避免某个大小组独占一个线程而其他线程空闲；
+    按磁盘顺序读取的队列（见 io_order）改用 order_key 排序，减少机械硬盘的寻道。
+    进度以字节为单位上报。
+    
+    adaptive 为真时每个设备一个 ConcurrencyController 根据实测吞吐量调整并发数；
+    机械硬盘从 1 个并发开始、最多 2 个。
+    
+    注意：完整哈希（md5/sha 系列）只能顺序计算，单个文件无法拆成多个字节区间
+    并行而不改变摘要值，因此最小调度单位是单个文件。
+    """
+    
+    ROTATIONAL_MAX_WORKERS = 2  # 机械硬盘的并发上限
+    IO_ORDERS = ('auto', 'size', 'disk')
+    
+    def __init__(self, threads: int, stop_event: threading.Event,
+                 progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                 adaptive: bool = False, max_threads: int = 32, io_order: str = 'auto',
+                 metrics: Optional[ScanMetrics] = None):
+        """初始化调度器
+        
+        Args:
+            threads: 每个设备的工作线程数（自适应模式下为非机械硬盘的初始并发数）
+            stop_event: 停止事件
+            progress_callback: 进度回调，参数为 (已处理字节数, 总字节数, 阶段说明)
+            adaptive: 是否按设备自适应调整并发数
+            max_threads: 自适应模式下每个设备的并发上限
+            io_order: 队列内的读取顺序，size（大文件优先）、disk（按 order_key，即磁盘位置）、
+                      auto（机械硬盘按磁盘位置，其他设备大文件优先）
+            metrics: 可选的扫描度量，记录每个工作线程的忙碌/空闲时间
+        """
+        if io_order not in self.IO_ORDERS:
+            raise ValueError(f"不支持的读取顺序: {io_order}")
+            
+        self.threads = max(1, threads)
+        self.adaptive = adaptive
+        self.max_threads = max(self.threads, max_threads)
+        self.io_order = io_order
+        self.metrics = metrics
+        self.controllers: Dict[Hashable, ConcurrencyController] = {}
+        self._rotational: Dict[Hashable, Optional[bool]] = {}
+        self._stop_event = stop_event
+        self._progress_callback = progress_callback
+        
+    def run(self, tasks: List[Tuple[Any, int]], func: Callable[[List[Any]], List[Any]],
+            message: str, batch_size: int = 1,
+            device_of: Optional[Callable[[Any], Hashable]] = None,
+            order_key: Optional[Callable[[Any], Any]] = None) -> List[Any]:
+        """执行一批哈希任务
+        
+        Args:
+            tasks: (任务对象, 预估读取字节数) 列表，任务对象通常是文件编号
+            func: 处理一批任务对象的函数，返回结果列表
+            message: 进度说明
+            batch_size: 每次领取的任务数
+            device_of: 返回任务所在设备（st_dev）的函数，用于分队列
+            order_key: 返回任务磁盘位置排序键的函数（inode 或物理偏移），
+                       只对按磁盘顺序读取的队列调用
+            
+        Returns:
+            所有批次结果的拼接
+        """
+        tasks = sorted(tasks, key=lambda task: task[1], reverse=True)
+        total_bytes = sum(cost for _, cost in tasks)
+        batch_size = max(1, batch_size)
+        
+        queues: Dict[Hashable, List[Tuple[Any, int]]] = {}
+        if device_of is not None:
+            for task in tasks:
+                queues.setdefault(device_of(task[0]), []).append(task)
+        else:
+            queues[None] = tasks
+            
+        lock = threading.Lock()
+        progress = {'done_bytes': 0}
+        results = []
+        workers = []
+        worker_stats: Dict[str, List[float]] = {}  # 工作线程名 -> [忙碌秒数, 任务数]
+        
+        for device, queue_tasks in queues.items():
+            controller = None
+            worker_count = self.threads
+            if self.adaptive and device is not None:
+                controller = self._controller_for(device)
+                worker_count = controller.max_workers
+            if order_key is not None and self._disk_order(device):
+                # 稳定排序：位置相同（如无法获取物理偏移）的任务保持大文件优先
+                queue_tasks.sort(key=lambda task: order_key(task[0]))
+                
+            cursor = {'next': 0}  # 同一设备队列的所有工作线程共享游标
+            for index in range(min(worker_count, len(queue_tasks))):
+                stats = worker_stats.setdefault(f"{'*' if device is None else device}/{index}", [0.0, 0])
+                workers.append(threading.Thread(
+                    target=self._worker,
+                    args=(index, queue_tasks, cursor, func, batch_size, controller,
+                          lock, progress, total_bytes, results, message, stats)
+                ))
+                
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+            
+        if self.metrics is not None:
+            # 空闲时间包括等待领取任务和提前结束后等待其他线程的时间，反映负载是否均衡
+            elapsed = time.perf_counter() - started
+            for name, (busy, tasks) in worker_stats.items():
+                self.metrics.record_worker(name, busy, max(0.0, elapsed - busy), tasks)
+                
+        return results
+        
+    def _device_rotational(self, device: Hashable) -> Optional[bool]:
+        """判断设备是否为机械硬盘，结果按设备缓存"""
+        if device not in self._rotational:
+            self._rotational[device] = is_rotational(device) if isinstance(device, int) else None
+        return self._rotational[device]
+        
+    def _disk_order(self, device: Hashable) -> bool:
+        """判断设备队列是否按磁盘位置读取"""
+        if self.io_order == 'auto':
+            return bool(self._device_rotational(device))
+        return self.io_order == 'disk'
+        
+    def _controller_for(self, device: Hashable) -> ConcurrencyController:
+        """获取（或创建）设备的并发控制器，跨阶段保留已学到的并发数"""
+        controller = self.controllers.get(device)
+        if controller is not None:
+            return controller
+            
+        rotational = self._device_rotational(device)
+        if rotational:
+            controller = ConcurrencyController(device, 1, self.ROTATIONAL_MAX_WORKERS, rotational=True)
+        else:
+            controller = ConcurrencyController(device, self.threads, self.max_threads, rotational=rotational)
+        logger.info("设备 %s: %s，初始并发 %d，上限 %d", device,
+                    {True: '机械硬盘', False: '固态/非机械设备', None: '类型未知'}[rotational],
+                    controller.target, controller.max_workers)
+        self.controllers[device] = controller
+        return controller
+        
+    def _worker(self, index: int, tasks: List[Tuple[Any, int]], cursor: Dict[str, int],
+                func: Callable[[List[Any]], List[Any]], batch_size: int,
+                controller: Optional[ConcurrencyController], lock: threading.Lock,
+                progress: Dict[str, int], total_bytes: int, results: List[Any], message: str,
+                stats: List[float]):
+        """工作线程：从队列游标领取批次并执行，忙碌秒数与任务数累加到 stats"""
+        local_results = []
+        profiling = self.metrics.profile_thread() if self.metrics is not None else nullcontext()
+        
+        def exhausted() -> bool:
+            return self._stop_event.is_set() or cursor['next'] >= len(tasks)
+            
+        with profiling:
+            while not self._stop_event.is_set():
+                if controller is not None and not controller.wait_turn(index, exhausted):
+                    break
+                    
+                with lock:
+                    start = cursor['next']
+                    cursor['next'] = min(start + batch_size, len(tasks))
+                    batch = tasks[start:cursor['next']]
+                if not batch:
+                    break
+                    
+                started = time.perf_counter()
+                try:
+                    local_results.extend(func([item for item, _ in batch]))
+                except Exception as e:
+                    print(f"处理哈希任务时出错: {e}")
+                    if self.metrics is not None:
+                        self.metrics.record_error(e)
+                        
+                elapsed = time.perf_counter() - started
+                stats[0] += elapsed
+                stats[1] += len(batch)
+                batch_bytes = sum(cost for _, cost in batch)
+                if controller is not None:
+                    controller.record(batch_bytes, elapsed)
+                    
+                with lock:
+                    progress['done_bytes'] += batch_bytes
+                    done_bytes = progress['done_bytes']
+                    
+                if self._progress_callback:
+                    self._progress_callback(done_bytes, total_bytes, message)
+                    
+        with lock:
+            results.extend(local_results)
@@ -0,0 +1,139 @@
+"""
+目录树快照 - 支持增量重新扫描
+"""
+
+import json
+import os
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+from .walker import FileRecord
+
+
+class TreeSnapshot:
+    """上一次遍历的目录树快照
+    
+    记录每个目录的 mtime 与子目录列表、目录下全部普通文件的元数据，
+    以及上一次扫描得到的重复组。增量扫描时目录 mtime 未变的目录直接复用
+    快照中的列表，不再读取目录；只有大小类别受新增/删除/修改文件影响时才重新比较。
+    """
+    
+    def __init__(self, fingerprint: str = ''):
+        """创建空快照
+        
+        Args:
+            fingerprint: 扫描配置指纹，配置不同的快照不能复用
+        """
+        self.fingerprint = fingerprint
+        self.dirs: Dict[str, Tuple[int, List[str]]] = {}  # 目录 -> (mtime_ns, 子目录)
+        self.files: Dict[str, List[FileRecord]] = {}  # 目录 -> 文件记录
+        self.duplicate_groups: Dict[str, List[str]] = {}
+        self.group_sizes: Dict[str, int] = {}
+        
+    def lookup_dir(self, path: str, mtime_ns: int) -> Optional[Tuple[List[FileRecord], List[str]]]:
+        """查询目录是否未变化
+        
+        Returns:
+            目录 mtime 与快照一致时返回 (文件记录, 子目录)，否则返回 None
+        """
+        entry = self.dirs.get(path)
+        if entry is None or entry[0] != mtime_ns:
+            return None
+        return self.files.get(path, []), entry[1]
+        
+    def record_dir(self, path: str, mtime_ns: int, records: List[FileRecord], subdirs: List[str]):
+        """记录一个目录的遍历结果"""
+        self.dirs[path] = (mtime_ns, subdirs)
+        self.files[path] = records
+        
+    def all_files(self) -> Dict[str, FileRecord]:
+        """获取快照中所有文件，路径 -> 文件记录"""
+        return {record.path: record for records in self.files.values() for record in records}
+        
+    @classmethod
+    def load(cls, snapshot_path: str, fingerprint: str) -> Optional['TreeSnapshot']:
+        """加载快照
+        
+        Args:
+            snapshot_path: 快照文件路径
+            fingerprint: 当前扫描配置指纹
+            
+        Returns:
+            快照；文件不存在、损坏或配置指纹不一致时返回 None
+        """
+        if not os.path.exists(snapshot_path):
+            return None
+            
+        try:
+            conn = sqlite3.connect(snapshot_path)
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key='fingerprint'").fetchone()
+                if not row or row[0] != fingerprint:
+                    return None
+                    
+                snapshot = cls(fingerprint)
+                for path, mtime_ns, subdirs in conn.execute("SELECT path, mtime_ns, subdirs FROM dirs"):
+                    snapshot.dirs[path] = (mtime_ns, json.loads(subdirs))
+                    snapshot.files[path] = []
+                    
+                for dir_path, path, size, mtime_ns, inode, dev in conn.execute(
+                        "SELECT dir, path, size, mtime_ns, inode, dev FROM files"):
+                    snapshot.files.setdefault(dir_path, []).append(FileRecord(path, size, mtime_ns, inode, dev))
+                    
+                for digest, size, paths in conn.execute("SELECT digest, size, paths FROM groups"):
+                    snapshot.duplicate_groups[digest] = json.loads(paths)
+                    snapshot.group_sizes[digest] = size
+                    
+                return snapshot
+            finally:
+                conn.close()
+                
+        except (sqlite3.Error, ValueError) as e:
+            print(f"加载快照失败 {snapshot_path}: {e}")
+            return None
+            
+    def save(self, snapshot_path: str) -> bool:
+        """保存快照（整体替换旧文件）
+        
+        Returns:
+            是否保存成功
+        """
+        temp_path = f"{snapshot_path}.tmp"
+        try:
+            snapshot_dir = os.path.dirname(os.path.abspath(snapshot_path))
+            os.makedirs(snapshot_dir, exist_ok=True)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+                
+            conn = sqlite3.connect(temp_path)
+            try:
+                conn.executescript("""
+                    CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                    CREATE TABLE dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER, subdirs TEXT);
+                    CREATE TABLE files (dir TEXT, path TEXT, size INTEGER, mtime_ns INTEGER,
+                                        inode INTEGER, dev INTEGER);
+                    CREATE TABLE groups (digest TEXT PRIMARY KEY, size INTEGER, paths TEXT);
+                """)
+                conn.execute("INSERT INTO meta VALUES ('fingerprint', ?)", (self.fingerprint,))
+                conn.executemany(
+                    "INSERT INTO dirs VALUES (?, ?, ?)",
+                    ((path, mtime_ns, json.dumps(subdirs)) for path, (mtime_ns, subdirs) in self.dirs.items())
+                )
+                conn.executemany(
+                    "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    ((dir_path, *record) for dir_path, records in self.files.items() for record in records)
+                )
+                conn.executemany(
+                    "INSERT INTO groups VALUES (?, ?, ?)",
+                    ((digest, self.group_sizes.get(digest, 0), json.dumps(paths))
+                     for digest, paths in self.duplicate_groups.items())
+                )
+                conn.commit()
+            finally:
+                conn.close()
+                
+            os.replace(temp_path, snapshot_path)
+            return True
+            
+        except (sqlite3.Error, OSError) as e:
+            print(f"保存快照失败 {snapshot_path}: {e}")
+            return False
@@ -6,14 +6,39 @@ import os
 import shutil
 import json
 import csv
+import errno
+import filecmp
+import gzip
+import html
+import io
+import threading
+from collections.abc import Mapping
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, NamedTuple, Optional, TextIO
+from .columnar import read_columnar, write_columnar
+from .virtual_report import write_virtual_html
+from .walker import FileRecord
+
+# 可选的 zstd 压缩（pip install zstandard），未安装时报告只支持 gzip
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int)，Linux 的写时复制克隆（btrfs、XFS、bcachefs 等）
 
 
 class FileUtils:
     """文件操作工具类"""
     
+    LINK_MODES = ('hardlink', 'reflink', 'symlink')
+    
     @staticmethod
     def format_size(size_bytes: int) -> str:
         """格式化文件大小
@@ -36,6 +61,31 @@ class FileUtils:
             
         return f"{size_bytes:.2f}{size_names[i]}"
         
+    @staticmethod
+    def parse_size(size_text) -> int:
+        """解析大小字符串（format_size 的逆操作）
+        
+        Args:
+            size_text: 如 "1GB"、"512MB"、"64K"、"1024"，整数按字节处理
+            
+        Returns:
+            字节数
+        """
+        if isinstance(size_text, int):
+            return size_text
+            
+        units = {'B': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+        text = str(size_text).strip().upper().replace(' ', '')
+        if text.endswith('B') and len(text) > 1 and text[-2] in units:
+            text = text[:-1]
+            
+        try:
+            if text and text[-1] in units:
+                return int(float(text[:-1]) * units[text[-1]])
+            return int(float(text))
+        except ValueError:
+            raise ValueError(f"无法解析的大小: {size_text}")
+            
     @staticmethod
     def get_file_info(file_path: str) -> Dict[str, Any]:
         """获取文件信息
@@ -74,8 +124,8 @@ class FileUtils:
         """
         try:
             if backup_dir and os.path.exists(file_path):
-                # 创建备份
-                backup_path = FileUtils.create_backup(file_path, backup_dir)
+                # 创建备份（同一文件系统上为硬链接，随后删除原路径相当于改名，不复制数据）
+                backup_path = FileUtils.create_backup(file_path, backup_dir, link=True)
                 if not backup_path:
                     return False
                     
@@ -88,13 +138,15 @@ class FileUtils:
             return False
             
     @staticmethod
-    def create_backup(file_path: str, backup_dir: str) -> Optional[str]:
+    def create_backup(file_path: str, backup_dir: str, link: bool = False) -> Optional[str]:
         """创建文件备份
         
         Args:
             file_path: 源文件路径
             backup_dir: 备份目录
-            
+            link: 备份目录与源文件在同一文件系统时用硬链接代替复制。备份与源文件共享数据，
+                  只适用于源路径随后会被删除或替换的场景
+                  
         Returns:
             备份文件路径，失败返回 None
         """
@@ -108,8 +160,17 @@ class FileUtils:
             backup_name = f"{timestamp}_{file_name}"
             backup_path = os.path.join(backup_dir, backup_name)
             
-            # 复制文件
-            shutil.copy2(file_path, backup_path)
+            # 同一秒内备份同名文件时添加序号，不覆盖已有备份
+            counter = 1
+            while os.path.lexists(backup_path):
+                name, ext = os.path.splitext(backup_name)
+                backup_path = os.path.join(backup_dir, f"{name}_{counter}{ext}")
+                counter += 1
+                
+            if link:
+                FileUtils.link_or_copy(file_path, backup_path)
+            else:
+                shutil.copy2(file_path, backup_path)
             return backup_path
             
         except (OSError, IOError) as e:
@@ -147,39 +208,253 @@ class FileUtils:
         except (OSError, IOError) as e:
             print(f"移动文件失败 {src_path}: {e}")
             return False
+            
+    @staticmethod
+    def link_or_copy(src_path: str, dst_path: str):
+        """在 dst_path 创建 src_path 的硬链接，跨文件系统或不支持硬链接时复制
+        
+        dst_path 已存在时抛出 FileExistsError，不会覆盖。
+        """
+        try:
+            os.link(src_path, dst_path, follow_symlinks=False)
+        except FileExistsError:
+            raise
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+                raise
+            if os.path.lexists(dst_path):
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), dst_path)
+            shutil.copy2(src_path, dst_path, follow_symlinks=False)
+            
+    @staticmethod
+    def clone_file(src_path: str, dst_path: str):
+        """用 FICLONE 创建写时复制克隆：共享数据块，只写元数据
+        
+        文件系统不支持（或非 Linux）时抛出 OSError，不会退回到复制数据。
+        """
+        if fcntl is None:
+            raise OSError(errno.EOPNOTSUPP, "当前平台不支持 reflink", dst_path)
+        with open(src_path, 'rb') as src, open(dst_path, 'xb') as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError:
+                dst.close()
+                os.remove(dst_path)
+                raise
+                
+    @staticmethod
+    def replace_with_link(keep_path: str, dup_path: str, mode: str = 'hardlink',
+                          backup_path: Optional[str] = None, keep_record: Optional[FileRecord] = None,
+                          dup_record: Optional[FileRecord] = None):
+        """把重复文件原子地替换为指向保留文件的链接
+        
+        先在重复文件所在目录创建临时链接（hardlink 硬链接、reflink 写时复制克隆、
+        symlink 绝对路径符号链接），再用 os.replace 覆盖重复文件，任何时刻该路径都
+        指向完整的文件。reflink 保留重复文件原来的权限和时间戳。
+        
+        两个文件都提供扫描时的记录时，只比较当前的大小、mtime 和 inode，任何一项
+        与扫描时不同就拒绝替换，整个过程只涉及元数据；缺少记录时逐字节比较两个
+        文件的内容，不同则拒绝。
+        
+        Args:
+            keep_path: 保留的文件
+            dup_path: 要替换的重复文件
+            mode: hardlink / reflink / symlink
+            backup_path: 可选，替换前把重复文件硬链接（跨文件系统时复制）到此路径
+            keep_record: 保留文件扫描时的记录
+            dup_record: 重复文件扫描时的记录
+            
+        Raises:
+            OSError: 链接失败（如硬链接跨文件系统、文件系统不支持 reflink），或文件在扫描后
+                     已变化、内容与保留文件不同，此时重复文件保持原样
+        """
+        if mode not in FileUtils.LINK_MODES:
+            raise ValueError(f"不支持的链接方式: {mode}")
+            
+        keep_stat = os.stat(keep_path)
+        dup_stat = os.stat(dup_path)
+        if os.path.samestat(keep_stat, dup_stat):
+            return  # 已经是同一个文件
+        if keep_stat.st_size != dup_stat.st_size:
+            raise OSError(errno.EINVAL, "文件大小与保留文件不同，可能已被修改", dup_path)
+        if keep_record is not None and dup_record is not None:
+            FileUtils._check_unchanged(keep_path, keep_stat, keep_record)
+            FileUtils._check_unchanged(dup_path, dup_stat, dup_record)
+        elif not filecmp.cmp(keep_path, dup_path, shallow=False):
+            raise OSError(errno.EINVAL, "文件内容与保留文件不同", dup_path)
+            
+        directory, name = os.path.split(dup_path)
+        temp_path = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.dhtmp")
+        try:
+            if mode == 'hardlink':
+                os.link(keep_path, temp_path)
+            elif mode == 'reflink':
+                FileUtils.clone_file(keep_path, temp_path)
+                shutil.copystat(dup_path, temp_path)
+            else:
+                os.symlink(os.path.abspath(keep_path), temp_path)
+                
+            if backup_path is not None:
+                os.makedirs(os.path.dirname(backup_path) or '.', exist_ok=True)
+                FileUtils.link_or_copy(dup_path, backup_path)
+            os.replace(temp_path, dup_path)
+        finally:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+                
+    @staticmethod
+    def _check_unchanged(path: str, stat: os.stat_result, record: FileRecord):
+        """文件当前的大小、mtime、inode 与扫描时记录不同时抛出 OSError（记录中缺失的项不比较）"""
+        changed = (stat.st_size != record.size
+                   or (record.mtime_ns is not None and stat.st_mtime_ns != record.mtime_ns)
+                   or (record.inode and stat.st_ino != record.inode))
+        if changed:
+            raise OSError(errno.EINVAL, "文件在扫描后已被修改", path)
+
+
+class ReportGroup(NamedTuple):
+    """报告中的一个重复组"""
+    hash: str
+    size: int  # 单个文件大小
+    files: List[FileRecord]  # 组内各文件扫描时的元数据
 
 
 class ReportGenerator:
-    """报告生成器"""
+    """报告生成器
+    
+    各格式都逐组流式写出：不在内存中拼出完整报告，也不重新 stat 文件，
+    文件大小、修改时间等直接取自扫描时采集的元数据（ScanResult.file_records
+    或 ResultStore.iter_records）。输出经 1MB 缓冲写入，按文件扩展名
+    （.gz / .zst）或 compression 参数边写边压缩。
+    """
     
+    WRITE_BUFFER = 1024 * 1024  # 输出缓冲区大小（字节）
+    VIRTUAL_HTML_MIN_GROUPS = 2000  # 自动选择 HTML 报告样式时，重复组数达到该值使用虚拟滚动报告
+    COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+    
+    @staticmethod
+    def iter_groups(duplicate_groups, group_sizes: Optional[Dict[str, int]] = None,
+                    file_records: Optional[Dict[str, FileRecord]] = None) -> Iterator[ReportGroup]:
+        """把报告输入统一为 ReportGroup 序列
+        
+        Args:
+            duplicate_groups: {哈希值: 路径列表}，或 (哈希值, 文件大小, FileRecord 列表) 的可迭代对象
+            group_sizes: 每组单个文件大小（duplicate_groups 为字典时使用）
+            file_records: 路径 -> 扫描时的 FileRecord（duplicate_groups 为字典时使用）
+            
+        Yields:
+            ReportGroup；缺少元数据的文件，修改时间和 inode 为 None
+        """
+        if not isinstance(duplicate_groups, Mapping):
+            for hash_value, size, records in duplicate_groups:
+                yield ReportGroup(hash_value, size, records)
+            return
+            
+        group_sizes = group_sizes or {}
+        file_records = file_records or {}
+        for hash_value, paths in duplicate_groups.items():
+            size = group_sizes.get(hash_value)
+            records = []
+            for path in paths:
+                record = file_records.get(path)
+                if record is None:
+                    record = FileRecord(path, size, None, None, None)
+                elif size is None:
+                    size = record.size
+                records.append(record)
+            yield ReportGroup(hash_value, size, records)
+            
+    @staticmethod
+    def open_output(output_file: str, compression: Optional[str] = None) -> TextIO:
+        """打开报告输出流
+        
+        Args:
+            output_file: 输出文件路径
+            compression: gzip / zstd，None 表示按扩展名推断（.gz / .zst），否则不压缩
+            
+        Returns:
+            带缓冲的 UTF-8 文本流
+        """
+        if compression is None:
+            for name, suffix in ReportGenerator.COMPRESSION_SUFFIXES.items():
+                if output_file.endswith(suffix):
+                    compression = name
+                    
+        if compression is None:
+            return open(output_file, 'w', encoding='utf-8', newline='', buffering=ReportGenerator.WRITE_BUFFER)
+            
+        if compression == 'gzip':
+            raw = gzip.GzipFile(output_file, 'wb', compresslevel=6)
+        elif compression == 'zstd':
+            if zstandard is None:
+                raise ValueError("zstd 压缩需要安装 zstandard (pip install zstandard)")
+            raw = zstandard.ZstdCompressor().stream_writer(open(output_file, 'wb'))
+        else:
+            raise ValueError(f"不支持的压缩方式: {compression}")
+        return io.TextIOWrapper(io.BufferedWriter(raw, ReportGenerator.WRITE_BUFFER),
+                                encoding='utf-8', newline='')
+                                
+    @staticmethod
+    def _format_mtime(mtime_ns: Optional[int]) -> Optional[str]:
+        """格式化修改时间（纳秒时间戳），未知时返回 None"""
+        if mtime_ns is None:
+            return None
+        return datetime.fromtimestamp(mtime_ns / 1e9).isoformat()
+        
+    @staticmethod
+    def _group_data(group: ReportGroup) -> Dict[str, Any]:
+        """一个重复组的 JSON 结构（JSON 与 NDJSON 报告共用）
+        
+        字段全部取自扫描时的记录；不含 created_time，它需要逐个 stat 文件。
+        """
+        size_formatted = FileUtils.format_size(group.size) if group.size is not None else None
+        files = []
+        for record in group.files:
+            directory, name = os.path.split(record.path)
+            files.append({
+                'path': record.path,
+                'name': name,
+                'directory': directory,
+                'extension': os.path.splitext(name)[1].lower(),
+                'size': group.size,
+                'size_formatted': size_formatted,
+                'modified_time': ReportGenerator._format_mtime(record.mtime_ns),
+                'inode': record.inode
+            })
+        return {
+            'hash': group.hash,
+            'size': group.size,
+            'file_count': len(group.files),
+            'files': files
+        }
+        
     @staticmethod
-    def generate_json_report(duplicate_groups: Dict[str, List[str]], output_file: str) -> bool:
+    def generate_json_report(duplicate_groups, output_file: str, group_sizes: Optional[Dict[str, int]] = None,
+                             file_records: Optional[Dict[str, FileRecord]] = None,
+                             compression: Optional[str] = None) -> bool:
         """生成 JSON 格式报告
         
+        逐组写出，每组占一行；total_groups 在所有组之后写入。
+        
         Args:
-            duplicate_groups: 重复文件组
+            duplicate_groups: 重复文件组，格式见 iter_groups
             output_file: 输出文件路径
+            group_sizes: 每组单个文件大小
+            file_records: 路径 -> 扫描时的 FileRecord
+            compression: gzip / zstd，None 表示按扩展名推断
             
         Returns:
             是否生成成功
         """
         try:
-            report_data = {
-                'generated_at': datetime.now().isoformat(),
-                'total_groups': len(duplicate_groups),
-                'duplicate_groups': []
-            }
-            
-            for hash_value, files in duplicate_groups.items():
-                group_data = {
-                    'hash': hash_value,
-                    'file_count': len(files),
-                    'files': [FileUtils.get_file_info(f) for f in files]
-                }
-                report_data['duplicate_groups'].append(group_data)
-                
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=2, ensure_ascii=False)
+            with ReportGenerator.open_output(output_file, compression) as f:
+                f.write('{\n  "generated_at": %s,\n  "duplicate_groups": [' % json.dumps(datetime.now().isoformat()))
+                total_groups = 0
+                for group in ReportGenerator.iter_groups(duplicate_groups, group_sizes, file_records):
+                    f.write((',\n    ' if total_groups else '\n    ')
+                            + json.dumps(ReportGenerator._group_data(group), ensure_ascii=False))
+                    total_groups += 1
+                f.write(f'\n  ],\n  "total_groups": {total_groups}\n}}\n')
                 
             return True
             
@@ -188,32 +463,53 @@ class ReportGenerator:
             return False
             
     @staticmethod
-    def generate_csv_report(duplicate_groups: Dict[str, List[str]], output_file: str) -> bool:
-        """生成 CSV 格式报告
+    def generate_ndjson_report(duplicate_groups, output_file: str, group_sizes: Optional[Dict[str, int]] = None,
+                               file_records: Optional[Dict[str, FileRecord]] = None,
+                               compression: Optional[str] = None) -> bool:
+        """生成 NDJSON 格式报告（每行一个重复组，可边读边处理）
         
-        Args:
-            duplicate_groups: 重复文件组
-            output_file: 输出文件路径
+        参数同 generate_json_report。
+        
+        Returns:
+            是否生成成功
+        """
+        try:
+            with ReportGenerator.open_output(output_file, compression) as f:
+                for group in ReportGenerator.iter_groups(duplicate_groups, group_sizes, file_records):
+                    f.write(json.dumps(ReportGenerator._group_data(group), ensure_ascii=False) + '\n')
+                    
+            return True
             
+        except Exception as e:
+            print(f"生成 NDJSON 报告失败: {e}")
+            return False
+            
+    @staticmethod
+    def generate_csv_report(duplicate_groups, output_file: str, group_sizes: Optional[Dict[str, int]] = None,
+                            file_records: Optional[Dict[str, FileRecord]] = None,
+                            compression: Optional[str] = None) -> bool:
+        """生成 CSV 格式报告
+        
+        参数同 generate_json_report。
+        
         Returns:
             是否生成成功
         """
         try:
-            with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            with ReportGenerator.open_output(output_file, compression) as f:
                 writer = csv.writer(f)
                 writer.writerow(['组ID', '哈希值', '文件路径', '文件大小', '修改时间'])
                 
                 group_id = 1
-                for hash_value, files in duplicate_groups.items():
-                    for file_path in files:
-                        file_info = FileUtils.get_file_info(file_path)
-                        writer.writerow([
-                            group_id,
-                            hash_value,
-                            file_path,
-                            file_info.get('size_formatted', ''),
-                            file_info.get('modified_time', '')
-                        ])
+                for group in ReportGenerator.iter_groups(duplicate_groups, group_sizes, file_records):
+                    size_formatted = FileUtils.format_size(group.size) if group.size is not None else ''
+                    writer.writerows([
+                        group_id,
+                        group.hash,
+                        record.path,
+                        size_formatted,
+                        ReportGenerator._format_mtime(record.mtime_ns) or ''
+                    ] for record in group.files)
                     group_id += 1
                     
             return True
@@ -223,92 +519,160 @@ class ReportGenerator:
             return False
             
     @staticmethod
-    def generate_html_report(duplicate_groups: Dict[str, List[str]], output_file: str) -> bool:
+    def generate_html_report(duplicate_groups, output_file: str, group_sizes: Optional[Dict[str, int]] = None,
+                             file_records: Optional[Dict[str, FileRecord]] = None,
+                             compression: Optional[str] = None) -> bool:
         """生成 HTML 格式报告
         
-        Args:
-            duplicate_groups: 重复文件组
-            output_file: 输出文件路径
-            
+        逐组写出；汇总信息在所有组之后写入，通过 CSS order 显示在页面顶部。
+        参数同 generate_json_report。
+        
         Returns:
             是否生成成功
         """
         try:
-            html_content = f"""
-<!DOCTYPE html>
+            with ReportGenerator.open_output(output_file, compression) as f:
+                f.write("""<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>重复文件扫描报告</title>
     <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-        .header {{ background-color: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px; }}
-        .group {{ border: 1px solid #ddd; margin-bottom: 20px; border-radius: 5px; }}
-        .group-header {{ background-color: #e9ecef; padding: 10px; font-weight: bold; }}
-        .file-list {{ padding: 10px; }}
-        .file-item {{ padding: 5px 0; border-bottom: 1px solid #eee; }}
-        .file-path {{ font-family: monospace; }}
-        .file-size {{ color: #666; }}
-        .stats {{ display: flex; gap: 20px; }}
-        .stat-item {{ text-align: center; }}
+        body { font-family: Arial, sans-serif; margin: 20px; display: flex; flex-direction: column; }
+        .header { background-color: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px; order: -1; }
+        .group { border: 1px solid #ddd; margin-bottom: 20px; border-radius: 5px; }
+        .group-header { background-color: #e9ecef; padding: 10px; font-weight: bold; }
+        .file-list { padding: 10px; }
+        .file-item { padding: 5px 0; border-bottom: 1px solid #eee; }
+        .file-path { font-family: monospace; }
+        .file-size { color: #666; }
+        .stats { display: flex; gap: 20px; }
+        .stat-item { text-align: center; }
     </style>
 </head>
 <body>
+""")
+                
+                group_id = 1
+                total_files = wasted_space = 0
+                for group in ReportGenerator.iter_groups(duplicate_groups, group_sizes, file_records):
+                    size_formatted = FileUtils.format_size(group.size) if group.size is not None else 'N/A'
+                    parts = [f"""
+    <div class="group">
+        <div class="group-header">
+            重复组 #{group_id} - {len(group.files)} 个文件 (哈希: {group.hash[:16]}...)
+        </div>
+        <div class="file-list">
+"""]
+                    for record in group.files:
+                        parts.append(f"""            <div class="file-item">
+                <div class="file-path">{html.escape(record.path)}</div>
+                <div class="file-size">大小: {size_formatted} | 修改时间: {ReportGenerator._format_mtime(record.mtime_ns) or 'N/A'}</div>
+            </div>
+""")
+                    parts.append("""        </div>
+    </div>
+""")
+                    f.write(''.join(parts))
+                    
+                    total_files += len(group.files)
+                    wasted_space += (group.size or 0) * (len(group.files) - 1)
+                    group_id += 1
+                    
+                f.write(f"""
     <div class="header">
         <h1>重复文件扫描报告</h1>
         <div class="stats">
             <div class="stat-item">
-                <div><strong>{len(duplicate_groups)}</strong></div>
+                <div><strong>{group_id - 1}</strong></div>
                 <div>重复文件组</div>
             </div>
             <div class="stat-item">
-                <div><strong>{sum(len(files) for files in duplicate_groups.values())}</strong></div>
+                <div><strong>{total_files}</strong></div>
                 <div>重复文件数</div>
             </div>
-        </div>
-        <p>生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-    </div>
-"""
-            
-            group_id = 1
-            for hash_value, files in duplicate_groups.items():
-                html_content += f"""
-    <div class="group">
-        <div class="group-header">
-            重复组 #{group_id} - {len(files)} 个文件 (哈希: {hash_value[:16]}...)
-        </div>
-        <div class="file-list">
-"""
-                
-                for file_path in files:
-                    file_info = FileUtils.get_file_info(file_path)
-                    html_content += f"""
-            <div class="file-item">
-                <div class="file-path">{file_path}</div>
-                <div class="file-size">大小: {file_info.get('size_formatted', 'N/A')} | 修改时间: {file_info.get('modified_time', 'N/A')}</div>
+            <div class="stat-item">
+                <div><strong>{FileUtils.format_size(wasted_space)}</strong></div>
+                <div>可释放空间</div>
             </div>
-"""
-                
-                html_content += """
         </div>
+        <p>生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
     </div>
-"""
-                group_id += 1
-                
-            html_content += """
 </body>
 </html>
-"""
+""")
+                
+            return True
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+        except Exception as e:
+            print(f"生成 HTML 报告失败: {e}")
+            return False
+            
+    @staticmethod
+    def generate_virtual_html_report(duplicate_groups, output_file: str,
+                                     group_sizes: Optional[Dict[str, int]] = None,
+                                     file_records: Optional[Dict[str, FileRecord]] = None,
+                                     compression: Optional[str] = None) -> bool:
+        """生成虚拟滚动 HTML 报告（适合大量重复组）
+        
+        数据以 gzip 压缩的 JSON 块嵌入页面，浏览器只解码并渲染可见的行，
+        支持按可释放空间排序和搜索路径，打开速度与结果规模无关。
+        duplicate_groups 为字典时按可释放空间从大到小排列；为可迭代对象时应已按此顺序排列
+        （如 ResultStore.iter_records(sort='wasted')）。其余参数同 generate_json_report。
+        
+        Returns:
+            是否生成成功
+        """
+        try:
+            if isinstance(duplicate_groups, Mapping):
+                sizes = group_sizes or {}
+                order = sorted(duplicate_groups,
+                               key=lambda h: (sizes.get(h) or 0) * (len(duplicate_groups[h]) - 1), reverse=True)
+                duplicate_groups = {hash_value: duplicate_groups[hash_value] for hash_value in order}
+                
+            with ReportGenerator.open_output(output_file, compression) as f:
+                write_virtual_html(ReportGenerator.iter_groups(duplicate_groups, group_sizes, file_records), f)
                 
             return True
             
         except Exception as e:
             print(f"生成 HTML 报告失败: {e}")
             return False
+            
+    @staticmethod
+    def generate_columnar_report(duplicate_groups, output_file: str, group_sizes: Optional[Dict[str, int]] = None,
+                                 file_records: Optional[Dict[str, FileRecord]] = None,
+                                 file_format: Optional[str] = None, summary: Optional[Dict] = None) -> bool:
+        """生成列式结果文件（供分析工具加载，可用 load_columnar_report 读回）
+        
+        列：组编号、二进制摘要、文件大小、修改时间、inode、设备号、目录（字典编码）、文件名。
+        扩展名为 .parquet 时用 pyarrow 写 Parquet，否则写纯 Python 实现的 .dhc 格式。
+        
+        Args:
+            duplicate_groups: 重复文件组，格式见 iter_groups
+            output_file: 输出文件路径
+            group_sizes: 每组单个文件大小
+            file_records: 路径 -> 扫描时的 FileRecord
+            file_format: dhc / parquet，None 表示按扩展名推断
+            summary: 随文件保存的扫描摘要（total_files、total_size、scan_time、stage_stats）
+            
+        Returns:
+            是否生成成功
+        """
+        try:
+            write_columnar(ReportGenerator.iter_groups(duplicate_groups, group_sizes, file_records),
+                           output_file, file_format, summary)
+            return True
+            
+        except Exception as e:
+            print(f"生成列式结果失败: {e}")
+            return False
+            
+    @staticmethod
+    def load_columnar_report(input_file: str):
+        """读取列式结果文件，还原为 ScanResult（重复组、每组大小、文件元数据和扫描摘要）"""
+        return read_columnar(input_file)
 
 
 class ConfigManager:
@@ -0,0 +1,324 @@
+"""
+虚拟滚动 HTML 报告 - 数据以压缩 JSON 块嵌入页面，浏览器按需解码，只渲染可见的行
+"""
+
+import base64
+import gzip
+import json
+from datetime import datetime
+from typing import Iterable, List, Optional, TextIO, Tuple
+from .walker import FileRecord
+
+CHUNK_FILES = 5000  # 每个数据块大约包含的文件数
+CHUNK_TYPE = 'application/x-duplicatehunter-chunk'
+
+
+def write_virtual_html(groups: Iterable[Tuple[str, Optional[int], List[FileRecord]]], output: TextIO) -> dict:
+    """逐组写出虚拟滚动 HTML 报告
+    
+    重复组按输入顺序编号展示，调用方应按可释放空间从大到小传入。每约 CHUNK_FILES 个文件
+    组成一个块：[[摘要, 单个文件大小, [[路径, 修改时间（秒）], ...]], ...] 经 gzip 压缩、
+    base64 编码后写入一个 <script> 数据块，写完即释放。所有块之后写入清单（每块组数与汇总），
+    页面打开时只解码可见行所在的块，与结果规模无关。
+    
+    Args:
+        groups: (十六进制摘要, 单个文件大小, FileRecord 列表) 序列
+        output: 输出文本流
+        
+    Returns:
+        清单：generated_at、groups、files、wasted_space、chunks（每块的组数）
+    """
+    manifest = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'groups': 0,
+        'files': 0,
+        'wasted_space': 0,
+        'chunks': [],
+    }
+    output.write(_PAGE_HEAD)
+    
+    chunk = []
+    chunk_files = 0
+    for hash_value, size, records in groups:
+        size = size or 0
+        chunk.append([hash_value, size, [[record.path, None if record.mtime_ns is None else record.mtime_ns // 10 ** 9]
+                                         for record in records]])
+        chunk_files += len(records)
+        manifest['groups'] += 1
+        manifest['files'] += len(records)
+        manifest['wasted_space'] += size * (len(records) - 1)
+        if chunk_files >= CHUNK_FILES:
+            _write_chunk(output, chunk, manifest)
+            chunk = []
+            chunk_files = 0
+    if chunk:
+        _write_chunk(output, chunk, manifest)
+        
+    output.write(f'<script type="application/json" id="dh-manifest">{json.dumps(manifest)}</script>\n')
+    output.write(_PAGE_SCRIPT)
+    return manifest
+
+
+def _write_chunk(output: TextIO, chunk: list, manifest: dict):
+    """压缩并写出一个数据块（base64 不含 '<'，可安全放在 <script> 中）"""
+    data = json.dumps(chunk, ensure_ascii=False, separators=(',', ':')).encode('utf-8', 'surrogateescape')
+    encoded = base64.b64encode(gzip.compress(data, compresslevel=6)).decode('ascii')
+    output.write(f'<script type="{CHUNK_TYPE}">{encoded}</script>\n')
+    manifest['chunks'].append(len(chunk))
+
+
+_PAGE_HEAD = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>重复文件扫描报告</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 0; height: 100vh; display: flex; flex-direction: column; }
+        .header { background-color: #f8f9fa; padding: 12px 20px; border-bottom: 1px solid #ddd; }
+        .header h1 { margin: 0 0 8px; font-size: 22px; }
+        .stats { display: flex; gap: 24px; color: #333; }
+        .toolbar { display: flex; gap: 10px; align-items: center; margin-top: 10px; }
+        .toolbar input { flex: 0 1 420px; padding: 6px 8px; }
+        .toolbar button { padding: 6px 12px; cursor: pointer; }
+        #status { color: #666; }
+        .main { flex: 1; display: flex; min-height: 0; }
+        #viewport { flex: 3; overflow-y: auto; position: relative; }
+        #spacer { position: relative; }
+        .row { position: absolute; left: 0; right: 0; height: 28px; line-height: 28px; padding: 0 10px;
+               border-bottom: 1px solid #eee; white-space: nowrap; overflow: hidden; text-overflow: ellipsis;
+               cursor: pointer; box-sizing: border-box; }
+        .row:hover { background-color: #f1f3f5; }
+        .row.selected { background-color: #e7f1ff; }
+        .row span { display: inline-block; margin-right: 12px; }
+        .num { width: 70px; color: #888; }
+        .wasted { width: 90px; font-weight: bold; }
+        .count { width: 140px; color: #666; }
+        .path { font-family: monospace; }
+        #detail { flex: 2; overflow-y: auto; border-left: 1px solid #ddd; padding: 10px 16px; }
+        .file-path { font-family: monospace; word-break: break-all; }
+        .file-size { color: #666; font-size: 13px; margin-bottom: 6px; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>重复文件扫描报告</h1>
+        <div class="stats" id="stats">加载中...</div>
+        <div class="toolbar">
+            <input id="search" type="search" placeholder="搜索路径或哈希值...">
+            <button id="order" type="button">可释放空间 ↓</button>
+            <span id="status"></span>
+        </div>
+    </div>
+    <div class="main">
+        <div id="viewport"><div id="spacer"></div></div>
+        <div id="detail"><p>点击重复组查看文件列表</p></div>
+    </div>
+"""
+
+_PAGE_SCRIPT = """<script>
+(function () {
+    'use strict';
+    var ROW_HEIGHT = 28;
+    var OVERSCAN = 10;
+    var MAX_CACHED = 64;  // 最多保留的已解码块数
+    
+    var manifest = JSON.parse(document.getElementById('dh-manifest').textContent);
+    var blocks = document.querySelectorAll('script[type="application/x-duplicatehunter-chunk"]');
+    var viewport = document.getElementById('viewport');
+    var spacer = document.getElementById('spacer');
+    var detail = document.getElementById('detail');
+    var status = document.getElementById('status');
+    
+    var chunkStarts = [];  // 每块第一个组的序号
+    var total = 0;
+    manifest.chunks.forEach(function (count) { chunkStarts.push(total); total += count; });
+    
+    var cache = new Map();  // 块序号 -> 组数组，按最近使用顺序
+    var pending = new Map();
+    var view = null;  // 搜索结果（组序号数组），null 表示全部
+    var ascending = false;
+    var selected = -1;
+    var renderQueued = false;
+    
+    function formatSize(bytes) {
+        var units = ['B', 'KB', 'MB', 'GB', 'TB'];
+        var i = 0;
+        while (bytes >= 1024 && i < units.length - 1) { bytes /= 1024; i++; }
+        return bytes.toFixed(2) + units[i];
+    }
+    
+    function escapeHtml(text) {
+        return text.replace(/[&<>"']/g, function (c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+    
+    function inflate(text) {
+        var binary = atob(text);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) { bytes[i] = binary.charCodeAt(i); }
+        var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+        return new Response(stream).text().then(JSON.parse);
+    }
+    
+    function loadChunk(index) {
+        if (cache.has(index)) {
+            var groups = cache.get(index);
+            cache.delete(index);
+            cache.set(index, groups);
+            return Promise.resolve(groups);
+        }
+        if (!pending.has(index)) {
+            pending.set(index, inflate(blocks[index].textContent).then(function (groups) {
+                pending.delete(index);
+                cache.set(index, groups);
+                if (cache.size > MAX_CACHED) { cache.delete(cache.keys().next().value); }
+                return groups;
+            }));
+        }
+        return pending.get(index);
+    }
+    
+    function chunkOf(groupIndex) {
+        var low = 0, high = chunkStarts.length - 1;
+        while (low < high) {
+            var mid = (low + high + 1) >> 1;
+            if (chunkStarts[mid] <= groupIndex) { low = mid; } else { high = mid - 1; }
+        }
+        return low;
+    }
+    
+    function groupAt(groupIndex) {
+        var chunk = chunkOf(groupIndex);
+        var groups = cache.get(chunk);
+        if (!groups) {
+            loadChunk(chunk).then(scheduleRender);
+            return null;
+        }
+        return groups[groupIndex - chunkStarts[chunk]];
+    }
+    
+    function rowCount() { return view ? view.length : total; }
+    
+    function groupIndexAt(row) {
+        var position = ascending ? rowCount() - 1 - row : row;
+        return view ? view[position] : position;
+    }
+    
+    function scheduleRender() {
+        if (!renderQueued) {
+            renderQueued = true;
+            requestAnimationFrame(render);
+        }
+    }
+    
+    function render() {
+        renderQueued = false;
+        var count = rowCount();
+        spacer.style.height = (count * ROW_HEIGHT) + 'px';
+        var first = Math.max(0, Math.floor(viewport.scrollTop / ROW_HEIGHT) - OVERSCAN);
+        var last = Math.min(count, Math.ceil((viewport.scrollTop + viewport.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+        var html = [];
+        for (var row = first; row < last; row++) {
+            var index = groupIndexAt(row);
+            var group = groupAt(index);
+            var top = 'top:' + (row * ROW_HEIGHT) + 'px';
+            if (!group) {
+                html.push('<div class="row" style="' + top + '">加载中...</div>');
+                continue;
+            }
+            var size = group[1], files = group[2];
+            html.push('<div class="row' + (index === selected ? ' selected' : '') + '" data-index="' + index +
+                      '" style="' + top + '"><span class="num">#' + (index + 1) + '</span>' +
+                      '<span class="wasted">' + formatSize(size * (files.length - 1)) + '</span>' +
+                      '<span class="count">' + files.length + ' × ' + formatSize(size) + '</span>' +
+                      '<span class="path">' + escapeHtml(files[0][0]) + (files.length > 1 ? ' ...' : '') + '</span></div>');
+        }
+        spacer.innerHTML = html.join('');
+    }
+    
+    function showDetail(index) {
+        var group = groupAt(index);
+        if (!group) { return; }
+        selected = index;
+        var size = group[1], files = group[2];
+        detail.innerHTML = '<h3>重复组 #' + (index + 1) + '</h3><p>哈希: <code>' + escapeHtml(group[0]) + '</code><br>' +
+            files.length + ' 个文件，每个 ' + formatSize(size) + '，可释放 ' + formatSize(size * (files.length - 1)) +
+            '</p><ol>' + files.map(function (file) {
+                var mtime = file[1] === null ? 'N/A' : new Date(file[1] * 1000).toLocaleString();
+                return '<li><div class="file-path">' + escapeHtml(file[0]) + '</div>' +
+                       '<div class="file-size">修改时间: ' + mtime + '</div></li>';
+            }).join('') + '</ol>';
+        scheduleRender();
+    }
+    
+    var searchToken = 0;
+    function runSearch(query) {
+        var token = ++searchToken;
+        query = query.trim().toLowerCase();
+        if (!query) {
+            view = null;
+            status.textContent = '';
+            viewport.scrollTop = 0;
+            scheduleRender();
+            return;
+        }
+        // 逐块解码并过滤，只保留匹配的组序号；解码结果不进入缓存
+        var matches = [];
+        var chunk = 0;
+        function next() {
+            if (token !== searchToken) { return; }
+            if (chunk >= blocks.length) {
+                view = Int32Array.from(matches);
+                status.textContent = '找到 ' + matches.length + ' 组';
+                viewport.scrollTop = 0;
+                scheduleRender();
+                return;
+            }
+            status.textContent = '搜索中... ' + chunk + '/' + blocks.length;
+            var current = chunk++;
+            var source = cache.has(current) ? Promise.resolve(cache.get(current)) : inflate(blocks[current].textContent);
+            source.then(function (groups) {
+                groups.forEach(function (group, i) {
+                    if (group[0].indexOf(query) !== -1 || group[2].some(function (file) {
+                        return file[0].toLowerCase().indexOf(query) !== -1;
+                    })) {
+                        matches.push(chunkStarts[current] + i);
+                    }
+                });
+                next();
+            });
+        }
+        next();
+    }
+    
+    document.getElementById('stats').innerHTML =
+        '<span><strong>' + manifest.groups + '</strong> 重复文件组</span>' +
+        '<span><strong>' + manifest.files + '</strong> 重复文件数</span>' +
+        '<span><strong>' + formatSize(manifest.wasted_space) + '</strong> 可释放空间</span>' +
+        '<span>生成时间: ' + manifest.generated_at + '</span>';
+        
+    var searchTimer = null;
+    document.getElementById('search').addEventListener('input', function (event) {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(function () { runSearch(event.target.value); }, 300);
+    });
+    document.getElementById('order').addEventListener('click', function (event) {
+        ascending = !ascending;
+        event.target.textContent = ascending ? '可释放空间 ↑' : '可释放空间 ↓';
+        viewport.scrollTop = 0;
+        scheduleRender();
+    });
+    spacer.addEventListener('click', function (event) {
+        var row = event.target.closest('.row[data-index]');
+        if (row) { showDetail(Number(row.dataset.index)); }
+    });
+    viewport.addEventListener('scroll', scheduleRender);
+    window.addEventListener('resize', scheduleRender);
+    scheduleRender();
+})();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,233 @@
+"""
+目录遍历器 - 基于 os.scandir，每个文件只 stat 一次
+"""
+
+import os
+import queue
+import threading
+from typing import TYPE_CHECKING, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from .instrumentation import ScanMetrics
+    from .snapshot import TreeSnapshot
+
+
+class FileRecord(NamedTuple):
+    """遍历时采集的文件元数据，贯穿整个扫描流程"""
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    dev: int
+    
+    @classmethod
+    def from_stat(cls, path: str, st: os.stat_result) -> 'FileRecord':
+        """由 stat 结果构造文件记录"""
+        return cls(path, st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+
+
+class DirectoryWalker:
+    """目录遍历器
+    
+    使用 os.scandir 遍历目录树，对每个普通文件只调用一次 DirEntry.stat()，
+    之后的过滤、分组和统计都只使用 FileRecord 中的元数据。
+    
+    threads 大于 1 时由多个线程并发遍历：每个线程维护本地目录栈，
+    新发现的子目录优先放入有界共享队列供空闲线程窃取，队列满时留在本地处理。
+    
+    提供快照时进行增量遍历：目录 mtime 与上次快照一致时不再读取该目录，直接复用
+    快照中的文件列表和子目录（仍会继续检查其子目录）。原地改写文件不会改变目录
+    mtime，因此复用的文件仍逐个重新 stat，大小、mtime 或 inode 变化的文件
+    会被视为已修改。
+    """
+    
+    POLL_INTERVAL = 0.05  # 线程等待共享队列时检查停止事件的间隔（秒）
+    
+    def __init__(self, exclude_dirs: Optional[Set[str]] = None,
+                 stop_event: Optional[threading.Event] = None,
+                 threads: int = 1, queue_size: int = 1024,
+                 previous: Optional['TreeSnapshot'] = None, current: Optional['TreeSnapshot'] = None,
+                 metrics: Optional['ScanMetrics'] = None):
+        """初始化遍历器
+        
+        Args:
+            exclude_dirs: 排除的目录名
+            stop_event: 停止事件，设置后尽快结束遍历
+            threads: 遍历线程数，1 表示单线程遍历
+            queue_size: 共享目录队列容量
+            previous: 上次扫描的快照，用于跳过未变化的目录
+            current: 记录本次遍历结果的快照
+            metrics: 可选的扫描度量，记录读取/复用的目录数、stat 的文件数和错误类型
+        """
+        self.previous = previous
+        self.current = current
+        self.exclude_dirs = exclude_dirs or set()
+        self.threads = max(1, threads)
+        self.queue_size = queue_size
+        self.metrics = metrics
+        self._stop_event = stop_event or threading.Event()
+        
+    def walk(self, directory: str) -> Iterator[FileRecord]:
+        """遍历目录，逐个产出普通文件的记录
+        
+        Args:
+            directory: 根目录
+            
+        Yields:
+            FileRecord: 文件记录（多线程遍历时顺序不固定）
+        """
+        if self.threads > 1:
+            yield from self._walk_parallel(directory)
+            return
+            
+        stack = [directory]
+        
+        while stack:
+            if self._stop_event.is_set():
+                return
+                
+            records, subdirs = self.scan_dir(stack.pop())
+            yield from records
+            # 逆序入栈，保持与 os.walk 相近的遍历顺序
+            stack.extend(reversed(subdirs))
+            
+    def _walk_parallel(self, directory: str) -> Iterator[FileRecord]:
+        """多线程遍历目录树"""
+        work_queue = queue.Queue(maxsize=self.queue_size)
+        output_queue = queue.Queue()
+        finished = threading.Event()
+        lock = threading.Lock()
+        pending = [1]  # 已发现但尚未处理完的目录数（含各线程本地栈中的目录）
+        
+        work_queue.put(directory)
+        
+        def worker():
+            while not finished.is_set() and not self._stop_event.is_set():
+                try:
+                    local_stack = [work_queue.get(timeout=self.POLL_INTERVAL)]
+                except queue.Empty:
+                    continue
+                    
+                processed = 0
+                try:
+                    while local_stack and not finished.is_set() and not self._stop_event.is_set():
+                        path = local_stack.pop()
+                        processed += 1
+                        records, subdirs = self.scan_dir(path)
+                        if records:
+                            output_queue.put(records)
+                            
+                        for subdir in subdirs:
+                            with lock:
+                                pending[0] += 1
+                            try:
+                                work_queue.put_nowait(subdir)
+                            except queue.Full:
+                                local_stack.append(subdir)
+                except Exception as e:
+                    # 交给消费者抛出：扫描失败，而不是因 pending 无法归零而一直等待
+                    finished.set()
+                    output_queue.put(e)
+                finally:
+                    with lock:
+                        pending[0] -= processed
+                        if pending[0] == 0:
+                            finished.set()
+                            output_queue.put(None)
+                        
+        workers = [threading.Thread(target=worker, daemon=True) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+            
+        try:
+            while True:
+                try:
+                    records = output_queue.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    if self._stop_event.is_set():
+                        return
+                    continue
+                    
+                if records is None:
+                    return
+                if isinstance(records, Exception):
+                    raise records
+                yield from records
+        finally:
+            finished.set()
+            for thread in workers:
+                thread.join()
+                
+    def scan_dir(self, path: str) -> Tuple[List[FileRecord], List[str]]:
+        """读取单个目录（增量模式下优先复用快照）
+        
+        Args:
+            path: 目录路径
+            
+        Returns:
+            (该目录下的文件记录, 需要继续遍历的子目录)
+        """
+        if self.current is None:
+            return self._read_dir(path)
+            
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError as e:
+            if self.metrics is not None:
+                self.metrics.record_error(e)
+            return [], []
+            
+        cached = self.previous.lookup_dir(path, mtime_ns) if self.previous is not None else None
+        if cached is not None:
+            if self.metrics is not None:
+                self.metrics.count('dirs_reused')
+            records, subdirs = self._restat(cached[0]), cached[1]
+        else:
+            records, subdirs = self._read_dir(path)
+        self.current.record_dir(path, mtime_ns, records, subdirs)
+        return records, subdirs
+        
+    def _restat(self, records: List[FileRecord]) -> List[FileRecord]:
+        """重新 stat 快照中的文件，返回当前的文件记录
+        
+        省去的是读取目录本身；文件内容可能被原地改写（目录 mtime 不变），
+        必须取得当前的大小、mtime 和 inode 才能发现。已不存在的文件不再返回。
+        """
+        current = []
+        for record in records:
+            try:
+                current.append(FileRecord.from_stat(record.path, os.stat(record.path)))
+            except OSError as e:
+                if self.metrics is not None:
+                    self.metrics.record_error(e)
+        if self.metrics is not None:
+            self.metrics.count('files_stat', len(current))
+        return current
+        
+    def _read_dir(self, path: str) -> Tuple[List[FileRecord], List[str]]:
+        """用 os.scandir 读取单个目录"""
+        records = []
+        subdirs = []
+        
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        # 与 os.walk 一致：不跟随目录符号链接
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self.exclude_dirs:
+                                subdirs.append(entry.path)
+                        elif entry.is_file():
+                            records.append(FileRecord.from_stat(entry.path, entry.stat()))
+                    except OSError as e:
+                        if self.metrics is not None:
+                            self.metrics.record_error(e)
+                        continue
+        except OSError as e:
+            if self.metrics is not None:
+                self.metrics.record_error(e)
+                
+        if self.metrics is not None:
+            self.metrics.count('dirs_read')
+            self.metrics.count('files_stat', len(records))
+        return records, subdirs
@@ -2,28 +2,53 @@
 Web 应用主程序
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file
 import os
 import threading
 import time
 from datetime import datetime
+from ..actions import ActionExecutor, ActionJournal, plan_actions
+from ..hasher import FileHasher
 from ..scanner import FileScanner, ScanConfig, ScanResult
-from ..utils import FileUtils, ReportGenerator
+from ..utils import ConfigManager, FileUtils, ReportGenerator
+from .telemetry import ServiceMetrics
 
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'duplicate-hunter-secret-key'
+app.config['MEMORY_LIMIT'] = None  # 扫描内存预算（字节），由 create_app 从 config.yaml 读取
 
 # 全局变量
 current_scan = None
 scan_thread = None
 scan_results = {}
+result_stores = {}  # scan_id -> ResultStore，重复组只保存在磁盘上
+extra_stores = {}  # scan_id -> {'hardlinks' / 'new' / 'resolved': ResultStore}，硬链接组与增量变化
+GROUP_KINDS = ('duplicates', 'hardlinks', 'new', 'resolved')
+MAX_KEPT_SCANS = 5  # 最多保留几次扫描的结果，开始新扫描时关闭更早的结果存储
+service_metrics = ServiceMetrics()  # 供 /metrics 导出的累计运行指标
 
 
 @app.route('/')
 def index():
     """主页"""
-    return render_template('index.html')
+    extra_algorithms = [name for name in FileHasher.available_algorithms()
+                        if name not in ('md5', 'sha1', 'sha256')]
+    return render_template('index.html', extra_algorithms=extra_algorithms)
+
+
+@app.route('/metrics')
+def metrics():
+    """以 Prometheus 文本格式导出运行指标"""
+    hasher_stats = current_scan.hasher.get_algorithm_info() if current_scan is not None else None
+    return Response(service_metrics.render(hasher_stats),
+                    mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/algorithms')
+def list_algorithms():
+    """获取可用的哈希算法"""
+    return jsonify({'algorithms': FileHasher.available_algorithms()})
 
 
 @app.route('/api/scan', methods=['POST'])
@@ -44,9 +69,20 @@ def start_scan():
     # 创建扫描配置
     config = ScanConfig(
         algorithm=data.get('algorithm', 'md5'),
+        verify_algorithm=data.get('verify_algorithm'),
         min_size=data.get('min_size', 1024),
         max_size=data.get('max_size'),
-        threads=data.get('threads', 4)
+        threads=data.get('threads', 4),
+        adaptive_threads=data.get('adaptive_threads', False),
+        io_order=data.get('io_order', 'auto'),
+        walk_threads=data.get('walk_threads', 4),
+        executor=data.get('executor', 'thread'),
+        async_open_files=data.get('async_open_files', 64),
+        max_inflight_bytes=data.get('max_inflight_bytes', 64 * 1024 * 1024),
+        index_path=data.get('index_path'),
+        snapshot_path=data.get('snapshot_path'),
+        memory_limit=app.config['MEMORY_LIMIT'],
+        profile=data.get('profile')
     )
     
     # 处理文件扩展名过滤
@@ -60,9 +96,17 @@ def start_scan():
         config.exclude_dirs.update(exclude_dirs)
         
     # 创建扫描器
-    current_scan = FileScanner(config)
+    try:
+        current_scan = FileScanner(config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     scan_id = str(int(time.time()))
     
+    # 同一秒内重新扫描会替换之前的结果；结果过多时关闭最早的
+    discard_scan(scan_id)
+    while len(scan_results) >= MAX_KEPT_SCANS:
+        discard_scan(min(scan_results, key=int))
+        
     # 启动扫描线程
     scan_thread = threading.Thread(
         target=run_scan,
@@ -85,10 +129,14 @@ def get_scan_status(scan_id):
     result = scan_results[scan_id]
     
     if result['status'] == 'running':
+        store = result_stores.get(scan_id)
+        scan_result = result.get('scan_result')
         return jsonify({
             'status': 'running',
             'progress': result.get('progress', {}),
-            'message': result.get('message', '扫描中...')
+            'message': result.get('message', '扫描中...'),
+            'groups_found': len(store) if store is not None else 0,
+            'metrics': scan_result.metrics.to_dict() if scan_result is not None and scan_result.metrics else None
         })
     elif result['status'] == 'completed':
         return jsonify({
@@ -105,6 +153,54 @@ def get_scan_status(scan_id):
     return jsonify({'status': 'unknown'})
 
 
+@app.route('/api/scan/<scan_id>', methods=['DELETE'])
+def delete_scan(scan_id):
+    """删除扫描结果"""
+    if scan_id not in scan_results:
+        return jsonify({'error': '扫描结果不存在'}), 404
+    if scan_results[scan_id]['status'] == 'running':
+        return jsonify({'error': '扫描进行中，请先停止'}), 400
+        
+    discard_scan(scan_id)
+    return jsonify({'message': '扫描结果已删除'})
+
+
+@app.route('/api/scan/<scan_id>/groups')
+def get_scan_groups(scan_id):
+    """分页查询重复组（扫描进行中也可查询已确认的组）
+    
+    查询参数: offset, limit, min_size, max_size, path_prefix, min_files, sort,
+    kind（duplicates 重复组 / hardlinks 硬链接组 / new 增量扫描新增的组 / resolved 已消除的组）
+    """
+    kind = request.args.get('kind', 'duplicates')
+    if kind not in GROUP_KINDS:
+        return jsonify({'error': f'不支持的分组类型: {kind}'}), 400
+        
+    store = result_stores.get(scan_id) if kind == 'duplicates' else extra_stores.get(scan_id, {}).get(kind)
+    if store is None:
+        return jsonify({'error': '扫描结果不存在'}), 404
+        
+    try:
+        offset = request.args.get('offset', 0, type=int)
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        filters = {
+            'min_size': request.args.get('min_size', type=int),
+            'max_size': request.args.get('max_size', type=int),
+            'path_prefix': request.args.get('path_prefix') or None,
+            'min_files': request.args.get('min_files', type=int),
+        }
+        groups = store.query(offset, limit, sort=request.args.get('sort', 'wasted'), **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    return jsonify({
+        'total': store.count(**filters),
+        'offset': offset,
+        'limit': limit,
+        'groups': groups
+    })
+
+
 @app.route('/api/scan/<scan_id>/stop', methods=['POST'])
 def stop_scan(scan_id):
     """停止扫描"""
@@ -117,6 +213,31 @@ def stop_scan(scan_id):
     return jsonify({'error': '没有正在进行的扫描'}), 400
 
 
+def run_file_action(action: str, files, dst_dir, scan_id=None, targets=None):
+    """按设备并行执行删除/移动/替换为链接，操作日志写入 journals 目录，返回响应数据"""
+    # 有扫描结果时使用扫描时记录的元数据（大小、设备号，替换为链接时还有保留文件的），不再逐个 stat
+    file_records = None
+    if scan_id in result_stores:
+        file_records = result_stores[scan_id].lookup_records(list(files) + list(set((targets or {}).values())))
+    ops = plan_actions(action, files, dst_dir, file_records, targets=targets)
+    
+    journals_dir = os.path.abspath('journals')
+    journal_name = f"{action}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl"
+    journal = ActionJournal(os.path.join(journals_dir, journal_name))
+    journal.begin(action, ops)
+    try:
+        summary = ActionExecutor(journal=journal).execute(ops)
+    finally:
+        journal.close()
+        
+    return {
+        'results': [{'file': file_path, 'success': summary.results.get(file_path, False)} for file_path in files],
+        'journal': journal_name,
+        'elapsed': summary.elapsed,
+        'files_per_second': summary.files_per_second,
+    }
+
+
 @app.route('/api/files/delete', methods=['POST'])
 def delete_files():
     """删除文件"""
@@ -124,15 +245,7 @@ def delete_files():
     files = data.get('files', [])
     backup_dir = data.get('backup_dir')
     
-    results = []
-    for file_path in files:
-        success = FileUtils.safe_delete_file(file_path, backup_dir)
-        results.append({
-            'file': file_path,
-            'success': success
-        })
-        
-    return jsonify({'results': results})
+    return jsonify(run_file_action('delete', files, backup_dir, data.get('scan_id')))
 
 
 @app.route('/api/files/move', methods=['POST'])
@@ -145,15 +258,60 @@ def move_files():
     if not target_dir:
         return jsonify({'error': '目标目录不能为空'}), 400
         
-    results = []
-    for file_path in files:
-        success = FileUtils.move_file(file_path, target_dir)
-        results.append({
-            'file': file_path,
-            'success': success
-        })
+    return jsonify(run_file_action('move', files, target_dir, data.get('scan_id')))
+
+
+@app.route('/api/files/link', methods=['POST'])
+def link_files():
+    """把重复文件替换为指向保留文件的硬链接、reflink 克隆或符号链接"""
+    data = request.get_json()
+    files = data.get('files', [])
+    keep = data.get('keep')
+    mode = data.get('mode', 'hardlink')
+    backup_dir = data.get('backup_dir')
+    
+    scan_id = data.get('scan_id')
+    
+    if mode not in FileUtils.LINK_MODES:
+        return jsonify({'error': '不支持的链接方式'}), 400
+    if scan_id not in result_stores:
+        return jsonify({'error': '扫描结果不存在'}), 400
+    if not keep or not os.path.isfile(keep):
+        return jsonify({'error': '保留文件不存在'}), 400
+        
+    # 只允许替换与保留文件在同一重复组中的文件，替换前再按扫描时的元数据校验
+    files = [file_path for file_path in files if file_path != keep]
+    group_ids = result_stores[scan_id].group_ids(files + [keep])
+    outside = [file_path for file_path in files
+               if keep not in group_ids or group_ids.get(file_path) != group_ids[keep]]
+    if outside:
+        return jsonify({'error': '文件与保留文件不在同一重复组', 'files': outside}), 400
+        
+    return jsonify(run_file_action(mode, files, backup_dir, scan_id,
+                                   targets={file_path: keep for file_path in files}))
+
+
+@app.route('/api/files/undo', methods=['POST'])
+def undo_files():
+    """按操作日志撤销删除（需有备份）、移动或替换为链接"""
+    data = request.get_json()
+    journal_name = os.path.basename(data.get('journal') or '')
+    journal_path = os.path.join(os.path.abspath('journals'), journal_name)
+    
+    if not journal_name or not os.path.exists(journal_path):
+        return jsonify({'error': '操作日志不存在'}), 400
+        
+    ops = ActionJournal.load(journal_path).undoable()
+    journal = ActionJournal(journal_path)
+    journal.reopen()
+    try:
+        summary = ActionExecutor(journal=journal).undo(ops)
+    finally:
+        journal.close()
         
-    return jsonify({'results': results})
+    return jsonify({
+        'results': [{'file': op.src, 'success': summary.results.get(op.src, False)} for op in ops],
+    })
 
 
 @app.route('/api/report/generate', methods=['POST'])
@@ -163,11 +321,23 @@ def generate_report():
         data = request.get_json()
         scan_id = data.get('scan_id')
         format_type = data.get('format', 'html')
+        compression = data.get('compression')
+        html_style = data.get('html_style', 'auto')
         
         if scan_id not in scan_results or scan_results[scan_id]['status'] != 'completed':
             return jsonify({'error': '扫描结果不存在'}), 400
             
-        duplicate_groups = scan_results[scan_id]['data']['duplicate_groups']
+        writers = {
+            'json': ReportGenerator.generate_json_report,
+            'ndjson': ReportGenerator.generate_ndjson_report,
+            'csv': ReportGenerator.generate_csv_report,
+            'html': ReportGenerator.generate_html_report,
+        }
+        if format_type not in writers:
+            return jsonify({'error': '不支持的报告格式'}), 400
+        if compression is not None and compression not in ReportGenerator.COMPRESSION_SUFFIXES:
+            return jsonify({'error': '不支持的压缩方式'}), 400
+            
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
         # 确保报告目录存在
@@ -175,18 +345,20 @@ def generate_report():
         os.makedirs(reports_dir, exist_ok=True)
         
         filename = f'duplicate_report_{timestamp}.{format_type}'
+        if compression is not None:
+            filename += ReportGenerator.COMPRESSION_SUFFIXES[compression]
         filepath = os.path.join(reports_dir, filename)
         
-        success = False
-        if format_type == 'json':
-            success = ReportGenerator.generate_json_report(duplicate_groups, filepath)
-        elif format_type == 'csv':
-            success = ReportGenerator.generate_csv_report(duplicate_groups, filepath)
-        elif format_type == 'html':
-            success = ReportGenerator.generate_html_report(duplicate_groups, filepath)
+        # 从结果存储逐组读取，使用扫描时记录的文件元数据
+        store = result_stores[scan_id]
+        if format_type == 'html' and (html_style == 'virtual' or (
+                html_style == 'auto' and len(store) >= ReportGenerator.VIRTUAL_HTML_MIN_GROUPS)):
+            # 虚拟滚动报告按可释放空间从大到小展示
+            success = ReportGenerator.generate_virtual_html_report(store.iter_records(sort='wasted'), filepath,
+                                                                   compression=compression)
         else:
-            return jsonify({'error': '不支持的报告格式'}), 400
-            
+            success = writers[format_type](store.iter_records(), filepath, compression=compression)
+        
         if success:
             return jsonify({
                 'filename': filename,
@@ -238,41 +410,109 @@ def run_scan(scanner: FileScanner, directory: str, scan_id: str):
     
     scanner.set_progress_callback(progress_callback)
     
+    store = scanner.create_result_store()
+    result_stores[scan_id] = store
+    # 扫描中的度量通过状态接口和 /metrics 实时查看
+    result = ScanResult()
+    scan_results[scan_id]['scan_result'] = result
+    service_metrics.scan_started(result, lambda: scan_results[scan_id].get('progress'))
+    
     try:
-        # 执行扫描
-        result = scanner.scan_directory(directory)
+        # 执行扫描，重复组确认一组写入一组
+        for hash_val, files in scanner.iter_duplicates(directory, result):
+            store.add(hash_val, result.group_sizes.get(hash_val, 0), files,
+                      [result.file_records[path] for path in files])
+        store.flush()
+        extra_stores[scan_id] = store_extra_groups(scanner, result)
         
         # 获取统计信息
-        statistics = scanner.get_scan_statistics(result)
+        statistics = scanner.get_scan_statistics(result, store)
         
-        # 保存结果
+        service_metrics.scan_finished(result)
+        
+        # 保存结果（重复组、硬链接组和增量变化通过 /api/scan/<scan_id>/groups 分页获取，这里只给组数）
         scan_results[scan_id] = {
             'status': 'completed',
             'data': {
                 'total_files': result.total_files,
                 'total_size': result.total_size,
-                'duplicate_groups': result.duplicate_groups,
+                'group_count': len(store),
+                'hardlink_group_count': len(result.hardlink_groups),
+                'delta': summarize_delta(result.delta),
                 'scan_time': result.scan_time,
-                'errors': result.errors
+                'errors': result.errors,
+                'metrics': result.metrics.to_dict() if result.metrics is not None else None
             },
             'statistics': statistics,
             'end_time': time.time()
         }
         
     except Exception as e:
+        service_metrics.scan_finished(result, failed=True)
         scan_results[scan_id] = {
             'status': 'error',
             'error': str(e),
             'end_time': time.time()
         }
+    finally:
+        scanner.close()
 
 
-def create_app():
-    """创建 Flask 应用"""
+def store_extra_groups(scanner: FileScanner, result: ScanResult):
+    """把硬链接组和增量扫描新增/消除的组写入各自的结果存储"""
+    stores = {kind: scanner.create_result_store() for kind in GROUP_KINDS[1:]}
+    for key, files in result.hardlink_groups.items():
+        stores['hardlinks'].add(key, result.hardlink_sizes.get(key, 0), files)
+    if result.delta is not None:
+        for hash_val, files in result.delta['new_groups'].items():
+            stores['new'].add(hash_val, result.group_sizes.get(hash_val, 0), files)
+        for hash_val, files in result.delta['resolved_groups'].items():
+            stores['resolved'].add(hash_val, result.delta['resolved_sizes'].get(hash_val, 0), files)
+            
+    for store in stores.values():
+        store.flush()
+    return stores
+
+
+def summarize_delta(delta):
+    """增量扫描的变化只返回计数，组列表按 kind 分页查询"""
+    if delta is None:
+        return None
+    summary = {key: value for key, value in delta.items() if isinstance(value, int)}
+    summary['new_group_count'] = len(delta['new_groups'])
+    summary['resolved_group_count'] = len(delta['resolved_groups'])
+    return summary
+
+
+def discard_scan(scan_id: str):
+    """删除一次扫描的状态并关闭其结果存储，临时数据库随之删除"""
+    scan_results.pop(scan_id, None)
+    stores = [result_stores.pop(scan_id, None)] + list(extra_stores.pop(scan_id, {}).values())
+    for store in stores:
+        if store is not None:
+            store.close()
+
+
+def create_app(config_file: str = 'config.yaml'):
+    """创建 Flask 应用
+    
+    Args:
+        config_file: 配置文件路径，其中 performance.memory_limit 作为每次扫描的内存预算
+    """
     # 确保必要的目录存在
     os.makedirs('reports', exist_ok=True)
     os.makedirs('backups', exist_ok=True)
+    os.makedirs('journals', exist_ok=True)
     
+    if os.path.exists(config_file):
+        performance = (ConfigManager.load_config(config_file) or {}).get('performance') or {}
+        memory_limit = performance.get('memory_limit')
+        if memory_limit:
+            try:
+                app.config['MEMORY_LIMIT'] = FileUtils.parse_size(memory_limit)
+            except ValueError as e:
+                print(f"忽略无效的内存限制配置: {e}")
+                
     return app
 
 
@@ -0,0 +1,190 @@
+"""
+服务运行指标 - 以 Prometheus 文本格式导出扫描计数、吞吐量、缓存与阶段耗时
+"""
+
+import os
+import sys
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+PREFIX = 'duplicatehunter'
+# 吞吐量直方图分桶（字节/秒）：1MB/s 到 4GB/s
+THROUGHPUT_BUCKETS = tuple(float(2 ** n * 1024 * 1024) for n in range(0, 13))
+# 耗时直方图分桶（秒）
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+class Histogram:
+    """累积分桶直方图（对应 Prometheus histogram 类型）"""
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self.count = 0
+        
+    def observe(self, value: float):
+        """记录一个观测值"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        
+    def samples(self, name: str, labels: str = '') -> List[str]:
+        """输出 _bucket / _sum / _count 样本行"""
+        lines = []
+        cumulative = 0
+        separator = ',' if labels else ''
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _format_value(bound)
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{le}"}} {cumulative}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {_format_value(self.sum)}')
+        lines.append(f'{name}_count{suffix} {self.count}')
+        return lines
+
+
+def _format_value(value: float) -> str:
+    """格式化样本值，整数不带小数点"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def process_rss() -> Optional[int]:
+    """当前进程的常驻内存（字节），无法获取时返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError, IndexError):
+        pass
+        
+    try:
+        import resource
+    except ImportError:
+        return None
+    # 非 Linux 只能取峰值；macOS 单位为字节，其他为 KiB
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+class ServiceMetrics:
+    """Web 服务的累计运行指标
+    
+    扫描开始、完成、失败时由 app.py 调用对应方法更新。正在运行的扫描登记在本对象中，
+    读取字节数等计数器在导出时加上它们的当前值，因此扫描进行中也单调递增；
+    扫描结束时在同一把锁内从运行集合移除并累加，不会重复计数。不依赖 prometheus_client。
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.scans_started = 0
+        self.scans_completed = 0
+        self.scans_failed = 0
+        self.files_hashed = 0
+        self.bytes_hashed = 0
+        self.last_throughput = 0.0
+        self.throughput = Histogram(THROUGHPUT_BUCKETS)
+        self.scan_duration = Histogram(DURATION_BUCKETS)
+        self.phase_duration: Dict[str, Histogram] = {}
+        self._running: Dict[int, Tuple[object, Callable[[], Optional[dict]]]] = {}
+        
+    def scan_started(self, result, progress: Callable[[], Optional[dict]]):
+        """记录一次扫描开始
+        
+        Args:
+            result: 本次扫描的 ScanResult（扫描期间其 metrics 持续更新）
+            progress: 返回当前进度字典 {'current', 'total'} 的函数
+        """
+        with self._lock:
+            self.scans_started += 1
+            self._running[id(result)] = (result, progress)
+            
+    def scan_finished(self, result, failed: bool = False):
+        """记录一次扫描结束（完成或失败），累加其读取量与各阶段耗时
+        
+        Args:
+            result: scan_started 登记的 ScanResult
+            failed: 扫描是否失败
+        """
+        with self._lock:
+            self._running.pop(id(result), None)
+            if failed:
+                self.scans_failed += 1
+            else:
+                self.scans_completed += 1
+                
+            metrics = result.metrics
+            if metrics is None:
+                return
+                
+            counters = metrics.counters
+            self.files_hashed += counters['files_opened']
+            self.bytes_hashed += counters['bytes_read']
+            self.scan_duration.observe(result.scan_time)
+            for phase, seconds in metrics.phases.items():
+                self.phase_duration.setdefault(phase, Histogram(DURATION_BUCKETS)).observe(seconds)
+                
+            hash_time = sum(metrics.phases.get(phase, 0.0) for phase in ('sample', 'full_hash', 'verify'))
+            if not failed and hash_time > 0:
+                self.last_throughput = counters['bytes_read'] / hash_time
+                self.throughput.observe(self.last_throughput)
+                
+    def render(self, hasher_stats: Optional[dict] = None) -> str:
+        """输出 Prometheus 文本格式（0.0.4）
+        
+        Args:
+            hasher_stats: 当前扫描器 FileHasher.get_algorithm_info() 的返回值
+        """
+        lines = []
+        
+        def metric(name: str, kind: str, help_text: str, samples: List[str]):
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+            lines.extend(samples)
+            
+        def simple(name: str, kind: str, help_text: str, value: float):
+            metric(name, kind, help_text, [f'{PREFIX}_{name} {_format_value(value)}'])
+            
+        with self._lock:
+            live_files = live_bytes = queued_bytes = 0
+            for result, progress in self._running.values():
+                if result.metrics is not None:
+                    live_files += result.metrics.counters['files_opened']
+                    live_bytes += result.metrics.counters['bytes_read']
+                current = progress()
+                if current:
+                    queued_bytes += max(0, current.get('total', 0) - current.get('current', 0))
+                    
+            simple('scans_started_total', 'counter', 'Scans started.', self.scans_started)
+            simple('scans_completed_total', 'counter', 'Scans completed successfully.', self.scans_completed)
+            simple('scans_failed_total', 'counter', 'Scans that failed.', self.scans_failed)
+            simple('scans_running', 'gauge', 'Scans currently running.', len(self._running))
+            simple('files_hashed_total', 'counter', 'Files opened for hashing or comparison.',
+                   self.files_hashed + live_files)
+            simple('bytes_hashed_total', 'counter', 'Bytes read for hashing or comparison.',
+                   self.bytes_hashed + live_bytes)
+            simple('hash_queue_bytes', 'gauge', 'Bytes still queued in the current hashing stage.', queued_bytes)
+            simple('last_scan_throughput_bytes_per_second', 'gauge',
+                   'Hash throughput of the most recent completed scan.', self.last_throughput)
+            metric('scan_throughput_bytes_per_second', 'histogram', 'Hash throughput per completed scan.',
+                   self.throughput.samples(f'{PREFIX}_scan_throughput_bytes_per_second'))
+            metric('scan_duration_seconds', 'histogram', 'Wall-clock duration per scan.',
+                   self.scan_duration.samples(f'{PREFIX}_scan_duration_seconds'))
+                   
+            phase_samples = []
+            for phase, histogram in sorted(self.phase_duration.items()):
+                phase_samples.extend(histogram.samples(f'{PREFIX}_phase_duration_seconds', f'phase="{phase}"'))
+            metric('phase_duration_seconds', 'histogram', 'Duration of each scan phase.', phase_samples)
+            
+        if hasher_stats is not None:
+            lookups = hasher_stats['cache_hits'] + hasher_stats['cache_misses']
+            simple('hash_cache_entries', 'gauge', 'Entries in the in-memory hash cache.', hasher_stats['cache_size'])
+            simple('hash_cache_bytes', 'gauge', 'Estimated bytes used by the hash cache.', hasher_stats['cache_bytes'])
+            simple('hash_cache_hit_ratio', 'gauge', 'Hash cache hit ratio of the current scanner.',
+                   hasher_stats['cache_hits'] / lookups if lookups else 0.0)
+                   
+        rss = process_rss()
+        if rss is not None:
+            simple('process_resident_memory_bytes', 'gauge', 'Resident memory of the service process.', rss)
+            
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+线程池 / 进程池 / 异步引擎哈希执行方式对比
+
+分别在“大量小文件”和“少量大文件”两类语料上运行完整扫描，
+比较 ScanConfig.executor = thread / process / async 的耗时。
+
+用法:
+    python benchmarks/bench_executor.py [--small-files 20000] [--large-files 8] [--threads 4]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.scanner import FileScanner, ScanConfig
+
+
+def create_corpus(root: str, file_count: int, min_size: int, max_size: int, seed: int = 42):
+    """生成语料：一半文件与另一半内容相同，大小在 [min_size, max_size] 内随机"""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    
+    for i in range(file_count // 2):
+        data = rng.randbytes(rng.randint(min_size, max_size))
+        for copy in range(2):
+            sub_dir = os.path.join(root, f"d{i % 64}")
+            os.makedirs(sub_dir, exist_ok=True)
+            with open(os.path.join(sub_dir, f"f{i}_{copy}.bin"), 'wb') as f:
+                f.write(data)
+
+
+def run_scan(directory: str, executor: str, threads: int) -> float:
+    """运行一次扫描，返回耗时（秒）"""
+    config = ScanConfig(min_size=1, threads=threads, executor=executor)
+    scanner = FileScanner(config)
+    
+    start = time.perf_counter()
+    scanner.scan_directory(directory)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='线程池 / 进程池哈希执行方式对比')
+    parser.add_argument('--small-files', type=int, default=20000, help='小文件语料文件数')
+    parser.add_argument('--large-files', type=int, default=8, help='大文件语料文件数')
+    parser.add_argument('--threads', type=int, default=4, help='并发数')
+    args = parser.parse_args()
+    
+    temp_dir = tempfile.mkdtemp(prefix='bench_executor_')
+    try:
+        corpora = {
+            'small (2-50KB)': (os.path.join(temp_dir, 'small'), args.small_files, 2 * 1024, 50 * 1024),
+            'large (32-64MB)': (os.path.join(temp_dir, 'large'), args.large_files, 32 * 1024 ** 2, 64 * 1024 ** 2),
+        }
+        
+        print(f"{'语料':<18}{'执行方式':<10}{'并发':>6}{'耗时(秒)':>12}")
+        for name, (root, count, min_size, max_size) in corpora.items():
+            create_corpus(root, count, min_size, max_size)
+            for executor in ('thread', 'process', 'async'):
+                for threads in sorted({1, args.threads}):
+                    elapsed = run_scan(root, executor, threads)
+                    print(f"{name:<18}{executor:<10}{threads:>6}{elapsed:>12.3f}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+对比两次基准套件结果
+
+按 (算法, 执行方式, 并发数) 匹配两份 run_suite.py 输出的 JSON，报告耗时、吞吐量
+和峰值内存的变化。任一组合的耗时或峰值内存增幅超过阈值时以非零状态退出，
+可用于 CI 中的性能回归检查。
+
+用法:
+    python benchmarks/compare.py baseline.json current.json [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+
+def load_results(path: str) -> Dict[Tuple[str, str, int], Dict]:
+    """读取结果文件，按组合建立索引"""
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    return {(r['algorithm'], r['executor'], r['threads']): r for r in report['results']}
+
+
+def change(old, new) -> float:
+    """相对变化，旧值缺失或为 0 时返回 0"""
+    if not old or new is None:
+        return 0.0
+    return (new - old) / old
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比两次基准套件结果')
+    parser.add_argument('baseline', help='基线结果 JSON')
+    parser.add_argument('current', help='当前结果 JSON')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='耗时或峰值内存增幅超过该比例视为回归 (默认: 0.1)')
+    args = parser.parse_args()
+    
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    
+    regressions = 0
+    print(f"{'算法':<10}{'执行方式':<10}{'并发':>6}{'耗时':>10}{'MB/秒':>10}{'峰值RSS':>10}")
+    for key in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[key], current[key]
+        elapsed = change(old['elapsed'], new['elapsed'])
+        throughput = change(old['mb_per_s'], new['mb_per_s'])
+        rss = change(old.get('peak_rss'), new.get('peak_rss'))
+        
+        regressed = elapsed > args.threshold or rss > args.threshold
+        regressions += regressed
+        algorithm, executor, threads = key
+        print(f"{algorithm:<10}{executor:<10}{threads:>6}{elapsed:>+10.1%}{throughput:>+10.1%}{rss:>+10.1%}"
+              f"{'  <- 回归' if regressed else ''}")
+              
+    missing = baseline.keys() ^ current.keys()
+    if missing:
+        print(f"\n只在一份结果中出现的组合: {sorted(missing)}")
+        
+    if regressions:
+        print(f"\n发现 {regressions} 个组合性能回归（阈值 {args.threshold:.0%}）")
+        sys.exit(1)
+    print("\n未发现性能回归")
+
+
+if __name__ == '__main__':
+    main()
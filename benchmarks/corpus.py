@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+可复现的合成语料生成器
+
+按给定的文件数、大小分布、重复比例、近似重复比例、硬链接比例和目录深度生成
+目录树。相同的参数与随机种子总是生成相同的内容，便于不同提交之间对比性能。
+
+- 重复文件：与某个原始文件内容完全相同
+- 近似重复：与某个原始文件大小相同，只有一个字节不同（考验抽样与完整哈希阶段）
+- 硬链接：指向某个已生成文件的硬链接（扫描器应单独报告，不计入重复）
+
+用法:
+    python benchmarks/corpus.py /tmp/corpus [--files 10000] [--size-dist lognormal]
+                                [--min-size 1K] [--max-size 4M] [--duplicate-ratio 0.3]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils import FileUtils
+
+WRITE_BLOCK = 4 * 1024 * 1024  # 生成随机内容时每次写入的字节数
+SIZE_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+
+@dataclass
+class CorpusSpec:
+    """语料参数"""
+    files: int = 10000  # 文件总数（含重复、近似重复和硬链接）
+    size_dist: str = "lognormal"  # 大小分布: fixed, uniform, lognormal
+    min_size: int = 1024  # 最小文件大小（字节）
+    max_size: int = 4 * 1024 * 1024  # 最大文件大小（字节）；fixed 分布时所有文件均为该大小
+    duplicate_ratio: float = 0.3  # 重复文件占比
+    near_duplicate_ratio: float = 0.05  # 近似重复文件占比
+    hardlink_ratio: float = 0.0  # 硬链接占比
+    depth: int = 4  # 最大目录深度
+    fanout: int = 8  # 每层子目录数
+    seed: int = 42  # 随机种子
+    
+    def __post_init__(self):
+        if self.size_dist not in SIZE_DISTRIBUTIONS:
+            raise ValueError(f"不支持的大小分布: {self.size_dist}")
+        if self.duplicate_ratio + self.near_duplicate_ratio + self.hardlink_ratio >= 1:
+            raise ValueError("重复、近似重复与硬链接比例之和必须小于 1")
+
+
+def _pick_size(rng: random.Random, spec: CorpusSpec) -> int:
+    """按分布抽取一个文件大小"""
+    if spec.size_dist == 'fixed':
+        return spec.max_size
+    if spec.size_dist == 'uniform':
+        return rng.randint(spec.min_size, spec.max_size)
+        
+    # 对数正态：中位数取上下限的几何平均，约 95% 的样本落在 [min_size, max_size] 内
+    low, high = math.log(max(1, spec.min_size)), math.log(max(1, spec.max_size))
+    size = int(rng.lognormvariate((low + high) / 2, max((high - low) / 4, 1e-9)))
+    return min(max(size, spec.min_size), spec.max_size)
+
+
+def _pick_dir(rng: random.Random, root: str, spec: CorpusSpec) -> str:
+    """随机选择一个深度不超过 spec.depth 的目录"""
+    parts = [f"d{rng.randrange(spec.fanout)}" for _ in range(rng.randint(0, spec.depth))]
+    return os.path.join(root, *parts)
+
+
+def _write_random(path: str, size: int, rng: random.Random):
+    """写入 size 字节随机内容"""
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            block = min(remaining, WRITE_BLOCK)
+            f.write(rng.randbytes(block))
+            remaining -= block
+
+
+def generate_corpus(root: str, spec: CorpusSpec) -> Dict:
+    """在 root 下生成语料
+    
+    Returns:
+        语料清单：参数、各类文件数、总字节数和预期的重复组数
+    """
+    rng = random.Random(spec.seed)
+    os.makedirs(root, exist_ok=True)
+    
+    duplicates = int(spec.files * spec.duplicate_ratio)
+    near_duplicates = int(spec.files * spec.near_duplicate_ratio)
+    hardlinks = int(spec.files * spec.hardlink_ratio)
+    originals = max(1, spec.files - duplicates - near_duplicates - hardlinks)
+    
+    # 打乱角色顺序，使重复文件分散在整个目录树中；第一个文件必须是原始文件
+    roles = (['original'] * originals + ['duplicate'] * duplicates
+             + ['near'] * near_duplicates + ['hardlink'] * hardlinks)
+    rng.shuffle(roles)
+    first = roles.index('original')
+    roles[0], roles[first] = roles[first], roles[0]
+    
+    originals_paths: List[str] = []
+    duplicated = set()
+    total_bytes = 0
+    
+    for i, role in enumerate(roles):
+        directory = _pick_dir(rng, root, spec)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"f{i}.bin")
+        
+        if role == 'original':
+            size = _pick_size(rng, spec)
+            _write_random(path, size, rng)
+            originals_paths.append(path)
+        elif role == 'hardlink':
+            source = rng.choice(originals_paths)
+            os.link(source, path)
+            continue  # 硬链接不占用额外空间
+        else:
+            index = rng.randrange(len(originals_paths))
+            source = originals_paths[index]
+            shutil.copyfile(source, path)
+            size = os.path.getsize(path)
+            if role == 'duplicate':
+                duplicated.add(index)
+            elif size > 0:
+                # 翻转一个随机位置的字节，大小不变
+                offset = rng.randrange(size)
+                with open(path, 'r+b') as f:
+                    f.seek(offset)
+                    byte = f.read(1)
+                    f.seek(offset)
+                    f.write(bytes([byte[0] ^ 0xFF]))
+        total_bytes += size
+        
+    return {
+        'spec': asdict(spec),
+        'files': len(roles),
+        'bytes': total_bytes,
+        'originals': len(originals_paths),
+        'duplicates': duplicates,
+        'near_duplicates': near_duplicates,
+        'hardlinks': hardlinks,
+        'expected_groups': len(duplicated),
+    }
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    """把语料参数加入命令行解析器（run_suite.py 共用）"""
+    defaults = CorpusSpec()
+    parser.add_argument('--files', type=int, default=defaults.files, help='文件总数')
+    parser.add_argument('--size-dist', choices=SIZE_DISTRIBUTIONS, default=defaults.size_dist, help='大小分布')
+    parser.add_argument('--min-size', type=FileUtils.parse_size, default=defaults.min_size, help='最小文件大小，如 1K')
+    parser.add_argument('--max-size', type=FileUtils.parse_size, default=defaults.max_size, help='最大文件大小，如 4M')
+    parser.add_argument('--duplicate-ratio', type=float, default=defaults.duplicate_ratio, help='重复文件占比')
+    parser.add_argument('--near-duplicate-ratio', type=float, default=defaults.near_duplicate_ratio,
+                        help='近似重复（同大小、一个字节不同）文件占比')
+    parser.add_argument('--hardlink-ratio', type=float, default=defaults.hardlink_ratio, help='硬链接占比')
+    parser.add_argument('--depth', type=int, default=defaults.depth, help='最大目录深度')
+    parser.add_argument('--fanout', type=int, default=defaults.fanout, help='每层子目录数')
+    parser.add_argument('--seed', type=int, default=defaults.seed, help='随机种子')
+
+
+def spec_from_args(args: argparse.Namespace) -> CorpusSpec:
+    """由命令行参数构造语料参数"""
+    return CorpusSpec(files=args.files, size_dist=args.size_dist, min_size=args.min_size,
+                      max_size=args.max_size, duplicate_ratio=args.duplicate_ratio,
+                      near_duplicate_ratio=args.near_duplicate_ratio, hardlink_ratio=args.hardlink_ratio,
+                      depth=args.depth, fanout=args.fanout, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成可复现的合成语料')
+    parser.add_argument('root', help='输出目录')
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    
+    manifest = generate_corpus(args.root, spec_from_args(args))
+    print(json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+扫描性能基准套件
+
+生成（或复用）一份合成语料，然后对 哈希算法 × 并发数 × 执行方式 的每种组合
+运行完整扫描。每次扫描在独立的子进程中执行，峰值 RSS 与系统调用计数互不干扰。
+结果写成 JSON，可用 benchmarks/compare.py 与基线对比。
+
+记录的指标：
+- files_per_s / mb_per_s：扫描文件数、语料字节数除以扫描耗时
+- read_bytes / read_syscalls / write_syscalls：/proc/self/io 的 rchar、syscr、syscw 增量（仅 Linux）
+- peak_rss：子进程峰值常驻内存（字节）
+- phases / counters：ScanResult.metrics 中的各阶段耗时（秒）与读取量、缓存命中等计数
+
+用法:
+    python benchmarks/run_suite.py [--files 2000] [--algorithms md5,blake2b]
+                                   [--threads 1,4] [--executors thread,process,async]
+                                   [--output benchmarks/results/latest.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.scanner import FileScanner, ScanConfig
+from corpus import add_spec_arguments, generate_corpus, spec_from_args
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def read_proc_io() -> Optional[Dict[str, int]]:
+    """读取当前进程的 I/O 计数，非 Linux 返回 None"""
+    try:
+        with open('/proc/self/io') as f:
+            return {key: int(value) for key, value in (line.split(':') for line in f)}
+    except OSError:
+        return None
+
+
+def peak_rss() -> Optional[int]:
+    """当前进程的峰值常驻内存（字节）"""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KiB 为单位，macOS 以字节为单位
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def run_case(case: Dict) -> Dict:
+    """在当前进程中运行一次扫描并收集指标（由子进程调用）"""
+    config = ScanConfig(min_size=1, algorithm=case['algorithm'], threads=case['threads'],
+                        executor=case['executor'])
+    scanner = FileScanner(config)
+    
+    io_before = read_proc_io()
+    start = time.perf_counter()
+    result = scanner.scan_directory(case['corpus'])
+    elapsed = time.perf_counter() - start
+    io_after = read_proc_io()
+    scanner.close()
+    
+    metrics = {
+        'elapsed': elapsed,
+        'files': result.total_files,
+        'bytes': result.total_size,
+        'files_per_s': result.total_files / elapsed if elapsed else 0.0,
+        'mb_per_s': result.total_size / 1024 / 1024 / elapsed if elapsed else 0.0,
+        'duplicate_groups': len(result.duplicate_groups),
+        'hardlink_groups': len(result.hardlink_groups),
+        'stage_stats': result.stage_stats,
+        'phases': result.metrics.phases,
+        'counters': result.metrics.counters,
+        'peak_rss': peak_rss(),
+        'read_bytes': None,
+        'read_syscalls': None,
+        'write_syscalls': None,
+        'errors': len(result.errors),
+    }
+    if io_before is not None and io_after is not None:
+        metrics['read_bytes'] = io_after['rchar'] - io_before['rchar']
+        metrics['read_syscalls'] = io_after['syscr'] - io_before['syscr']
+        metrics['write_syscalls'] = io_after['syscw'] - io_before['syscw']
+    return metrics
+
+
+def run_in_subprocess(case: Dict) -> Dict:
+    """在独立子进程中运行一次扫描，返回指标"""
+    output = subprocess.run([sys.executable, __file__, '--case', json.dumps(case)],
+                            check=True, capture_output=True, text=True).stdout
+    # 扫描过程中的提示信息也会输出到 stdout，指标是最后一行
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_revision() -> Optional[str]:
+    """当前提交号，不在 git 仓库中时返回 None"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=Path(__file__).parent,
+                              check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='扫描性能基准套件')
+    add_spec_arguments(parser)
+    parser.set_defaults(files=2000, max_size=1024 * 1024)
+    parser.add_argument('--algorithms', default='md5,blake2b', help='哈希算法列表，逗号分隔')
+    parser.add_argument('--threads', default='1,4', help='并发数列表，逗号分隔')
+    parser.add_argument('--executors', default='thread,process,async', help='执行方式列表，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=1, help='每种组合重复次数，取最快一次')
+    parser.add_argument('--corpus-dir', help='语料目录；已存在时直接复用，否则生成到此处并保留')
+    parser.add_argument('--output', help='结果 JSON 文件路径（默认只打印表格）')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+        
+    temp_dir = None
+    corpus_dir = args.corpus_dir
+    if corpus_dir is None:
+        temp_dir = tempfile.mkdtemp(prefix='bench_suite_')
+        corpus_dir = os.path.join(temp_dir, 'corpus')
+        
+    try:
+        spec = spec_from_args(args)
+        if os.path.isdir(corpus_dir) and os.listdir(corpus_dir):
+            print(f"复用已有语料: {corpus_dir}")
+            manifest = {'spec': None, 'reused': True}
+        else:
+            print(f"生成语料: {corpus_dir}")
+            manifest = generate_corpus(corpus_dir, spec)
+            
+        results = []
+        print(f"{'算法':<10}{'执行方式':<10}{'并发':>6}{'耗时(秒)':>10}{'文件/秒':>12}{'MB/秒':>10}{'峰值RSS(MB)':>14}")
+        for algorithm in args.algorithms.split(','):
+            for executor in args.executors.split(','):
+                for threads in (int(t) for t in args.threads.split(',')):
+                    case = {'corpus': corpus_dir, 'algorithm': algorithm, 'executor': executor, 'threads': threads}
+                    runs = [run_in_subprocess(case) for _ in range(max(1, args.repeat))]
+                    best = min(runs, key=lambda metrics: metrics['elapsed'])
+                    results.append({'algorithm': algorithm, 'executor': executor, 'threads': threads, **best})
+                    
+                    rss = f"{best['peak_rss'] / 1024 / 1024:.1f}" if best['peak_rss'] else '-'
+                    print(f"{algorithm:<10}{executor:<10}{threads:>6}{best['elapsed']:>10.3f}"
+                          f"{best['files_per_s']:>12.0f}{best['mb_per_s']:>10.1f}{rss:>14}")
+                          
+        report = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'corpus': manifest,
+            'results': results,
+        }
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"结果已写入: {args.output}")
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
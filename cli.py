@@ -4,10 +4,14 @@ DuplicateHunter 命令行工具
 """
 
 import argparse
+import logging
 import sys
 import os
 import time
 from pathlib import Path
+from app import columnar
+from app.actions import ActionExecutor, ActionJournal, plan_cleanup
+from app.hasher import FileHasher
 from app.scanner import FileScanner, ScanConfig
 from app.utils import FileUtils, ReportGenerator
 
@@ -21,59 +25,136 @@ def main():
   %(prog)s --scan /home/user/Documents
   %(prog)s --scan /data --algorithm sha256 --output json
   %(prog)s --scan /data --auto-delete --keep newest
+  %(prog)s --scan /data --auto-delete --backup-dir backups --journal delete.jsonl
+  %(prog)s --scan /data --action hardlink --keep oldest
+  %(prog)s --resume delete.jsonl
+  %(prog)s --undo delete.jsonl
   %(prog)s --scan /data --report --output-file report.html
         """
     )
     
     # 基本参数
-    parser.add_argument('--scan', required=True, help='要扫描的目录路径')
-    parser.add_argument('--algorithm', choices=['md5', 'sha1', 'sha256'], 
+    parser.add_argument('--scan', help='要扫描的目录路径（--resume / --undo 时不需要）')
+    parser.add_argument('--algorithm', choices=FileHasher.available_algorithms(), 
                        default='md5', help='哈希算法 (默认: md5)')
+    parser.add_argument('--verify', nargs='?', const='sha256', choices=FileHasher.available_algorithms(),
+                       help='报告前用指定算法复核重复组 (不带参数时为 sha256)，建议配合快速算法和自动删除使用')
     parser.add_argument('--min-size', type=int, default=1024, 
                        help='最小文件大小（字节，默认: 1024）')
     parser.add_argument('--max-size', type=int, help='最大文件大小（字节）')
     parser.add_argument('--threads', type=int, default=4, 
                        help='扫描线程数 (默认: 4)')
+    parser.add_argument('--adaptive', action='store_true',
+                       help='按设备根据实测吞吐量自动调整并发数（机械硬盘 1-2 个，SSD 可增至 --max-threads）')
+    parser.add_argument('--max-threads', type=int, default=32,
+                       help='自适应模式下每个设备的并发上限 (默认: 32)')
+    parser.add_argument('--io-order', choices=['auto', 'size', 'inode', 'physical'], default='auto',
+                       help='每个设备队列内的读取顺序：size 大文件优先，inode 按 inode 号，'
+                            'physical 按 FIEMAP 物理偏移，auto 对机械硬盘按物理偏移、其他设备大文件优先 (默认: auto)')
+    parser.add_argument('--executor', choices=['thread', 'process', 'async'], default='thread',
+                       help='完整哈希执行方式，大量小文件时 process 可绕开 GIL，'
+                            'NFS/SMB 等高延迟存储用 async (默认: thread)')
+    parser.add_argument('--async-files', type=int, default=64,
+                       help='async 模式下同时处理的文件数 (默认: 64)')
+    parser.add_argument('--inflight-bytes', type=FileUtils.parse_size, default='64MB',
+                       help='async 模式下在途读取字节数上限 (默认: 64MB)')
+    parser.add_argument('--io-strategy', choices=['auto', 'buffered', 'readinto', 'mmap'], default='auto',
+                       help='文件读取策略 (默认: auto，按文件大小选择 readinto 或 mmap)')
+    parser.add_argument('--drop-cache', action='store_true',
+                       help='哈希后丢弃文件页缓存，避免大规模扫描挤掉系统缓存')
+    parser.add_argument('--walk-threads', type=int, default=4, 
+                       help='目录遍历线程数，1 为单线程遍历 (默认: 4)')
+    parser.add_argument('--index', help='持久化哈希索引文件路径，重复扫描时复用已计算的哈希值')
+    parser.add_argument('--prune-index', action='store_true', 
+                       help='扫描前清理索引中已删除或已修改文件的条目')
+    parser.add_argument('--memory-limit', type=FileUtils.parse_size,
+                       help='内存预算 (如 1GB)，限制哈希缓存、结果缓存和流式批次大小')
+    parser.add_argument('--incremental', metavar='SNAPSHOT',
+                       help='增量扫描快照文件路径，只重新读取变化的目录、只重新比较受影响的大小类别')
     
     # 过滤参数
     parser.add_argument('--extensions', help='文件扩展名过滤，用逗号分隔 (如: .jpg,.png,.mp4)')
     parser.add_argument('--exclude-dirs', help='排除的目录，用逗号分隔')
     
     # 输出参数
-    parser.add_argument('--output', choices=['text', 'json', 'csv'], 
-                       default='text', help='输出格式 (默认: text)')
+    parser.add_argument('--output', choices=['text', 'json', 'ndjson', 'csv', 'columnar'], 
+                       default='text',
+                       help='输出格式，ndjson 为每行一个重复组，columnar 为列式二进制文件'
+                            '（.parquet 需安装 pyarrow，否则为 .dhc） (默认: text)')
     parser.add_argument('--output-file', help='输出文件路径')
+    parser.add_argument('--compress', choices=['gzip', 'zstd'],
+                       help='边写边压缩结果和报告（也可由输出文件扩展名 .gz/.zst 推断；zstd 需安装 zstandard）')
     parser.add_argument('--report', action='store_true', help='生成详细报告')
+    parser.add_argument('--report-style', choices=['auto', 'static', 'virtual'], default='auto',
+                       help='HTML 报告样式：static 为静态页面，virtual 为虚拟滚动（支持排序、搜索，适合大量结果），'
+                            'auto 按重复组数选择 (默认: auto)')
     
     # 操作参数
     parser.add_argument('--auto-delete', action='store_true', 
                        help='自动删除重复文件')
+    parser.add_argument('--action', choices=['delete', 'hardlink', 'reflink', 'symlink'],
+                       help='重复文件的处理方式：delete 删除，hardlink/reflink/symlink 原子地替换为指向保留文件的'
+                            '硬链接、写时复制克隆（需 btrfs/XFS 等支持）或符号链接，只修改元数据 (默认: delete)')
     parser.add_argument('--keep', choices=['oldest', 'newest', 'first'], 
                        default='first', help='保留哪个文件 (默认: first)')
-    parser.add_argument('--backup-dir', help='删除前备份目录')
+    parser.add_argument('--backup-dir', help='删除或替换前备份目录（同一文件系统上用硬链接/改名，不复制数据）')
+    parser.add_argument('--journal', help='操作日志路径，用于中断后续做 (--resume) 或撤销 (--undo)；'
+                                          '未指定时若有 --backup-dir 则写在备份目录中')
+    parser.add_argument('--resume', metavar='JOURNAL', help='按操作日志继续执行中断的操作，不重新扫描')
+    parser.add_argument('--undo', metavar='JOURNAL', help='按操作日志撤销：从备份恢复已删除或被替换为链接的文件')
+    parser.add_argument('--action-threads', type=int, default=4,
+                       help='处理文件时每个设备的工作线程数 (默认: 4)')
     parser.add_argument('--dry-run', action='store_true', 
                        help='只显示将要执行的操作，不实际执行')
     
     # 其他参数
-    parser.add_argument('--verbose', '-v', action='store_true', help='详细输出')
+    parser.add_argument('--verbose', '-v', action='store_true', help='详细输出（含各阶段耗时、读取量、缓存命中等扫描度量）')
+    parser.add_argument('--profile', choices=['cpu', 'memory', 'all'],
+                       help='扫描期间剖析：cpu 用 cProfile，memory 用 tracemalloc，all 两者都用')
     parser.add_argument('--quiet', '-q', action='store_true', help='静默模式')
     
     args = parser.parse_args()
     
+    # 详细模式下输出并发调整等日志
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s: %(message)s')
+        
+    # 续做与撤销只需要操作日志
+    if args.resume or args.undo:
+        sys.exit(run_journal(args))
+        
     # 验证参数
+    if not args.scan:
+        parser.error('需要指定 --scan')
     if not os.path.exists(args.scan):
         print(f"错误: 目录不存在 - {args.scan}", file=sys.stderr)
         sys.exit(1)
         
-    if args.auto_delete and not args.dry_run and not args.backup_dir:
+    if args.auto_delete and args.action is None:
+        args.action = 'delete'
+    if args.action == 'delete' and not args.dry_run and not args.backup_dir:
         print("警告: 建议在自动删除时指定备份目录 (--backup-dir)")
         
     # 创建扫描配置
     config = ScanConfig(
         algorithm=args.algorithm,
+        verify_algorithm=args.verify,
         min_size=args.min_size,
         max_size=args.max_size,
-        threads=args.threads
+        threads=args.threads,
+        adaptive_threads=args.adaptive,
+        max_threads=args.max_threads,
+        io_order=args.io_order,
+        walk_threads=args.walk_threads,
+        executor=args.executor,
+        async_open_files=args.async_files,
+        max_inflight_bytes=args.inflight_bytes,
+        io_strategy=args.io_strategy,
+        drop_cache=args.drop_cache,
+        index_path=args.index,
+        snapshot_path=args.incremental,
+        memory_limit=args.memory_limit,
+        profile=args.profile
     )
     
     # 处理扩展名过滤
@@ -93,7 +174,8 @@ def main():
     if not args.quiet:
         def progress_callback(current, total, message):
             if args.verbose:
-                print(f"\r进度: {current}/{total} - {message}", end='', flush=True)
+                print(f"\r进度: {FileUtils.format_size(current)}/{FileUtils.format_size(total)} - {message}",
+                      end='', flush=True)
             else:
                 percentage = (current / total * 100) if total > 0 else 0
                 print(f"\r进度: {percentage:.1f}%", end='', flush=True)
@@ -101,11 +183,26 @@ def main():
         scanner.set_progress_callback(progress_callback)
         
     try:
+        # 清理过期索引条目
+        if args.prune_index:
+            if not args.index:
+                print("警告: 未指定 --index，忽略 --prune-index")
+            else:
+                pruned = scanner.prune_index()
+                if not args.quiet:
+                    print(f"已清理过期索引条目: {pruned}")
+                    
         # 执行扫描
         if not args.quiet:
             print(f"开始扫描目录: {args.scan}")
             print(f"使用算法: {args.algorithm}")
+            if args.verify:
+                print(f"复核算法: {args.verify}")
             print(f"线程数: {args.threads}")
+            if args.index:
+                print(f"哈希索引: {args.index}")
+            if args.incremental:
+                print(f"增量快照: {args.incremental}")
             print("-" * 50)
             
         result = scanner.scan_directory(args.scan)
@@ -121,6 +218,18 @@ def main():
                 print(f"  {key}: {value}")
             print("-" * 50)
             
+        # 扫描度量与剖析报告
+        if result.metrics is not None and not args.quiet and (args.verbose or args.profile):
+            display_metrics(result.metrics, args.verbose)
+            
+        # 增量扫描变化摘要
+        if result.delta is not None and not args.quiet:
+            display_delta(result.delta, args.verbose)
+            
+        # 硬链接不占用额外空间，只在详细模式下列出
+        if args.verbose and result.hardlink_groups:
+            display_hardlink_groups(result.hardlink_groups)
+            
         # 处理结果
         if not result.duplicate_groups:
             print("太棒了！没有发现重复文件。")
@@ -128,19 +237,23 @@ def main():
             
         # 输出结果
         if args.output == 'text':
-            display_text_results(result.duplicate_groups, args.verbose)
+            display_text_results(result.duplicate_groups, args.verbose, result.group_sizes)
         elif args.output == 'json':
-            output_json_results(result.duplicate_groups, args.output_file)
+            output_json_results(result, args.output_file, args.compress)
+        elif args.output == 'ndjson':
+            output_ndjson_results(result, args.output_file, args.compress)
         elif args.output == 'csv':
-            output_csv_results(result.duplicate_groups, args.output_file)
+            output_csv_results(result, args.output_file, args.compress)
+        elif args.output == 'columnar':
+            output_columnar_results(result, args.output_file)
             
         # 生成报告
         if args.report:
-            generate_report(result.duplicate_groups, args.output_file)
+            generate_report(result, args.output_file, args.compress, args.report_style)
             
-        # 自动删除
-        if args.auto_delete:
-            auto_delete_duplicates(result.duplicate_groups, args)
+        # 自动删除或替换为链接
+        if args.action:
+            auto_delete_duplicates(result, args)
             
     except KeyboardInterrupt:
         print("\n扫描被用户中断")
@@ -148,10 +261,67 @@ def main():
     except Exception as e:
         print(f"扫描失败: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        scanner.close()
+
+
+def display_delta(delta, verbose=False):
+    """显示增量扫描相对上次快照的变化"""
+    print("\n增量变化:")
+    print(f"  新增文件: {delta['added_files']}")
+    print(f"  删除文件: {delta['removed_files']}")
+    print(f"  修改文件: {delta['modified_files']}")
+    print(f"  未变化目录: {delta['reused_dirs']}")
+    print(f"  新增/变化重复组: {len(delta['new_groups'])}")
+    print(f"  已消除重复组: {len(delta['resolved_groups'])}")
+    
+    if verbose:
+        for hash_value, files in delta['new_groups'].items():
+            print(f"  + {hash_value}: {', '.join(files)}")
+        for hash_value, files in delta['resolved_groups'].items():
+            print(f"  - {hash_value}: {', '.join(files)}")
+    print("-" * 50)
+
+
+def display_metrics(metrics, verbose=False):
+    """显示扫描度量：各阶段耗时、计数器、错误分类、工作线程忙闲和剖析报告"""
+    if verbose:
+        data = metrics.to_dict()
+        print("\n各阶段耗时:")
+        for phase, seconds in data['phases'].items():
+            print(f"  {phase}: {seconds:.3f} 秒")
+            
+        counters = data['counters']
+        print("\n读取与缓存:")
+        print(f"  读取字节数: {FileUtils.format_size(counters['bytes_read'])}")
+        print(f"  打开文件数: {counters['files_opened']}")
+        print(f"  缓存命中/索引命中/未命中: "
+              f"{counters['cache_hits']}/{counters['index_hits']}/{counters['cache_misses']}")
+        print(f"  读取目录数: {counters['dirs_read']}（快照复用 {counters['dirs_reused']}），stat 文件数: {counters['files_stat']}")
+        
+        if data['errors_by_type']:
+            print("\n错误分类:")
+            for error_type, count in data['errors_by_type'].items():
+                print(f"  {error_type}: {count}")
+                
+        if data['workers']:
+            print("\n工作线程（设备/编号: 忙碌/空闲 秒, 任务数）:")
+            for name, stats in data['workers'].items():
+                print(f"  {name}: {stats['busy']:.3f}/{stats['idle']:.3f}, {stats['tasks']}")
+                
+    if metrics.cpu_profile:
+        print("\nCPU 剖析（按累计耗时）:")
+        print(metrics.cpu_profile)
+    if metrics.memory_profile:
+        print(f"\n内存剖析: 峰值 {FileUtils.format_size(metrics.memory_profile['peak'])}")
+        for line in metrics.memory_profile['top']:
+            print(f"  {line}")
+    print("-" * 50)
 
 
-def display_text_results(duplicate_groups, verbose=False):
-    """显示文本格式结果"""
+def display_text_results(duplicate_groups, verbose=False, group_sizes=None):
+    """显示文本格式结果（文件大小取自扫描结果，不再 stat）"""
+    group_sizes = group_sizes or {}
     print(f"\n发现 {len(duplicate_groups)} 组重复文件:")
     print("=" * 60)
     
@@ -161,121 +331,229 @@ def display_text_results(duplicate_groups, verbose=False):
         if verbose:
             print(f"  哈希值: {hash_value}")
             
+        size = group_sizes.get(hash_value)
+        size_str = FileUtils.format_size(size) if size is not None else 'N/A'
         for i, file_path in enumerate(files):
-            file_info = FileUtils.get_file_info(file_path)
-            size_str = file_info.get('size_formatted', 'N/A')
             print(f"  [{i+1}] {file_path} ({size_str})")
             
         group_id += 1
 
 
-def output_json_results(duplicate_groups, output_file=None):
+def display_hardlink_groups(hardlink_groups):
+    """显示硬链接组（同一 inode 的多个路径，删除不会释放空间）"""
+    print(f"\n发现 {len(hardlink_groups)} 组硬链接（不计入可释放空间）:")
+    
+    for inode_key, paths in hardlink_groups.items():
+        print(f"\n  inode {inode_key}:")
+        for file_path in paths:
+            print(f"    {file_path}")
+
+
+def report_path(output_file, default_name, compression=None):
+    """确定结果文件路径：未指定时使用默认文件名，压缩时补上对应扩展名"""
+    path = output_file or default_name
+    suffix = ReportGenerator.COMPRESSION_SUFFIXES.get(compression, '')
+    if suffix and not path.endswith(suffix):
+        path += suffix
+    return path
+
+
+def output_json_results(result, output_file=None, compression=None):
     """输出 JSON 格式结果"""
-    if not output_file:
-        output_file = f"duplicate_results_{int(time.time())}.json"
-        
-    success = ReportGenerator.generate_json_report(duplicate_groups, output_file)
+    output_file = report_path(output_file, f"duplicate_results_{int(time.time())}.json", compression)
+    
+    success = ReportGenerator.generate_json_report(result.duplicate_groups, output_file, result.group_sizes,
+                                                   result.file_records, compression)
     if success:
         print(f"JSON 结果已保存到: {output_file}")
     else:
         print("保存 JSON 结果失败", file=sys.stderr)
 
 
-def output_csv_results(duplicate_groups, output_file=None):
+def output_ndjson_results(result, output_file=None, compression=None):
+    """输出 NDJSON 格式结果（每行一个重复组）"""
+    output_file = report_path(output_file, f"duplicate_results_{int(time.time())}.ndjson", compression)
+    
+    success = ReportGenerator.generate_ndjson_report(result.duplicate_groups, output_file, result.group_sizes,
+                                                     result.file_records, compression)
+    if success:
+        print(f"NDJSON 结果已保存到: {output_file}")
+    else:
+        print("保存 NDJSON 结果失败", file=sys.stderr)
+
+
+def output_csv_results(result, output_file=None, compression=None):
     """输出 CSV 格式结果"""
-    if not output_file:
-        output_file = f"duplicate_results_{int(time.time())}.csv"
-        
-    success = ReportGenerator.generate_csv_report(duplicate_groups, output_file)
+    output_file = report_path(output_file, f"duplicate_results_{int(time.time())}.csv", compression)
+    
+    success = ReportGenerator.generate_csv_report(result.duplicate_groups, output_file, result.group_sizes,
+                                                  result.file_records, compression)
     if success:
         print(f"CSV 结果已保存到: {output_file}")
     else:
         print("保存 CSV 结果失败", file=sys.stderr)
 
 
-def generate_report(duplicate_groups, output_file=None):
-    """生成详细报告"""
+def output_columnar_results(result, output_file=None):
+    """输出列式结果文件，可用 ReportGenerator.load_columnar_report 读回"""
     if not output_file:
-        output_file = f"duplicate_report_{int(time.time())}.html"
-    elif not output_file.endswith('.html'):
-        output_file += '.html'
+        extension = 'parquet' if columnar.pyarrow is not None else 'dhc'
+        output_file = f"duplicate_results_{int(time.time())}.{extension}"
         
-    success = ReportGenerator.generate_html_report(duplicate_groups, output_file)
+    summary = {
+        'total_files': result.total_files,
+        'total_size': result.total_size,
+        'scan_time': result.scan_time,
+        'stage_stats': result.stage_stats,
+    }
+    success = ReportGenerator.generate_columnar_report(result.duplicate_groups, output_file, result.group_sizes,
+                                                       result.file_records, summary=summary)
+    if success:
+        print(f"列式结果已保存到: {output_file}")
+    else:
+        print("保存列式结果失败", file=sys.stderr)
+
+
+def generate_report(result, output_file=None, compression=None, style='auto'):
+    """生成详细报告（style: auto / static / virtual）"""
+    if output_file:
+        # 压缩扩展名放到 .html 之后
+        for name, suffix in ReportGenerator.COMPRESSION_SUFFIXES.items():
+            if output_file.endswith(suffix):
+                output_file = output_file[:-len(suffix)]
+                compression = compression or name
+        if not output_file.endswith('.html'):
+            output_file += '.html'
+    output_file = report_path(output_file, f"duplicate_report_{int(time.time())}.html", compression)
+    
+    if style == 'auto':
+        many = len(result.duplicate_groups) >= ReportGenerator.VIRTUAL_HTML_MIN_GROUPS
+        style = 'virtual' if many else 'static'
+    generate = (ReportGenerator.generate_virtual_html_report if style == 'virtual'
+                else ReportGenerator.generate_html_report)
+    success = generate(result.duplicate_groups, output_file, result.group_sizes, result.file_records, compression)
     if success:
         print(f"详细报告已生成: {output_file}")
     else:
         print("生成报告失败", file=sys.stderr)
 
 
-def auto_delete_duplicates(duplicate_groups, args):
-    """自动删除重复文件"""
-    import time
-    
-    total_files = sum(len(files) for files in duplicate_groups.values())
-    files_to_delete = []
+def action_progress(args):
+    """删除/恢复操作的进度回调，静默模式下为 None"""
+    if args.quiet:
+        return None
+        
+    def progress_callback(current, total, message):
+        percentage = (current / total * 100) if total > 0 else 0
+        print(f"\r{message}: {current}/{total} ({percentage:.1f}%)", end='', flush=True)
+        
+    return progress_callback
+
+
+def print_action_summary(summary, verb):
+    """输出批量操作的结果、失败项与吞吐量"""
+    print()
+    for file_path, error in summary.failures:
+        print(f"  [失败] {file_path}: {error}", file=sys.stderr)
+    print(f"\n{verb}完成: {summary.succeeded}/{summary.total} 个文件，"
+          f"耗时 {summary.elapsed:.2f} 秒 ({summary.files_per_second:.0f} 个/秒, "
+          f"{FileUtils.format_size(int(summary.bytes_per_second))}/秒)")
+
+
+ACTION_VERBS = {
+    'delete': '删除',
+    'move': '移动',
+    'hardlink': '替换为硬链接',
+    'reflink': '替换为 reflink 克隆',
+    'symlink': '替换为符号链接',
+}
+
+
+def run_journal(args):
+    """按操作日志续做或撤销，返回退出码"""
+    path = args.resume or args.undo
+    try:
+        state = ActionJournal.load(path)
+    except (OSError, ValueError) as e:
+        print(f"错误: 无法读取操作日志 - {e}", file=sys.stderr)
+        return 1
+        
+    ops = state.pending() if args.resume else state.undoable()
+    verb = ACTION_VERBS.get(state.action, state.action) if args.resume else '恢复'
+    print(f"操作日志: {path} (共 {len(state.ops)} 个操作，待{verb} {len(ops)} 个)")
+    if not ops:
+        return 0
+    if args.dry_run:
+        for op in ops:
+            print(f"  [{verb}] {op.src}")
+        return 0
+        
+    journal = ActionJournal(path)
+    journal.reopen()
+    executor = ActionExecutor(args.action_threads, journal=journal, progress_callback=action_progress(args))
+    try:
+        summary = executor.execute(ops, resume=True) if args.resume else executor.undo(ops)
+    finally:
+        journal.close()
+    print_action_summary(summary, verb)
+    return 0 if not summary.failures else 1
+
+
+def auto_delete_duplicates(result, args):
+    """自动删除重复文件，或替换为指向保留文件的链接（--action）
     
-    # 确定要删除的文件
-    for files in duplicate_groups.values():
-        if len(files) <= 1:
-            continue
-            
-        # 根据保留策略选择要保留的文件
-        if args.keep == 'oldest':
-            # 保留最旧的文件
-            files_with_time = [(f, os.path.getmtime(f)) for f in files]
-            files_with_time.sort(key=lambda x: x[1])
-            keep_file = files_with_time[0][0]
-        elif args.keep == 'newest':
-            # 保留最新的文件
-            files_with_time = [(f, os.path.getmtime(f)) for f in files]
-            files_with_time.sort(key=lambda x: x[1], reverse=True)
-            keep_file = files_with_time[0][0]
-        else:  # first
-            # 保留第一个文件
-            keep_file = files[0]
-            
-        # 添加其他文件到删除列表
-        for file_path in files:
-            if file_path != keep_file:
-                files_to_delete.append(file_path)
-                
-    if not files_to_delete:
-        print("没有文件需要删除")
+    保留哪个文件按扫描时记录的修改时间决定；操作按设备并行执行，
+    指定操作日志时可在中断后续做或撤销。
+    """
+    action = args.action or 'delete'
+    verb = ACTION_VERBS[action]
+    ops = plan_cleanup(result.duplicate_groups, action, args.keep, result.file_records, args.backup_dir)
+    if not ops:
+        print("没有文件需要处理")
         return
         
-    print(f"\n将要删除 {len(files_to_delete)} 个重复文件:")
+    print(f"\n将要{verb} {len(ops)} 个重复文件:")
     
     if args.dry_run:
-        print("(模拟运行 - 不会实际删除文件)")
-        for file_path in files_to_delete:
-            print(f"  [删除] {file_path}")
+        print("(模拟运行 - 不会实际修改文件)")
+        for op in ops:
+            print(f"  [{verb}] {op.src}" + (f" -> {op.target}" if op.target else ''))
         return
         
-    # 确认删除
+    # 确认操作
     if not args.quiet:
-        response = input(f"确定要删除这 {len(files_to_delete)} 个文件吗? (y/N): ")
+        response = input(f"确定要{verb}这 {len(ops)} 个文件吗? (y/N): ")
         if response.lower() not in ['y', 'yes']:
             print("操作已取消")
             return
             
-    # 执行删除
-    success_count = 0
-    for file_path in files_to_delete:
+    journal = None
+    journal_path = args.journal
+    if journal_path is None and args.backup_dir:
+        journal_path = os.path.join(args.backup_dir, f"{action}_journal_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+    if journal_path:
+        journal = ActionJournal(journal_path)
         try:
-            success = FileUtils.safe_delete_file(file_path, args.backup_dir)
-            if success:
-                success_count += 1
-                if not args.quiet:
-                    print(f"  [已删除] {file_path}")
-            else:
-                print(f"  [失败] {file_path}", file=sys.stderr)
-        except Exception as e:
-            print(f"  [错误] {file_path}: {e}", file=sys.stderr)
+            journal.begin(action, ops)
+        except OSError as e:
+            print(f"错误: 无法创建操作日志 - {e}", file=sys.stderr)
+            return
             
-    print(f"\n删除完成: {success_count}/{len(files_to_delete)} 个文件")
+    # 执行操作
+    executor = ActionExecutor(args.action_threads, journal=journal, progress_callback=action_progress(args))
+    try:
+        summary = executor.execute(ops)
+    finally:
+        if journal is not None:
+            journal.close()
+    print_action_summary(summary, verb)
     
-    if args.backup_dir and success_count > 0:
+    if action != 'delete' and not args.backup_dir and summary.succeeded > 0:
+        print(f"释放空间: {FileUtils.format_size(summary.bytes_done)}")
+    if args.backup_dir and summary.succeeded > 0:
         print(f"备份目录: {args.backup_dir}")
+    if journal is not None:
+        print(f"操作日志: {journal_path} (中断后用 --resume 续做，--undo 撤销)")
 
 
 if __name__ == '__main__':
@@ -63,7 +63,7 @@ def basic_scan_example():
         
         # 设置进度回调
         def progress_callback(current, total, message):
-            print(f"进度: {current}/{total} - {message}")
+            print(f"进度: {FileUtils.format_size(current)}/{FileUtils.format_size(total)} - {message}")
             
         scanner.set_progress_callback(progress_callback)
         
@@ -142,13 +142,15 @@ def advanced_scan_example():
             
             # 生成 HTML 报告
             html_file = os.path.join(test_dir, 'report.html')
-            success = ReportGenerator.generate_html_report(result.duplicate_groups, html_file)
+            success = ReportGenerator.generate_html_report(result.duplicate_groups, html_file, result.group_sizes,
+                                                           result.file_records)
             if success:
                 print(f"HTML 报告已生成: {html_file}")
                 
             # 生成 JSON 报告
             json_file = os.path.join(test_dir, 'report.json')
-            success = ReportGenerator.generate_json_report(result.duplicate_groups, json_file)
+            success = ReportGenerator.generate_json_report(result.duplicate_groups, json_file, result.group_sizes,
+                                                           result.file_records)
             if success:
                 print(f"JSON 报告已生成: {json_file}")
                 
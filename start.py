@@ -50,7 +50,8 @@ def run_cli_scan(directory, algorithm='md5', output='text'):
         # 设置进度回调
         def progress_callback(current, total, message):
             percentage = (current / total * 100) if total > 0 else 0
-            print(f"\r进度: {percentage:.1f}% ({current}/{total})", end='', flush=True)
+            print(f"\r进度: {percentage:.1f}% ({FileUtils.format_size(current)}/{FileUtils.format_size(total)})",
+                  end='', flush=True)
             
         scanner.set_progress_callback(progress_callback)
         
@@ -0,0 +1,204 @@
+"""
+批量文件操作测试
+"""
+
+import json
+import os
+import tempfile
+import pytest
+from app.actions import ActionExecutor, ActionJournal, choose_keep, plan_actions, plan_cleanup
+from app.walker import FileRecord
+
+
+class TestActions:
+    """批量文件操作测试类"""
+    
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.temp_dir, 'data')
+        self.backup_dir = os.path.join(self.temp_dir, 'backups')
+        self.journal_path = os.path.join(self.temp_dir, 'journal.jsonl')
+        self.files = []
+        for sub in ('a', 'b', 'c'):
+            os.makedirs(os.path.join(self.data_dir, sub))
+            path = os.path.join(self.data_dir, sub, 'same.txt')
+            with open(path, 'w') as f:
+                f.write(f'content {sub}')
+            self.files.append(path)
+            
+    def teardown_method(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        
+    def test_choose_keep_uses_scan_metadata(self):
+        """测试保留策略使用扫描时的修改时间，而不是文件当前的修改时间"""
+        records = {path: FileRecord(path, 9, mtime, 1, 1) for path, mtime in zip(self.files, (300, 100, 200))}
+        os.utime(self.files[1], ns=(10 ** 18, 10 ** 18))  # 扫描后被修改，不影响决定
+        
+        assert choose_keep(self.files, 'first', records) == self.files[0]
+        assert choose_keep(self.files, 'oldest', records) == self.files[1]
+        assert choose_keep(self.files, 'newest', records) == self.files[0]
+        with pytest.raises(ValueError):
+            choose_keep(self.files, 'largest', records)
+            
+    def test_plan_reserves_unique_destinations(self):
+        """测试同名文件在计划中得到不同的目标路径"""
+        target = os.path.join(self.temp_dir, 'moved')
+        os.makedirs(target)
+        open(os.path.join(target, 'same.txt'), 'w').close()
+        
+        ops = plan_actions('move', self.files, target)
+        assert [os.path.basename(op.dst) for op in ops] == ['same_1.txt', 'same_2.txt', 'same_3.txt']
+        assert all(op.dev == os.stat(self.data_dir).st_dev for op in ops)
+        with pytest.raises(ValueError):
+            plan_actions('move', self.files)
+            
+    def test_delete_with_journal_and_undo(self):
+        """测试带备份删除、日志记录与撤销"""
+        ops = plan_cleanup({'h': self.files}, backup_dir=self.backup_dir)
+        assert [op.src for op in ops] == self.files[1:]
+        
+        journal = ActionJournal(self.journal_path)
+        journal.begin('delete', ops)
+        summary = ActionExecutor(threads=2, batch_size=1, journal=journal).execute(ops)
+        journal.close()
+        
+        assert summary.succeeded == 2 and not summary.failures
+        assert summary.bytes_done == sum(os.path.getsize(op.dst) for op in ops)
+        assert os.path.exists(self.files[0]) and not any(os.path.exists(p) for p in self.files[1:])
+        
+        state = ActionJournal.load(self.journal_path)
+        assert state.action == 'delete' and not state.pending()
+        assert [op.src for op in state.undoable()] == self.files[1:]
+        
+        journal.reopen()
+        summary = ActionExecutor(journal=journal).undo(state.undoable())
+        journal.close()
+        assert summary.succeeded == 2
+        with open(self.files[2]) as f:
+            assert f.read() == 'content c'
+        assert not ActionJournal.load(self.journal_path).undoable()
+        
+    def test_resume_after_interruption(self):
+        """测试中断后续做：已执行但未记录的操作视为完成，截断的最后一行被忽略"""
+        ops = plan_actions('move', self.files, os.path.join(self.temp_dir, 'moved'))
+        journal = ActionJournal(self.journal_path)
+        journal.begin('move', ops)
+        journal.record('done', [(ops[0].index, None)])
+        journal.close()
+        # 模拟中断：第二个文件已移动但未记录，日志最后一行只写了一半
+        ActionExecutor._apply(ops[0])
+        ActionExecutor._apply(ops[1])
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps({'type': 'done', 'i': 1, 'ok': True})[:10])
+            
+        state = ActionJournal.load(self.journal_path)
+        assert [op.index for op in state.pending()] == [1, 2]
+        
+        summary = ActionExecutor().execute(state.pending(), resume=True)
+        assert summary.succeeded == 2
+        assert all(os.path.exists(op.dst) and not os.path.exists(op.src) for op in ops)
+        
+    def test_failures_reported(self):
+        """测试失败的操作单独报告，不影响其他操作"""
+        os.remove(self.files[1])
+        ops = plan_actions('delete', self.files)
+        summary = ActionExecutor().execute(ops)
+        
+        assert summary.succeeded == 2
+        assert [path for path, _ in summary.failures] == [self.files[1]]
+        assert summary.results == {self.files[0]: True, self.files[1]: False, self.files[2]: True}
+        
+    def test_delete_checks_scan_records(self):
+        """测试删除前校验扫描记录：扫描后被改写的文件、保留文件已不存在的组都不删除"""
+        records = {path: FileRecord.from_stat(path, os.stat(path)) for path in self.files}
+        ops = plan_cleanup({'h': self.files}, file_records=records)
+        assert all(op.target == self.files[0] for op in ops)
+        with open(self.files[1], 'w') as f:
+            f.write('rewritten')  # 大小变化
+            
+        journal = ActionJournal(self.journal_path)
+        journal.begin('delete', ops)
+        summary = ActionExecutor(journal=journal).execute(ops)
+        journal.close()
+        assert summary.succeeded == 1 and [path for path, _ in summary.failures] == [self.files[1]]
+        assert os.path.exists(self.files[1])
+        with open(self.journal_path) as f:
+            entries = [json.loads(line) for line in f]
+        assert [entry['ok'] for entry in entries if entry['type'] == 'done'] == [False, True]
+        assert [op.src for op in ActionJournal.load(self.journal_path).pending()] == [self.files[1]]
+        
+        # 保留文件被删除后，同组的其他文件不能再删除
+        records = {path: FileRecord.from_stat(path, os.stat(path)) for path in self.files[:2]}
+        ops = plan_cleanup({'h': self.files[:2]}, file_records=records)
+        os.remove(self.files[0])
+        summary = ActionExecutor().execute(ops)
+        assert summary.succeeded == 0 and '保留文件已不存在' in summary.failures[0][1]
+        assert os.path.exists(self.files[1])
+        
+    def test_existing_journal_not_overwritten(self):
+        """测试已有的操作日志不会被新计划覆盖"""
+        ops = plan_actions('delete', self.files)
+        journal = ActionJournal(self.journal_path)
+        journal.begin('delete', ops)
+        journal.close()
+        with pytest.raises(FileExistsError):
+            ActionJournal(self.journal_path).begin('delete', ops)
+        
+    def test_hardlink_cleanup_and_undo(self):
+        """测试按设备选择保留文件、替换为硬链接后撤销"""
+        records = {path: FileRecord(path, 9, 0, 0, dev) for path, dev in zip(self.files, (1, 2, 1))}
+        ops = plan_cleanup({'h': self.files}, 'hardlink', file_records=records, backup_dir=self.backup_dir)
+        # 设备 2 上只有一个文件，它就是该设备的保留文件
+        assert [(op.src, op.target) for op in ops] == [(self.files[2], self.files[0])]
+        
+        for path in self.files[1:]:
+            with open(path, 'w') as f:
+                f.write('content a')
+        ops = plan_cleanup({'h': self.files}, 'hardlink', backup_dir=self.backup_dir)
+        journal = ActionJournal(self.journal_path)
+        journal.begin('hardlink', ops)
+        summary = ActionExecutor(journal=journal).execute(ops)
+        journal.close()
+        assert summary.succeeded == 2
+        assert all(os.path.samefile(self.files[0], path) for path in self.files[1:])
+        
+        state = ActionJournal.load(self.journal_path)
+        assert [op.target for op in state.ops] == [self.files[0]] * 2
+        summary = ActionExecutor().undo(state.undoable())
+        assert summary.succeeded == 2
+        assert not any(os.path.samefile(self.files[0], path) for path in self.files[1:])
+        
+    def test_link_endpoint_requires_same_group(self):
+        """测试 Web 接口只替换与保留文件在同一重复组中的文件"""
+        from app.result_store import ResultStore
+        from app.web import app as web_app
+        
+        with open(self.files[1], 'w') as f:
+            f.write('content a')
+        records = [FileRecord.from_stat(path, os.stat(path)) for path in self.files[:2]]
+        store = ResultStore()
+        store.add('h', records[0].size, self.files[:2], records)
+        web_app.result_stores['test-scan'] = store
+        client = web_app.app.test_client()
+        try:
+            # 大小相同但不在任何重复组中的文件
+            response = client.post('/api/files/link', json={
+                'scan_id': 'test-scan', 'keep': self.files[0], 'files': [self.files[2]], 'mode': 'hardlink'})
+            assert response.status_code == 400
+            assert not os.path.samefile(self.files[0], self.files[2])
+            
+            cwd = os.getcwd()
+            os.chdir(self.temp_dir)  # 操作日志写入工作目录下的 journals
+            try:
+                response = client.post('/api/files/link', json={
+                    'scan_id': 'test-scan', 'keep': self.files[0], 'files': [self.files[1]], 'mode': 'hardlink'})
+            finally:
+                os.chdir(cwd)
+            assert response.get_json()['results'] == [{'file': self.files[1], 'success': True}]
+            assert os.path.samefile(self.files[0], self.files[1])
+        finally:
+            web_app.result_stores.pop('test-scan')
+            store.close()
@@ -0,0 +1,69 @@
+"""
+异步哈希引擎测试
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from app.async_engine import AsyncHashEngine
+from app.hasher import FileHasher
+from app.walker import FileRecord
+
+
+class TestAsyncHashEngine:
+    """异步哈希引擎测试类"""
+    
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.stop_event = threading.Event()
+        
+    def teardown_method(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        
+    def create_test_file(self, filename, data):
+        """创建测试文件，返回文件记录"""
+        file_path = os.path.join(self.temp_dir, filename)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        return FileRecord.from_stat(file_path, os.stat(file_path))
+        
+    def test_digests_match_hashlib(self):
+        """测试摘要与 hashlib 一致，且在途字节数不超过预算"""
+        contents = [os.urandom(size) for size in (0, 1, 4096, 300 * 1024)]
+        jobs = [(i, self.create_test_file(f'f{i}.bin', data)) for i, data in enumerate(contents)]
+        progress = []
+        
+        engine = AsyncHashEngine(2, 64 * 1024, 8, self.stop_event,
+                                 lambda done, total, message: progress.append((done, total)))
+        results = dict(engine.run(jobs, FileHasher('md5'), 'hash'))
+        
+        assert results == {i: hashlib.md5(data).digest() for i, data in enumerate(contents)}
+        assert 0 < engine.peak_inflight_bytes <= 64 * 1024
+        assert progress[-1] == (sum(len(data) for data in contents),) * 2
+        
+    def test_missing_file_skipped(self):
+        """测试无法打开的文件被跳过"""
+        record = FileRecord(os.path.join(self.temp_dir, 'missing'), 10, 0, 0, 0)
+        engine = AsyncHashEngine(1, 1024, 1, self.stop_event)
+        assert engine.run([('missing', record)], FileHasher('md5'), 'hash') == []
+        
+    def test_stop_event(self):
+        """测试设置停止事件后不再产出结果"""
+        jobs = [(i, self.create_test_file(f'f{i}.bin', b'x' * 1024)) for i in range(4)]
+        self.stop_event.set()
+        engine = AsyncHashEngine(1, 1024, 2, self.stop_event)
+        assert engine.run(jobs, FileHasher('md5'), 'hash') == []
+        
+    def test_file_grown_after_stat_skipped(self):
+        """测试扫描后被追加内容的文件不按扫描时的大小截取前缀计算摘要"""
+        jobs = [(i, self.create_test_file(f'f{i}.bin', b'same' * 256)) for i in range(2)]
+        with open(jobs[1][1].path, 'ab') as f:
+            f.write(b'grown')
+            
+        engine = AsyncHashEngine(1, 1024, 2, self.stop_event)
+        results = engine.run(jobs, FileHasher('md5'), 'hash')
+        assert results == [(0, hashlib.md5(b'same' * 256).digest())]
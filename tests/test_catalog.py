@@ -0,0 +1,43 @@
+"""
+文件目录表测试
+"""
+
+import os
+from app.catalog import FileCatalog
+from app.walker import FileRecord
+
+
+class TestFileCatalog:
+    """文件目录表测试类"""
+    
+    def test_round_trip(self):
+        """测试按编号还原文件记录"""
+        catalog = FileCatalog()
+        records = [
+            FileRecord(os.path.join('/data', 'a', '1.txt'), 10, 100, 1, 7),
+            FileRecord(os.path.join('/data', 'a', '文件.txt'), 20, -5, 2, 7),
+            FileRecord(os.path.join('/data', 'b', '1.txt'), 30, 300, 3, 8),
+        ]
+        ids = [catalog.add(record) for record in records]
+        
+        assert ids == [0, 1, 2]
+        assert len(catalog) == 3
+        assert [catalog.record(i) for i in ids] == records
+        assert catalog.name(1) == '文件.txt'
+        assert list(catalog.sizes) == [10, 20, 30]
+        
+    def test_directory_interning(self):
+        """测试同一目录只保存一份"""
+        catalog = FileCatalog()
+        for i in range(100):
+            catalog.add(FileRecord(f'/very/long/directory/name/f{i}', i, 0, i, 1))
+            
+        assert len(catalog._dirs) == 1
+        assert catalog.path(42) == '/very/long/directory/name/f42'
+        
+    def test_undecodable_name(self):
+        """测试无法解码的文件名原样还原"""
+        catalog = FileCatalog()
+        path = os.fsdecode(b'/tmp/bad\xff.bin')
+        catalog.add(FileRecord(path, 1, 0, 1, 1))
+        assert catalog.path(0) == path
@@ -0,0 +1,97 @@
+"""
+列式结果导出测试
+"""
+
+import os
+import tempfile
+import pytest
+from app import columnar
+from app.columnar import read_columnar, write_columnar
+from app.scanner import FileScanner, ScanConfig
+from app.utils import ReportGenerator
+from app.walker import FileRecord
+
+
+class TestColumnar:
+    """列式结果导出测试类"""
+    
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.groups = [
+            ('00ff' * 8, 4096, [FileRecord('/data/a.bin', 4096, 1_700_000_000_000_000_000, 11, 2049),
+                                FileRecord('/data/sub/a.bin', 4096, -5, 0, 0)]),  # inode 未知
+            ('ab' * 32, 7, [FileRecord('/data/b\udcff.txt', 7, 3, 13, 2049),
+                            FileRecord('/data/sub/b.txt', 7, None, None, None),
+                            FileRecord('relative.txt', 7, 4, 15, 2050)]),
+        ]
+        
+    def teardown_method(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        
+    def test_round_trip(self):
+        """测试 .dhc 写出后原样读回：变长摘要、无法解码的文件名、缺失的元数据、为 0 的 inode"""
+        path = os.path.join(self.temp_dir, 'results.dhc')
+        summary = {'total_files': 9, 'total_size': 12345, 'scan_time': 1.5,
+                   'stage_stats': {'size': 5, 'sample': 5, 'full': 5}}
+        assert write_columnar(iter(self.groups), path, summary=summary) == 5
+        
+        result = read_columnar(path)
+        assert result.duplicate_groups == {digest: [record.path for record in records]
+                                           for digest, _, records in self.groups}
+        assert result.group_sizes == {'00ff' * 8: 4096, 'ab' * 32: 7}
+        assert result.file_records == {record.path: record for _, _, records in self.groups for record in records}
+        assert (result.total_files, result.total_size, result.scan_time) == (9, 12345, 1.5)
+        assert result.stage_stats == summary['stage_stats']
+        
+    def test_empty(self):
+        """测试没有重复组时也能写出并读回"""
+        path = os.path.join(self.temp_dir, 'empty.dhc')
+        write_columnar([], path)
+        result = read_columnar(path)
+        assert result.duplicate_groups == {} and result.file_records == {}
+        
+    def test_report_generator_with_scan(self):
+        """测试 ReportGenerator 导出扫描结果并读回"""
+        for name in ('a.txt', 'b.txt'):
+            with open(os.path.join(self.temp_dir, name), 'w') as f:
+                f.write('same content')
+        scanned = FileScanner(ScanConfig(min_size=1)).scan_directory(self.temp_dir)
+        
+        path = os.path.join(self.temp_dir, 'scan.dhc')
+        assert ReportGenerator.generate_columnar_report(scanned.duplicate_groups, path, scanned.group_sizes,
+                                                        scanned.file_records)
+        loaded = ReportGenerator.load_columnar_report(path)
+        assert loaded.duplicate_groups == scanned.duplicate_groups
+        assert loaded.file_records == scanned.file_records
+        
+    def test_invalid_files(self):
+        """测试不支持的格式与非列式文件"""
+        path = os.path.join(self.temp_dir, 'results.bin')
+        with pytest.raises(ValueError):
+            write_columnar(self.groups, path, file_format='arrow')
+            
+        with open(path, 'wb') as f:
+            f.write(b'not a columnar file')
+        with pytest.raises(ValueError):
+            read_columnar(path)
+            
+    @pytest.mark.skipif(columnar.pyarrow is not None, reason="已安装 pyarrow")
+    def test_parquet_requires_pyarrow(self):
+        """测试未安装 pyarrow 时不能写 Parquet"""
+        with pytest.raises(ValueError):
+            write_columnar(self.groups, os.path.join(self.temp_dir, 'results.parquet'))
+            
+    @pytest.mark.skipif(columnar.pyarrow is None, reason="未安装 pyarrow")
+    def test_parquet_round_trip(self):
+        """测试 Parquet 写出后原样读回（无法编码为 UTF-8 的路径除外）"""
+        groups = [(digest, size, [r for r in records if '\udcff' not in r.path])
+                  for digest, size, records in self.groups]
+        path = os.path.join(self.temp_dir, 'results.parquet')
+        write_columnar(groups, path, summary={'total_files': 9})
+        
+        result = read_columnar(path)
+        assert result.file_records == {record.path: record for _, _, records in groups for record in records}
+        assert result.total_files == 9
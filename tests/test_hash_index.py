@@ -0,0 +1,84 @@
+"""
+持久化哈希索引测试
+"""
+
+import os
+import tempfile
+from app.hash_index import HashIndex
+from app.hasher import FileHasher
+
+
+class TestHashIndex:
+    """持久化哈希索引测试类"""
+    
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'index', 'hashes.db')
+        
+    def teardown_method(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        
+    def create_test_file(self, filename, content):
+        """创建测试文件"""
+        file_path = os.path.join(self.temp_dir, filename)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return file_path
+        
+    def test_put_and_get(self):
+        """测试写入与查询"""
+        index = HashIndex(self.db_path)
+        index.put(1, 2, 3, 4, 'md5', 'abc', '/some/path')
+        
+        assert index.get(1, 2, 3, 4, 'md5') == 'abc'
+        assert index.get(1, 2, 3, 5, 'md5') is None
+        assert index.get(1, 2, 3, 4, 'sha256') is None
+        index.close()
+        
+    def test_survives_reopen(self):
+        """测试索引在新的哈希计算器中复用"""
+        file_path = self.create_test_file('test.txt', 'persistent content')
+        
+        index = HashIndex(self.db_path)
+        expected = FileHasher('md5', index=index).calculate_hash(file_path)
+        index.close()
+        
+        index = HashIndex(self.db_path)
+        assert len(index) == 1
+        st = os.stat(file_path)
+        assert index.get(st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, 'md5') == expected
+        index.close()
+        
+    def test_prune_removes_stale_entries(self):
+        """测试清理已删除或已修改的文件条目"""
+        kept = self.create_test_file('kept.txt', 'kept')
+        removed = self.create_test_file('removed.txt', 'removed')
+        
+        index = HashIndex(self.db_path)
+        hasher = FileHasher('md5', index=index)
+        hasher.calculate_hash(kept)
+        hasher.calculate_hash(removed)
+        os.remove(removed)
+        
+        assert index.prune() == 1
+        assert len(index) == 1
+        index.close()
+        
+    def test_prune_in_batches(self):
+        """测试分批清理时跨批次的过期条目都被删除"""
+        paths = [self.create_test_file(f'f{i}.txt', f'content {i}') for i in range(7)]
+        index = HashIndex(self.db_path)
+        index.PRUNE_BATCH = 2
+        hasher = FileHasher('md5', index=index)
+        for path in paths:
+            hasher.calculate_hash(path)
+        for path in paths[::2]:
+            os.remove(path)
+            
+        assert index.prune() == 4
+        assert len(index) == 3
+        assert index.prune() == 0
+        index.close()
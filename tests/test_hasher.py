@@ -5,7 +5,8 @@
 import os
 import tempfile
 import pytest
-from app.hasher import FileHasher
+from app.hasher import FileHasher, HashCache
+from app.walker import FileRecord
 
 
 class TestFileHasher:
@@ -90,4 +91,106 @@ class TestFileHasher:
     def test_unsupported_algorithm(self):
         """测试不支持的算法"""
         with pytest.raises(ValueError):
-            FileHasher('unsupported_algorithm')
\ No newline at end of file
+            FileHasher('unsupported_algorithm')
+            
+    def test_sample_hash(self):
+        """测试抽样哈希只读取头/中/尾三段"""
+        # 40 字节文件，4 字节抽样段位于偏移 0、18、36
+        file1 = self.create_test_file('file1.txt', 'x' * 10 + 'a' + 'x' * 29)
+        file2 = self.create_test_file('file2.txt', 'x' * 10 + 'b' + 'x' * 29)
+        file3 = self.create_test_file('file3.txt', 'x' * 19 + 'c' + 'x' * 20)
+        
+        sample1 = self.hasher.calculate_sample_hash(file1, 40, 4)
+        assert sample1 == self.hasher.calculate_sample_hash(file2, 40, 4)
+        assert sample1 != self.hasher.calculate_sample_hash(file3, 40, 4)
+        
+        # 小文件的抽样哈希等于完整哈希
+        assert self.hasher.calculate_sample_hash(file1, 40, 100) == self.hasher.calculate_hash(file1)
+        
+    def test_io_strategies_same_digest(self):
+        """测试各读取策略得到相同的哈希值"""
+        file_path = os.path.join(self.temp_dir, 'data.bin')
+        with open(file_path, 'wb') as f:
+            f.write(os.urandom(300 * 1024 + 7))
+            
+        expected = FileHasher('sha256', io_strategy='buffered').calculate_hash(file_path)
+        for strategy in ('auto', 'readinto', 'mmap'):
+            hasher = FileHasher('sha256', io_strategy=strategy, drop_cache=True)
+            assert hasher.calculate_hash(file_path) == expected
+            
+    def test_mmap_empty_file(self):
+        """测试 mmap 策略处理空文件"""
+        file_path = self.create_test_file('empty.txt', '')
+        hasher = FileHasher('md5', io_strategy='mmap')
+        assert hasher.calculate_hash(file_path) == 'd41d8cd98f00b204e9800998ecf8427e'
+        
+    def test_unsupported_io_strategy(self):
+        """测试不支持的读取策略"""
+        with pytest.raises(ValueError):
+            FileHasher('md5', io_strategy='unsupported')
+        
+    def test_blake2b_short_digest(self):
+        """测试短摘要 BLAKE2b 算法"""
+        file_path = self.create_test_file('test.txt', 'hello world')
+        assert len(FileHasher('blake2b-128').calculate_hash(file_path)) == 32
+        assert len(FileHasher('blake2b-64').calculate_hash(file_path)) == 16
+        
+    def test_register_algorithm(self):
+        """测试注册自定义算法"""
+        import hashlib
+        FileHasher.register_algorithm('sha512-test', hashlib.sha512)
+        try:
+            assert 'sha512-test' in FileHasher.available_algorithms()
+            file_path = self.create_test_file('test.txt', 'hello world')
+            expected = hashlib.sha512(b'hello world').hexdigest()
+            assert FileHasher('sha512-test').calculate_hash(file_path) == expected
+        finally:
+            del FileHasher.SUPPORTED_ALGORITHMS['sha512-test']
+        
+    def test_cache_lru_eviction(self):
+        """测试缓存超出容量时淘汰最久未使用的条目"""
+        cache = HashCache()
+        digest = bytes(16)
+        entry_bytes = cache._entry_bytes(HashCache.make_key(0, 0, 0, 0), digest)
+        cache = HashCache(entry_bytes * 2)
+        
+        keys = [HashCache.make_key(1, ino, 10, 0) for ino in range(3)]
+        cache.put(keys[0], digest)
+        cache.put(keys[1], digest)
+        assert cache.get(keys[0]) == digest  # keys[0] 变为最近使用
+        cache.put(keys[2], digest)
+        
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == digest
+        assert cache.get(keys[2]) == digest
+        assert cache.current_bytes <= cache.max_bytes
+        assert cache.stats()['cache_evictions'] == 1
+        
+    def test_cache_counters_in_algorithm_info(self):
+        """测试缓存命中/未命中/淘汰计数通过 get_algorithm_info 暴露"""
+        hasher = FileHasher('md5', cache_limit=0)
+        file_path = self.create_test_file('test.txt', 'test content')
+        hasher.calculate_hash(file_path)
+        hasher.calculate_hash(file_path)
+        
+        info = hasher.get_algorithm_info()
+        assert info['cache_size'] == 0
+        assert info['cache_misses'] == 2
+        assert info['cache_hits'] == 0
+        
+        self.hasher.calculate_hash(file_path)
+        self.hasher.calculate_hash(file_path)
+        info = self.hasher.get_algorithm_info()
+        assert (info['cache_hits'], info['cache_misses']) == (1, 1)
+        
+    def test_unknown_inode_not_shared_in_cache(self):
+        """测试 inode 为 0（未知）的记录不会让大小和修改时间相同的不同文件共用缓存"""
+        paths = [self.create_test_file(name, content)
+                 for name, content in (('a.txt', 'content1'), ('b.txt', 'content2'))]
+        for path in paths:
+            os.utime(path, ns=(10 ** 18, 10 ** 18))
+        records = [FileRecord(path, 8, 10 ** 18, 0, 0) for path in paths]
+        
+        hashes = [self.hasher.calculate_hash(path, record) for path, record in zip(paths, records)]
+        assert hashes[0] != hashes[1]
+        assert self.hasher.calculate_hash(paths[1], records[1]) == hashes[1]
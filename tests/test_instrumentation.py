@@ -0,0 +1,66 @@
+"""
+扫描度量测试
+"""
+
+import threading
+import pytest
+from app.instrumentation import ScanMetrics
+
+
+class TestScanMetrics:
+    """扫描度量测试类"""
+    
+    def test_phases_accumulate(self):
+        """测试同一阶段多次进入时耗时累加"""
+        metrics = ScanMetrics()
+        with metrics.phase('walk'):
+            pass
+        first = metrics.phases['walk']
+        with metrics.phase('walk'):
+            pass
+        assert metrics.phases['walk'] >= first
+        assert set(metrics.phases) == {'walk'}
+        
+    def test_counters_thread_safe(self):
+        """测试多线程并发计数不丢失"""
+        metrics = ScanMetrics()
+        
+        def work():
+            for _ in range(1000):
+                metrics.count('bytes_read', 2)
+                
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert metrics.counters['bytes_read'] == 8000
+        
+    def test_errors_and_workers(self):
+        """测试错误按类型统计、工作线程忙闲累加"""
+        metrics = ScanMetrics()
+        metrics.record_error(PermissionError())
+        metrics.record_error(PermissionError())
+        metrics.record_error(FileNotFoundError())
+        metrics.record_worker('*/0', 1.0, 0.5, 3)
+        metrics.record_worker('*/0', 2.0, 0.5, 1)
+        
+        data = metrics.to_dict()
+        assert data['errors_by_type'] == {'PermissionError': 2, 'FileNotFoundError': 1}
+        assert data['workers'] == {'*/0': {'busy': 3.0, 'idle': 1.0, 'tasks': 4}}
+        
+    def test_profiling(self):
+        """测试 CPU 与内存剖析生成报告"""
+        metrics = ScanMetrics('all')
+        metrics.start_profiling()
+        with metrics.profile_thread():
+            sum(range(10000))
+        metrics.stop_profiling()
+        
+        assert 'function calls' in metrics.cpu_profile
+        assert metrics.memory_profile['peak'] > 0
+        
+    def test_unsupported_profile(self):
+        """测试不支持的剖析模式"""
+        with pytest.raises(ValueError):
+            ScanMetrics('disk')
@@ -0,0 +1,90 @@
+"""
+扫描结果存储测试
+"""
+
+import os
+import tempfile
+from app.result_store import ResultStore
+from app.walker import FileRecord
+
+
+class TestResultStore:
+    """扫描结果存储测试类"""
+    
+    def setup_method(self):
+        """测试前准备"""
+        self.store = ResultStore()
+        self.store.add('h1', 100, ['/data/a/1.bin', '/data/b/1.bin'])
+        self.store.add('h2', 10, ['/data/b/2.bin', '/data/c/2.bin', '/other/2.bin'])
+        self.store.add('h3', 1000, ['/other/3.bin', '/other/3_copy.bin'])
+        
+    def teardown_method(self):
+        """测试后清理"""
+        self.store.close()
+        
+    def test_query_sorted_by_wasted_space(self):
+        """测试默认按可释放空间排序并分页"""
+        page = self.store.query(offset=0, limit=2)
+        assert [group['hash'] for group in page] == ['h3', 'h1']
+        assert page[0]['files'] == ['/other/3.bin', '/other/3_copy.bin']
+        assert [group['hash'] for group in self.store.query(offset=2, limit=2)] == ['h2']
+        
+    def test_filters(self):
+        """测试按大小、路径前缀和文件数过滤"""
+        assert self.store.count(min_size=50) == 2
+        assert self.store.count(max_size=50) == 1
+        assert self.store.count(min_files=3) == 1
+        assert [g['hash'] for g in self.store.query(path_prefix='/data/b/')] == ['h1', 'h2']
+        assert self.store.count(path_prefix='/other', min_size=500) == 1
+        
+    def test_summary_and_iter(self):
+        """测试汇总与逐组遍历"""
+        assert self.store.summary() == {'groups': 3, 'files': 7, 'wasted_space': 100 + 20 + 1000}
+        assert [digest for digest, _ in self.store.iter_groups(batch_size=2)] == ['h1', 'h2', 'h3']
+        assert len(self.store) == 3
+        
+    def test_iter_records(self):
+        """测试写入并读回扫描时的文件元数据"""
+        records = [FileRecord('/x/1.bin', 5, 111, 7, 1), FileRecord('/y/1.bin', 5, 222, 8, 1)]
+        self.store.add('h4', 5, [record.path for record in records], records)
+        
+        groups = list(self.store.iter_records(batch_size=2))
+        assert [digest for digest, _, _ in groups] == ['h1', 'h2', 'h3', 'h4']
+        assert groups[3] == ('h4', 5, records)
+        # 未附带元数据的组只有路径和大小
+        assert groups[0][2][0] == FileRecord('/data/a/1.bin', 100, None, None, None)
+        
+        by_wasted = [digest for digest, _, _ in self.store.iter_records(batch_size=2, sort='wasted')]
+        assert by_wasted == ['h3', 'h1', 'h2', 'h4']
+        
+    def test_lookup_records(self):
+        """测试按路径查询扫描时的元数据"""
+        records = [FileRecord('/x/1.bin', 5, 111, 7, 1), FileRecord('/y/1.bin', 5, 222, 8, 1)]
+        self.store.add('h4', 5, [record.path for record in records], records)
+        
+        found = self.store.lookup_records(['/y/1.bin', '/data/c/2.bin', '/missing.bin'])
+        assert found == {'/y/1.bin': records[1],
+                         '/data/c/2.bin': FileRecord('/data/c/2.bin', 10, None, None, None)}
+                         
+    def test_temporary_file_removed(self):
+        """测试临时存储关闭后删除文件"""
+        store = ResultStore()
+        path = store.db_path
+        assert os.path.exists(path)
+        store.close()
+        assert not os.path.exists(path)
+        
+    def test_persistent_store(self):
+        """测试指定路径的存储关闭后保留"""
+        temp_dir = tempfile.mkdtemp()
+        path = os.path.join(temp_dir, 'results', 'scan.db')
+        store = ResultStore(path)
+        store.add('h', 1, ['/a', '/b'])
+        store.close()
+        
+        reopened = ResultStore(path)
+        assert len(reopened) == 1
+        reopened.close()
+        
+        import shutil
+        shutil.rmtree(temp_dir, ignore_errors=True)
@@ -6,7 +6,8 @@ import os
 import tempfile
 import pytest
 from pathlib import Path
-from app.scanner import FileScanner, ScanConfig
+from app.result_store import ResultStore
+from app.scanner import FileScanner, ScanConfig, ScanResult
 
 
 class TestFileScanner:
@@ -91,4 +92,252 @@ class TestFileScanner:
         self.create_test_file('.git/config', 'git config')
         
         result = self.scanner.scan_directory(self.temp_dir)
-        assert result.total_files == 1  # .git 目录被排除
\ No newline at end of file
+        assert result.total_files == 1  # .git 目录被排除
+        
+    def test_sample_stage_eliminates_different_heads(self):
+        """测试抽样阶段淘汰头部不同的同大小文件"""
+        self.config.sample_size = 4
+        scanner = FileScanner(self.config)
+        
+        self.create_test_file('a.txt', 'A' + 'x' * 30)
+        self.create_test_file('b.txt', 'B' + 'x' * 30)
+        self.create_test_file('c.txt', 'C' + 'x' * 30)
+        self.create_test_file('d.txt', 'C' + 'x' * 30)
+        
+        result = scanner.scan_directory(self.temp_dir)
+        assert result.stage_stats == {'size': 4, 'sample': 2, 'full': 2}
+        assert len(result.duplicate_groups) == 1
+        
+    def test_statistics_use_scan_metadata(self):
+        """测试统计信息使用扫描时采集的元数据，不再访问文件系统"""
+        self.create_test_file('file1.txt', 'same content')
+        self.create_test_file('file2.txt', 'same content')
+        
+        result = self.scanner.scan_directory(self.temp_dir)
+        for files in result.duplicate_groups.values():
+            for file_path in files:
+                os.remove(file_path)
+                
+        stats = self.scanner.get_scan_statistics(result)
+        assert stats['可释放空间'] == '12.00B'
+        
+    def test_process_executor(self):
+        """测试进程池模式与线程池模式结果一致"""
+        self.create_test_file('file1.txt', 'same content')
+        self.create_test_file('file2.txt', 'same content')
+        self.create_test_file('file3.txt', 'diff content')
+        
+        thread_result = self.scanner.scan_directory(self.temp_dir)
+        
+        self.config.executor = 'process'
+        self.config.process_batch_size = 1
+        process_result = FileScanner(self.config).scan_directory(self.temp_dir)
+        
+        assert process_result.duplicate_groups.keys() == thread_result.duplicate_groups.keys()
+        assert sorted(next(iter(process_result.duplicate_groups.values()))) == \
+            sorted(next(iter(thread_result.duplicate_groups.values())))
+        
+    def test_unsupported_executor(self):
+        """测试不支持的执行方式"""
+        self.config.executor = 'fiber'
+        with pytest.raises(ValueError):
+            FileScanner(self.config)
+        
+    def test_verify_algorithm(self):
+        """测试用 SHA256 复核重复组"""
+        self.config.algorithm = 'blake2b-64'
+        self.config.verify_algorithm = 'sha256'
+        scanner = FileScanner(self.config)
+        
+        self.create_test_file('file1.txt', 'same content')
+        self.create_test_file('file2.txt', 'same content')
+        
+        result = scanner.scan_directory(self.temp_dir)
+        assert result.stage_stats['verify'] == 2
+        # 复核后重复组以复核算法的摘要为键
+        import hashlib
+        assert list(result.duplicate_groups) == [hashlib.sha256(b'same content').hexdigest()]
+        
+    def test_compare_small_groups(self):
+        """测试小候选组逐块比较，结果与哈希一致"""
+        import hashlib
+        self.config.compare_min_size = 1
+        self.config.chunk_size = 4
+        scanner = FileScanner(self.config)
+        
+        self.create_test_file('a.txt', 'x' * 40 + 'same')
+        self.create_test_file('b.txt', 'x' * 40 + 'same')
+        self.create_test_file('c.txt', 'x' * 40 + 'diff')
+        
+        # 禁用哈希路径，确认重复组完全由逐块比较得出
+        scanner._hash_in_thread = lambda records, hasher: []
+        result = scanner.scan_directory(self.temp_dir)
+        expected = hashlib.md5(('x' * 40 + 'same').encode()).hexdigest()
+        assert list(result.duplicate_groups) == [expected]
+        assert sorted(os.path.basename(f) for f in result.duplicate_groups[expected]) == ['a.txt', 'b.txt']
+        
+    def test_hardlinks_reported_separately(self):
+        """测试硬链接只读取一次且不计入重复组"""
+        original = self.create_test_file('original.txt', 'linked content')
+        os.link(original, os.path.join(self.temp_dir, 'link.txt'))
+        self.create_test_file('copy.txt', 'linked content')
+        
+        result = self.scanner.scan_directory(self.temp_dir)
+        assert result.total_files == 3
+        assert len(result.hardlink_groups) == 1
+        assert len(next(iter(result.hardlink_groups.values()))) == 2
+        
+        # 硬链接组只以一个路径参与重复比较
+        assert len(next(iter(result.duplicate_groups.values()))) == 2
+        stats = self.scanner.get_scan_statistics(result)
+        assert stats['可释放空间'] == '14.00B'
+        
+    def test_iter_duplicates_in_batches(self):
+        """测试流式扫描分批产出重复组，结果与完整扫描一致"""
+        self.config.stream_batch_files = 2
+        scanner = FileScanner(self.config)
+        
+        self.create_test_file('a1.txt', 'aaaa')
+        self.create_test_file('a2.txt', 'aaaa')
+        self.create_test_file('b1.txt', 'bbbbbbbb')
+        self.create_test_file('b2.txt', 'bbbbbbbb')
+        self.create_test_file('c.txt', 'c')
+        
+        result = ScanResult()
+        streamed = dict(scanner.iter_duplicates(self.temp_dir, result))
+        expected = self.scanner.scan_directory(self.temp_dir).duplicate_groups
+        # 多线程哈希时组内文件顺序不固定
+        assert {h: sorted(files) for h, files in streamed.items()} == \
+            {h: sorted(files) for h, files in expected.items()}
+        assert len(streamed) == 2
+        assert result.total_files == 5
+        assert result.stage_stats['size'] == 4
+        assert result.duplicate_groups == {}
+        
+        store = ResultStore()
+        for hash_val, files in streamed.items():
+            store.add(hash_val, result.group_sizes[hash_val], files)
+        stats = scanner.get_scan_statistics(result, store)
+        assert stats['重复文件组数'] == 2
+        assert stats['可释放空间'] == '12.00B'
+        store.close()
+        
+    def test_file_records(self):
+        """测试扫描结果记录重复文件的元数据，流式扫描只保留当前批次"""
+        path1 = self.create_test_file('file1.txt', 'same content')
+        path2 = self.create_test_file('file2.txt', 'same content')
+        self.create_test_file('file3.txt', 'different content')
+        
+        result = self.scanner.scan_directory(self.temp_dir)
+        assert sorted(result.file_records) == [path1, path2]
+        record = result.file_records[path1]
+        st = os.stat(path1)
+        assert (record.size, record.mtime_ns, record.inode, record.dev) == \
+            (st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+            
+        self.config.stream_batch_files = 2
+        self.create_test_file('b1.txt', 'bbbbbbbb')
+        self.create_test_file('b2.txt', 'bbbbbbbb')
+        streamed = ScanResult()
+        for _, files in FileScanner(self.config).iter_duplicates(self.temp_dir, streamed):
+            assert sorted(streamed.file_records) == sorted(files)
+            
+    def test_memory_limit_budgets(self):
+        """测试内存预算分配到哈希缓存和流式批次"""
+        self.config.memory_limit = 1024 * 1024
+        self.config.verify_algorithm = 'sha256'
+        scanner = FileScanner(self.config)
+        
+        assert scanner.hasher.get_algorithm_info()['cache_limit'] == 128 * 1024
+        assert scanner.verify_hasher.get_algorithm_info()['cache_limit'] == 128 * 1024
+        
+        size_groups = {size: [size * 10, size * 10 + 1] for size in range(2000)}
+        batches = scanner._batch_size_groups(size_groups)
+        assert max(sum(len(ids) for ids in batch.values()) for batch in batches) <= 1024
+        scanner.close()
+        
+    def test_async_executor(self):
+        """测试异步执行方式与线程方式结果一致"""
+        self.config.executor = 'async'
+        self.config.max_inflight_bytes = 4096
+        scanner = FileScanner(self.config)
+        
+        self.create_test_file('file1.txt', 'same content' * 1000)
+        self.create_test_file('file2.txt', 'same content' * 1000)
+        self.create_test_file('file3.txt', 'diff content' * 1000)
+        
+        result = scanner.scan_directory(self.temp_dir)
+        assert list(result.duplicate_groups.values()) == \
+            list(self.scanner.scan_directory(self.temp_dir).duplicate_groups.values())
+        assert len(result.duplicate_groups) == 1
+        
+    def test_io_order(self):
+        """测试按 inode / 物理位置读取与默认顺序结果一致"""
+        self.create_test_file('file1.txt', 'same content' * 1000)
+        self.create_test_file('file2.txt', 'same content' * 1000)
+        self.create_test_file('file3.txt', 'diff content' * 1000)
+        expected = list(self.scanner.scan_directory(self.temp_dir).duplicate_groups.values())
+        
+        for io_order in ('inode', 'physical'):
+            self.config.io_order = io_order
+            result = FileScanner(self.config).scan_directory(self.temp_dir)
+            assert list(result.duplicate_groups.values()) == expected
+            
+        self.config.io_order = 'random'
+        with pytest.raises(ValueError):
+            FileScanner(self.config)
+        
+    def test_scan_metrics(self):
+        """测试扫描结果包含各阶段耗时、读取量和工作线程统计"""
+        self.create_test_file('file1.txt', 'same content' * 1000)
+        self.create_test_file('file2.txt', 'same content' * 1000)
+        self.create_test_file('file3.txt', 'diff content' * 1000)
+        
+        result = self.scanner.scan_directory(self.temp_dir)
+        data = result.metrics.to_dict()
+        assert {'walk', 'group', 'sample', 'full_hash', 'assemble'} <= set(data['phases'])
+        assert data['counters']['files_stat'] == 3
+        assert data['counters']['bytes_read'] >= 2 * 12000
+        assert data['counters']['cache_misses'] >= 2
+        assert data['workers']
+        assert self.scanner.hasher.metrics is None
+        
+        # 第二次扫描命中内存缓存
+        data = self.scanner.scan_directory(self.temp_dir).metrics.to_dict()
+        assert data['counters']['cache_hits'] >= 2
+        
+    def test_parallel_walk_deterministic(self):
+        """测试多线程遍历时重复扫描得到顺序相同的重复组"""
+        for i in range(8):
+            os.makedirs(os.path.join(self.temp_dir, f'dir{i}'))
+            for j in range(3):
+                self.create_test_file(os.path.join(f'dir{i}', f'file{j}.txt'), f'content {j}' * 100)
+        self.config.walk_threads = 8
+        
+        expected = FileScanner(self.config).scan_directory(self.temp_dir).duplicate_groups
+        assert len(expected) == 3
+        assert all(files == sorted(files) for files in expected.values())
+        for _ in range(5):
+            groups = FileScanner(self.config).scan_directory(self.temp_dir).duplicate_groups
+            assert list(groups.items()) == list(expected.items())
+        
+    def test_unknown_inode_not_collapsed(self):
+        """测试 inode 为 0（未知）的文件不被当作硬链接合并"""
+        from app.catalog import FileCatalog
+        from app.walker import FileRecord
+        
+        catalog = FileCatalog()
+        ids = [catalog.add(FileRecord(os.path.join(self.temp_dir, f'{i}.txt'), 5, 0, 0, 0)) for i in range(3)]
+        ids.append(catalog.add(FileRecord(os.path.join(self.temp_dir, 'link.txt'), 5, 0, 7, 1)))
+        ids.append(catalog.add(FileRecord(os.path.join(self.temp_dir, 'link2.txt'), 5, 0, 7, 1)))
+        self.scanner._catalog = catalog
+        
+        size_groups, hardlink_groups, hardlink_sizes = self.scanner._dedupe_hardlinks({5: ids})
+        assert size_groups == {5: ids[:4]}
+        assert list(hardlink_groups.values()) == [[catalog.path(ids[3]), catalog.path(ids[4])]]
+        assert hardlink_sizes == {'1:7': 5}
+        
+        # 增量扫描比较记录时，一侧 inode 未知只比较大小和修改时间
+        assert not FileScanner._record_changed(FileRecord('x', 5, 1, 0, 0), FileRecord('x', 5, 1, 9, 3))
+        assert FileScanner._record_changed(FileRecord('x', 5, 1, 0, 0), FileRecord('x', 5, 2, 9, 3))
+        assert FileScanner._record_changed(FileRecord('x', 5, 1, 8, 3), FileRecord('x', 5, 1, 9, 3))
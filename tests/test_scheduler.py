@@ -0,0 +1,124 @@
+"""
+哈希任务调度器测试
+"""
+
+import tempfile
+import threading
+from app.scheduler import ConcurrencyController, HashScheduler, is_rotational, physical_offset
+from app.walker import FileRecord
+
+
+def make_record(name, size):
+    """构造测试用文件记录"""
+    return FileRecord(f'/tmp/{name}', size, 0, 0, 0)
+
+
+class TestHashScheduler:
+    """哈希任务调度器测试类"""
+    
+    def test_largest_tasks_first(self):
+        """测试单线程时按预估字节数从大到小执行"""
+        order = []
+        scheduler = HashScheduler(1, threading.Event())
+        tasks = [(make_record(name, size), size) for name, size in [('a', 1), ('b', 100), ('c', 10)]]
+        
+        def func(records):
+            order.extend(r.path for r in records)
+            return [(r, 'h') for r in records]
+            
+        results = scheduler.run(tasks, func, 'test')
+        assert order == ['/tmp/b', '/tmp/c', '/tmp/a']
+        assert len(results) == 3
+        
+    def test_progress_in_bytes(self):
+        """测试进度以字节为单位上报"""
+        progress = []
+        scheduler = HashScheduler(2, threading.Event(), lambda cur, total, msg: progress.append((cur, total)))
+        tasks = [(make_record(str(i), 10), 10) for i in range(5)]
+        
+        scheduler.run(tasks, lambda records: [(r, 'h') for r in records], 'test', batch_size=2)
+        assert max(progress) == (50, 50)
+        
+    def test_stop_event(self):
+        """测试停止后不再领取新任务"""
+        stop_event = threading.Event()
+        stop_event.set()
+        scheduler = HashScheduler(4, stop_event)
+        tasks = [(make_record(str(i), 10), 10) for i in range(5)]
+        
+        assert scheduler.run(tasks, lambda records: [(r, 'h') for r in records], 'test') == []
+        
+    def test_adaptive_queues_per_device(self):
+        """测试自适应模式按设备分队列，每个任务只执行一次"""
+        scheduler = HashScheduler(2, threading.Event(), adaptive=True, max_threads=4)
+        tasks = [(i, 10) for i in range(20)]
+        
+        results = scheduler.run(tasks, lambda items: list(items), 'test', device_of=lambda item: item % 2)
+        assert sorted(results) == list(range(20))
+        assert set(scheduler.controllers) == {0, 1}
+        
+    def test_disk_order_per_device(self):
+        """测试按磁盘顺序读取时每个设备队列按 order_key 排序"""
+        order = {0: [], 1: []}
+        scheduler = HashScheduler(1, threading.Event(), io_order='disk')
+        tasks = [(i, 100 - i) for i in range(10)]
+        
+        def func(items):
+            order[items[0] % 2].extend(items)
+            return items
+            
+        scheduler.run(tasks, func, 'test', device_of=lambda item: item % 2, order_key=lambda item: -item)
+        assert order == {0: [8, 6, 4, 2, 0], 1: [9, 7, 5, 3, 1]}
+        
+    def test_size_order_ignores_order_key(self):
+        """测试 size 顺序下仍然大文件优先"""
+        order = []
+        scheduler = HashScheduler(1, threading.Event(), io_order='size')
+        scheduler.run([(1, 10), (2, 30), (3, 20)], lambda items: order.extend(items) or items, 'test',
+                      device_of=lambda item: 0, order_key=lambda item: item)
+        assert order == [2, 3, 1]
+        
+    def test_is_rotational_unknown_device(self):
+        """测试无法识别的设备返回 None"""
+        assert is_rotational(0) is None
+        
+    def test_physical_offset(self):
+        """测试 FIEMAP 查询：不支持时返回 None，不抛出异常"""
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'x' * 8192)
+            f.flush()
+            offset = physical_offset(f.name)
+            assert offset is None or isinstance(offset, int)
+        assert physical_offset('/nonexistent/file') is None
+
+
+class TestConcurrencyController:
+    """自适应并发控制器测试类"""
+    
+    def test_hill_climbing(self):
+        """测试吞吐量上升时继续增加并发，下降时反向"""
+        controller = ConcurrencyController('dev', initial=4, max_workers=16, interval=0)
+        
+        targets = []
+        for throughput in (100.0, 200.0, 100.0, 102.0):
+            with controller._condition:
+                controller._adjust(throughput, 0.01)
+            targets.append(controller.target)
+            
+        # 首个窗口尝试增加；上升继续增加；下降反向减少；持平保持
+        assert targets == [6, 9, 7, 7]
+        assert [d['workers'] for d in controller.decisions] == [6, 9, 7, 7]
+        
+    def test_bounds(self):
+        """测试并发数不超出上下限"""
+        controller = ConcurrencyController('dev', initial=1, max_workers=2, interval=0)
+        for throughput in (1.0, 10.0, 100.0):
+            with controller._condition:
+                controller._adjust(throughput, 0.01)
+        assert controller.target == 2
+        
+    def test_wait_turn(self):
+        """测试编号超出目标并发数的工作线程在任务取完后退出"""
+        controller = ConcurrencyController('dev', initial=1, max_workers=4)
+        assert controller.wait_turn(0, lambda: False)
+        assert not controller.wait_turn(3, lambda: True)
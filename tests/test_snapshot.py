@@ -0,0 +1,149 @@
+"""
+目录树快照与增量扫描测试
+"""
+
+import os
+import tempfile
+from app.scanner import FileScanner, ScanConfig
+from app.snapshot import TreeSnapshot
+from app.walker import FileRecord
+
+
+class TestTreeSnapshot:
+    """目录树快照测试类"""
+    
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.temp_dir, 'data')
+        os.makedirs(self.data_dir)
+        self.snapshot_path = os.path.join(self.temp_dir, 'snapshot.db')
+        
+    def teardown_method(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        
+    def create_test_file(self, filename, content):
+        """创建测试文件"""
+        file_path = os.path.join(self.data_dir, filename)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return file_path
+        
+    def scan(self):
+        """以增量模式扫描一次"""
+        scanner = FileScanner(ScanConfig(min_size=1, snapshot_path=self.snapshot_path))
+        try:
+            return scanner.scan_directory(self.data_dir)
+        finally:
+            scanner.close()
+            
+    def test_save_and_load(self):
+        """测试快照保存与加载"""
+        snapshot = TreeSnapshot('fp')
+        record = FileRecord('/a/x.txt', 3, 100, 1, 2)
+        snapshot.record_dir('/a', 42, [record], ['/a/b'])
+        snapshot.duplicate_groups = {'h': ['/a/x.txt', '/a/y.txt']}
+        snapshot.group_sizes = {'h': 3}
+        assert snapshot.save(self.snapshot_path)
+        
+        loaded = TreeSnapshot.load(self.snapshot_path, 'fp')
+        assert loaded.lookup_dir('/a', 42) == ([record], ['/a/b'])
+        assert loaded.lookup_dir('/a', 43) is None
+        assert loaded.duplicate_groups == snapshot.duplicate_groups
+        assert loaded.group_sizes == {'h': 3}
+        
+        # 配置指纹不同的快照不能复用
+        assert TreeSnapshot.load(self.snapshot_path, 'other') is None
+        
+    def test_first_scan_is_full(self):
+        """测试首次增量扫描等同完整扫描并写入快照"""
+        self.create_test_file('a.txt', 'same')
+        self.create_test_file('b.txt', 'same')
+        
+        result = self.scan()
+        assert result.delta is None
+        assert len(result.duplicate_groups) == 1
+        assert os.path.exists(self.snapshot_path)
+        
+    def test_incremental_add_and_remove(self):
+        """测试增量扫描发现新增与删除的文件"""
+        a = self.create_test_file('a.txt', 'same')
+        self.create_test_file('b.txt', 'same')
+        os.makedirs(os.path.join(self.data_dir, 'sub'))
+        self.create_test_file(os.path.join('sub', 'c.txt'), 'other content')
+        self.scan()
+        
+        # 未变化时沿用上次的重复组
+        result = self.scan()
+        assert result.delta['added_files'] == 0
+        assert result.delta['reused_dirs'] == 2
+        assert len(result.duplicate_groups) == 1
+        assert result.stage_stats['size'] == 0
+        
+        # 新增与已有文件内容相同的文件
+        self.create_test_file(os.path.join('sub', 'd.txt'), 'other content')
+        result = self.scan()
+        assert result.delta['added_files'] == 1
+        assert len(result.delta['new_groups']) == 1
+        assert len(result.duplicate_groups) == 2
+        
+        # 删除文件后对应重复组消除
+        os.remove(a)
+        result = self.scan()
+        assert result.delta['removed_files'] == 1
+        assert len(result.delta['resolved_groups']) == 1
+        assert len(result.duplicate_groups) == 1
+        assert result.total_files == 3
+        
+    def test_in_place_modification(self):
+        """测试原地改写（大小不变、目录 mtime 不变）的文件被发现，不再沿用旧重复组"""
+        os.makedirs(os.path.join(self.data_dir, 'b'))
+        self.create_test_file('f.txt', 'same')
+        path = self.create_test_file(os.path.join('b', 'f.txt'), 'same')
+        assert len(self.scan().duplicate_groups) == 1
+        
+        dir_stat = os.stat(os.path.dirname(path))
+        with open(path, 'r+', encoding='utf-8') as f:
+            f.write('diff')
+        os.utime(os.path.dirname(path), ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+        
+        result = self.scan()
+        assert result.delta['reused_dirs'] == 2
+        assert result.delta['modified_files'] == 1
+        assert result.duplicate_groups == {}
+        assert len(result.delta['resolved_groups']) == 1
+        
+    def test_web_status_returns_counts(self):
+        """测试 Web 状态接口只返回组数，组列表分页查询，删除扫描后关闭结果存储"""
+        from app.web import app as web_app
+        
+        a = self.create_test_file('a.txt', 'same')
+        self.create_test_file('b.txt', 'same')
+        os.link(a, os.path.join(self.data_dir, 'a_link.txt'))
+        self.scan()
+        os.remove(os.path.join(self.data_dir, 'b.txt'))
+        
+        config = ScanConfig(min_size=1, snapshot_path=self.snapshot_path)
+        web_app.run_scan(FileScanner(config), self.data_dir, '1')
+        client = web_app.app.test_client()
+        try:
+            data = client.get('/api/scan/1/status').get_json()['result']
+            assert data['hardlink_group_count'] == 1
+            assert data['delta']['removed_files'] == 1
+            assert data['delta']['resolved_group_count'] == 1
+            assert 'resolved_groups' not in data['delta']
+            
+            page = client.get('/api/scan/1/groups?kind=resolved').get_json()
+            assert page['total'] == 1 and page['groups'][0]['size'] == 4
+            page = client.get('/api/scan/1/groups?kind=hardlinks').get_json()
+            assert sorted(page['groups'][0]['files']) == [a, os.path.join(self.data_dir, 'a_link.txt')]
+            assert page['groups'][0]['size'] == 4  # 取自扫描记录
+            assert client.get('/api/scan/1/groups?kind=other').status_code == 400
+        finally:
+            store = web_app.result_stores['1']
+            assert client.delete('/api/scan/1').status_code == 200
+            
+        assert not os.path.exists(store.db_path)
+        assert '1' not in web_app.extra_stores and '1' not in web_app.scan_results
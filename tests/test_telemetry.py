@@ -0,0 +1,78 @@
+"""
+Web 服务运行指标测试
+"""
+
+from app.instrumentation import ScanMetrics
+from app.scanner import ScanResult
+from app.web.telemetry import Histogram, ServiceMetrics
+
+
+def make_result(bytes_read, scan_time=2.0):
+    """构造带度量的扫描结果"""
+    result = ScanResult(scan_time=scan_time)
+    result.metrics = ScanMetrics()
+    result.metrics.count('bytes_read', bytes_read)
+    result.metrics.count('files_opened', 3)
+    result.metrics.phases.update({'walk': 0.5, 'full_hash': 1.0})
+    return result
+
+
+def sample(text, name):
+    """取出某个样本行的值"""
+    for line in text.splitlines():
+        if line.startswith(name + ' '):
+            return float(line.split()[1])
+    raise KeyError(name)
+
+
+class TestServiceMetrics:
+    """运行指标测试类"""
+    
+    def test_histogram_buckets(self):
+        """测试直方图分桶为累积计数"""
+        histogram = Histogram((1.0, 10.0))
+        for value in (0.5, 5.0, 50.0):
+            histogram.observe(value)
+        lines = histogram.samples('x', 'phase="walk"')
+        assert lines[:3] == ['x_bucket{phase="walk",le="1"} 1', 'x_bucket{phase="walk",le="10"} 2',
+                             'x_bucket{phase="walk",le="+Inf"} 3']
+        assert lines[-1] == 'x_count{phase="walk"} 3'
+        
+    def test_running_scan_counted_once(self):
+        """测试运行中扫描的读取量计入计数器，结束后不重复计数"""
+        metrics = ServiceMetrics()
+        result = make_result(1000)
+        metrics.scan_started(result, lambda: {'current': 40, 'total': 100})
+        
+        text = metrics.render()
+        assert sample(text, 'duplicatehunter_bytes_hashed_total') == 1000
+        assert sample(text, 'duplicatehunter_hash_queue_bytes') == 60
+        assert sample(text, 'duplicatehunter_scans_running') == 1
+        
+        metrics.scan_finished(result)
+        text = metrics.render()
+        assert sample(text, 'duplicatehunter_bytes_hashed_total') == 1000
+        assert sample(text, 'duplicatehunter_scans_completed_total') == 1
+        assert sample(text, 'duplicatehunter_scans_running') == 0
+        assert sample(text, 'duplicatehunter_last_scan_throughput_bytes_per_second') == 1000
+        assert 'duplicatehunter_phase_duration_seconds_count{phase="walk"} 1' in text
+        
+    def test_failed_scan(self):
+        """测试失败的扫描单独计数"""
+        metrics = ServiceMetrics()
+        result = make_result(10)
+        metrics.scan_started(result, lambda: None)
+        metrics.scan_finished(result, failed=True)
+        
+        text = metrics.render({'cache_size': 2, 'cache_bytes': 300, 'cache_hits': 3, 'cache_misses': 1})
+        assert sample(text, 'duplicatehunter_scans_failed_total') == 1
+        assert sample(text, 'duplicatehunter_hash_cache_hit_ratio') == 0.75
+        
+    def test_metrics_endpoint(self):
+        """测试 /metrics 接口返回 Prometheus 文本格式"""
+        from app.web.app import app
+        
+        response = app.test_client().get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        assert '# TYPE duplicatehunter_scans_started_total counter' in response.get_data(as_text=True)
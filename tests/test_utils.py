@@ -0,0 +1,221 @@
+"""
+工具函数测试
+"""
+
+import base64
+import csv
+import gzip
+import json
+import os
+import re
+import tempfile
+import pytest
+from app import utils
+from app.utils import FileUtils, ReportGenerator
+from app.walker import FileRecord
+
+
+class TestReportGenerator:
+    """报告生成器测试类"""
+    
+    def setup_method(self):
+        """测试前准备：报告中的文件并不存在，只能使用传入的扫描元数据"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.duplicate_groups = {
+            'aaaa': ['/data/a.bin', '/data/copy/a.bin'],
+            'bbbb': ['/data/<b>.txt', '/other/b.txt', '/other/b2.txt'],
+        }
+        self.group_sizes = {'aaaa': 2048, 'bbbb': 10}
+        self.file_records = {
+            '/data/a.bin': FileRecord('/data/a.bin', 2048, 1_700_000_000_000_000_000, 11, 1),
+            '/data/copy/a.bin': FileRecord('/data/copy/a.bin', 2048, 1_700_000_001_000_000_000, 12, 1),
+            '/data/<b>.txt': FileRecord('/data/<b>.txt', 10, 1_700_000_002_000_000_000, 13, 1),
+        }
+        
+    def teardown_method(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        
+    def output(self, name):
+        """输出文件路径"""
+        return os.path.join(self.temp_dir, name)
+        
+    def test_json_report(self):
+        """测试 JSON 报告使用扫描元数据，缺少元数据的文件修改时间为空"""
+        path = self.output('report.json')
+        assert ReportGenerator.generate_json_report(self.duplicate_groups, path, self.group_sizes, self.file_records)
+        
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+        assert report['total_groups'] == 2
+        first = report['duplicate_groups'][0]
+        assert first['hash'] == 'aaaa' and first['size'] == 2048 and first['file_count'] == 2
+        assert first['files'][1]['directory'] == '/data/copy'
+        assert first['files'][1]['size_formatted'] == '2.00KB'
+        assert first['files'][1]['inode'] == 12
+        assert first['files'][0]['modified_time'] is not None
+        assert report['duplicate_groups'][1]['files'][1]['modified_time'] is None
+        assert 'created_time' not in first['files'][0]  # 需要逐个 stat 文件，已移除
+        
+    def test_empty_json_report(self):
+        """测试没有重复组时仍输出合法 JSON"""
+        path = self.output('empty.json')
+        assert ReportGenerator.generate_json_report({}, path)
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+        assert report['total_groups'] == 0 and report['duplicate_groups'] == []
+        
+    def test_ndjson_gzip_report(self):
+        """测试 NDJSON 报告按扩展名推断 gzip 压缩"""
+        path = self.output('report.ndjson.gz')
+        assert ReportGenerator.generate_ndjson_report(self.duplicate_groups, path, self.group_sizes, self.file_records)
+        
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert [group['hash'] for group in lines] == ['aaaa', 'bbbb']
+        assert lines[1]['file_count'] == 3
+        
+    def test_csv_report_from_store_records(self):
+        """测试 CSV 报告接受 (摘要, 大小, FileRecord 列表) 序列"""
+        groups = [('aaaa', 2048, [self.file_records['/data/a.bin'], self.file_records['/data/copy/a.bin']])]
+        path = self.output('report.csv')
+        assert ReportGenerator.generate_csv_report(iter(groups), path, compression=None)
+        
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ['组ID', '哈希值', '文件路径', '文件大小', '修改时间']
+        assert [row[2] for row in rows[1:]] == ['/data/a.bin', '/data/copy/a.bin']
+        assert rows[1][3] == '2.00KB'
+        
+    def test_html_report(self):
+        """测试 HTML 报告转义路径并在末尾写入汇总"""
+        path = self.output('report.html')
+        assert ReportGenerator.generate_html_report(self.duplicate_groups, path, self.group_sizes, self.file_records)
+        
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        assert '/data/&lt;b&gt;.txt' in content
+        assert '<strong>5</strong>' in content
+        assert FileUtils.format_size(2048 + 20) in content
+        assert content.rstrip().endswith('</html>')
+        
+    def test_virtual_html_report(self):
+        """测试虚拟滚动报告：数据块按可释放空间排序，清单汇总正确"""
+        path = self.output('virtual.html')
+        group_sizes = {'aaaa': 2048, 'bbbb': 4096}
+        assert ReportGenerator.generate_virtual_html_report(self.duplicate_groups, path, group_sizes,
+                                                            self.file_records)
+        
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        blocks = re.findall(r'<script type="application/x-duplicatehunter-chunk">([^<]*)</script>', content)
+        groups = [group for block in blocks for group in json.loads(gzip.decompress(base64.b64decode(block)))]
+        assert [group[0] for group in groups] == ['bbbb', 'aaaa']
+        assert groups[0][2][0][0] == '/data/<b>.txt' and groups[0][2][1] == ['/other/b.txt', None]
+        assert groups[1][2][0] == ['/data/a.bin', 1_700_000_000]
+        
+        manifest = json.loads(re.search(r'<script type="application/json" id="dh-manifest">(.*?)</script>',
+                                        content).group(1))
+        assert manifest['groups'] == 2 and manifest['files'] == 5
+        assert manifest['wasted_space'] == 2048 + 4096 * 2
+        assert sum(manifest['chunks']) == 2
+        
+    def test_unsupported_compression(self):
+        """测试不支持的压缩方式"""
+        with pytest.raises(ValueError):
+            ReportGenerator.open_output(self.output('report.json'), 'bzip2')
+            
+    @pytest.mark.skipif(utils.zstandard is None, reason="未安装 zstandard")
+    def test_zstd_report(self):
+        """测试 zstd 压缩"""
+        path = self.output('report.csv.zst')
+        assert ReportGenerator.generate_csv_report(self.duplicate_groups, path, self.group_sizes, self.file_records)
+        with open(path, 'rb') as f:
+            content = utils.zstandard.ZstdDecompressor().stream_reader(f).read().decode('utf-8')
+        assert '/other/b2.txt' in content
+
+
+class TestFileUtilsLinks:
+    """重复文件替换为链接的测试类"""
+    
+    def setup_method(self):
+        """测试前准备：两个内容相同的文件"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.keep = os.path.join(self.temp_dir, 'keep.bin')
+        self.dup = os.path.join(self.temp_dir, 'dup.bin')
+        for path in (self.keep, self.dup):
+            with open(path, 'wb') as f:
+                f.write(b'same content' * 100)
+        os.utime(self.dup, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+        
+    def teardown_method(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        
+    def test_hardlink_with_backup(self):
+        """测试替换为硬链接，备份与原文件共享 inode 而不是复制"""
+        original_inode = os.stat(self.dup).st_ino
+        backup = os.path.join(self.temp_dir, 'backups', 'dup.bin')
+        FileUtils.replace_with_link(self.keep, self.dup, 'hardlink', backup)
+        
+        assert os.path.samefile(self.keep, self.dup)
+        assert os.stat(backup).st_ino == original_inode
+        assert [name for name in os.listdir(self.temp_dir) if name.endswith('.dhtmp')] == []
+        
+    def test_symlink(self):
+        """测试替换为指向保留文件绝对路径的符号链接"""
+        FileUtils.replace_with_link(self.keep, self.dup, 'symlink')
+        assert os.readlink(self.dup) == os.path.abspath(self.keep)
+        
+    def test_reflink(self):
+        """测试替换为 reflink 克隆并保留原文件的时间戳，文件系统不支持时原文件不变"""
+        try:
+            FileUtils.replace_with_link(self.keep, self.dup, 'reflink')
+        except OSError:
+            with open(self.dup, 'rb') as f:
+                assert f.read() == b'same content' * 100
+            pytest.skip("文件系统不支持 reflink")
+            
+        assert not os.path.samefile(self.keep, self.dup)
+        assert os.stat(self.dup).st_mtime_ns == 1_600_000_000_000_000_000
+        
+    def test_changed_file_not_replaced(self):
+        """测试扫描后大小已变化的文件不会被替换"""
+        with open(self.dup, 'ab') as f:
+            f.write(b'changed')
+        with pytest.raises(OSError):
+            FileUtils.replace_with_link(self.keep, self.dup, 'hardlink')
+        assert not os.path.samefile(self.keep, self.dup)
+        
+    def test_changed_after_scan_not_replaced(self):
+        """测试与扫描时记录不符（大小相同、内容被改写）的文件不会被替换"""
+        keep_record = FileRecord.from_stat(self.keep, os.stat(self.keep))
+        dup_record = FileRecord.from_stat(self.dup, os.stat(self.dup))
+        with open(self.dup, 'r+b') as f:
+            f.write(b'SAME')
+        with pytest.raises(OSError):
+            FileUtils.replace_with_link(self.keep, self.dup, 'hardlink', None, keep_record, dup_record)
+        assert not os.path.samefile(self.keep, self.dup)
+        
+    def test_different_content_without_records(self):
+        """测试没有扫描记录时逐字节比较，内容不同的文件不会被替换"""
+        other = os.path.join(self.temp_dir, 'other.bin')
+        with open(other, 'wb') as f:
+            f.write(b'SAME content' + b'same content' * 99)
+        with pytest.raises(OSError):
+            FileUtils.replace_with_link(self.keep, other, 'hardlink')
+        with open(other, 'rb') as f:
+            assert f.read(4) == b'SAME'
+            
+    def test_safe_delete_backup_is_link(self):
+        """测试带备份删除时同一文件系统上不复制数据，同名备份不互相覆盖"""
+        original_inode = os.stat(self.dup).st_ino
+        backup_dir = os.path.join(self.temp_dir, 'backups')
+        assert FileUtils.safe_delete_file(self.dup, backup_dir)
+        assert FileUtils.safe_delete_file(self.keep, backup_dir)
+        
+        backups = [os.path.join(backup_dir, name) for name in os.listdir(backup_dir)]
+        assert len(backups) == 2
+        assert original_inode in {os.stat(path).st_ino for path in backups}
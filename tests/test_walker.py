@@ -0,0 +1,92 @@
+"""
+目录遍历器测试
+"""
+
+import os
+import tempfile
+from app.walker import DirectoryWalker, FileRecord
+
+
+class TestDirectoryWalker:
+    """目录遍历器测试类"""
+    
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        
+    def teardown_method(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        
+    def create_test_file(self, filename, content):
+        """创建测试文件"""
+        file_path = os.path.join(self.temp_dir, filename)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return file_path
+        
+    def test_walk_collects_metadata(self):
+        """测试遍历结果携带完整元数据"""
+        file_path = self.create_test_file('sub/dir/file.txt', 'hello')
+        
+        records = list(DirectoryWalker().walk(self.temp_dir))
+        assert len(records) == 1
+        
+        st = os.stat(file_path)
+        assert records[0] == FileRecord(file_path, 5, st.st_mtime_ns, st.st_ino, st.st_dev)
+        
+    def test_exclude_dirs(self):
+        """测试排除目录"""
+        self.create_test_file('keep/a.txt', 'a')
+        self.create_test_file('skip/b.txt', 'b')
+        
+        records = list(DirectoryWalker({'skip'}).walk(self.temp_dir))
+        assert [os.path.basename(r.path) for r in records] == ['a.txt']
+        
+    def test_does_not_follow_dir_symlinks(self):
+        """测试不跟随目录符号链接"""
+        self.create_test_file('real/a.txt', 'a')
+        os.symlink(os.path.join(self.temp_dir, 'real'), os.path.join(self.temp_dir, 'link'))
+        
+        records = list(DirectoryWalker().walk(self.temp_dir))
+        assert len(records) == 1
+        
+    def test_parallel_walk_matches_sequential(self):
+        """测试多线程遍历与单线程遍历结果一致"""
+        for i in range(5):
+            for j in range(4):
+                self.create_test_file(f'd{i}/s{j}/f.txt', f'{i}-{j}')
+                
+        sequential = sorted(DirectoryWalker().walk(self.temp_dir))
+        # 容量很小的共享队列会迫使线程把目录留在本地栈中处理
+        parallel = sorted(DirectoryWalker(threads=4, queue_size=2).walk(self.temp_dir))
+        assert parallel == sequential
+        assert len(parallel) == 20
+        
+    def test_parallel_walk_honours_stop(self):
+        """测试多线程遍历响应停止事件"""
+        import threading
+        self.create_test_file('a/b.txt', 'b')
+        stop_event = threading.Event()
+        stop_event.set()
+        
+        assert list(DirectoryWalker(stop_event=stop_event, threads=4).walk(self.temp_dir)) == []
+        
+    def test_parallel_walk_propagates_errors(self):
+        """测试工作线程中的非 OSError 异常使遍历失败，而不是一直等待"""
+        import pytest
+        for i in range(4):
+            self.create_test_file(f'd{i}/f.txt', str(i))
+        walker = DirectoryWalker(threads=4)
+        read_dir = walker._read_dir
+        
+        def failing_read_dir(path):
+            if path.endswith('d2'):
+                raise RuntimeError('broken')
+            return read_dir(path)
+            
+        walker._read_dir = failing_read_dir
+        with pytest.raises(RuntimeError):
+            list(walker.walk(self.temp_dir))